@@ -0,0 +1,193 @@
+from pathlib import Path
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import pandas as pd
+from clockify_transform import to_time_entries_dataframe
+from paycor_transform import flatten_payrates, to_pay_rate_dataframe
+from storage import write_ndjson, write_parquet
+from synthetic_data import (
+    SyntheticScale,
+    add_scale_arguments,
+    employee_id_mapping,
+    generate_payrates,
+    iter_time_entries,
+    scale_from_args,
+)
+from transform_unify import attach_employee_ids, attach_pay_rates, compute_costs
+
+"""
+Benchmark of the transform stages on synthetic data (see synthetic_data.py).
+
+Times to_time_entries_dataframe, flatten_payrates, to_pay_rate_dataframe,
+attach_pay_rates, compute_costs and the Parquet/NDJSON writers, reporting the best of
+--repeat runs, rows per second and peak memory per stage (tracemalloc, so Python-side
+allocations; Arrow buffers used by the Parquet writer are not counted).  Results are compared
+with the stored baseline for the same scale and any stage slower (or hungrier) by more
+than --tolerance is reported as a regression (exit code 1).
+
+    python src/benchmark.py --users 200 --years 2                    #compare
+    python src/benchmark.py --users 200 --years 2 --save-baseline    #record a new baseline
+"""
+
+
+BENCHMARK_BASELINE_FILE = Path("benchmarks/baseline.json")
+BENCHMARK_LOG = Path("data/metrics/benchmarks.jsonl")
+
+
+
+def _measure(func, repeat: int):
+    """Run func repeat times; returns (result, best seconds, peak traced bytes of one extra run)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+
+    #Separate traced run: tracemalloc overhead would distort the timings
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, best, peak
+
+
+
+def run_benchmark(scale: SyntheticScale, repeat: int = 3) -> dict:
+    """Time each stage on a synthetic dataset of the given scale; returns {stage: stats}."""
+    print(f"Generating synthetic data: {scale.as_dict()}")
+    raw_entries = list(iter_time_entries(scale))
+    raw_rates = generate_payrates(scale)
+    mapping = pd.DataFrame(employee_id_mapping(scale), dtype=str)
+    pay_rate_count = sum(len(v["records"]) for v in raw_rates.values())
+    print(f"{len(raw_entries)} time entries, {pay_rate_count} pay rates.")
+
+    results = {}
+
+    def record(name: str, func, rows: int):
+        value, seconds, peak = _measure(func, repeat)
+        results[name] = {
+            "rows": rows,
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if seconds else None,
+            "peak_bytes": peak,
+        }
+        return value
+
+    df_time = record("to_time_entries_dataframe", lambda: to_time_entries_dataframe(raw_entries), len(raw_entries))
+    flat = record("flatten_payrates", lambda: flatten_payrates(raw_rates), pay_rate_count)
+    df_rates = record("to_pay_rate_dataframe", lambda: to_pay_rate_dataframe(flat), len(flat))
+    df_rates = df_rates.rename(columns={"rate": "hourly_rate"})
+
+    df_ids = attach_employee_ids(df_time, mapping)
+    df_with_rates = record("attach_pay_rates", lambda: attach_pay_rates(df_ids, df_rates), len(df_ids))
+    df_with_rates["rate_rule"] = "base"
+    fact = record("compute_costs", lambda: compute_costs(df_with_rates), len(df_with_rates))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        record("write_parquet", lambda: write_parquet(fact, tmp / "fact.parquet"), len(fact))
+        record("write_ndjson", lambda: write_ndjson(raw_entries, tmp / "entries.ndjson.gz"), len(raw_entries))
+
+    return results
+
+
+
+def _scale_key(scale: SyntheticScale) -> str:
+    return json.dumps(scale.as_dict(), sort_keys=True)
+
+
+
+def load_baseline(path: Path | None = None) -> dict:
+    """Stored baselines: {scale key: {stage: stats}}."""
+    path = Path(path or BENCHMARK_BASELINE_FILE)
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+
+def save_baseline(scale: SyntheticScale, results: dict, path: Path | None = None) -> Path:
+    path = Path(path or BENCHMARK_BASELINE_FILE)
+    baselines = load_baseline(path)
+    baselines[_scale_key(scale)] = results
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+    return path
+
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float = 0.25) -> list[str]:
+    """Regression messages for stages slower or using more memory than baseline * (1 + tolerance)."""
+    regressions = []
+    for stage, stats in results.items():
+        base = baseline.get(stage)
+        if not base:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            if base[metric] and stats[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{stage}: {metric} {stats[metric]:.4g} vs baseline {base[metric]:.4g} "
+                    f"(+{stats[metric] / base[metric] - 1:.0%})"
+                )
+    return regressions
+
+
+
+def print_report(results: dict, baseline: dict) -> None:
+    print(f"\n{'stage':<28} {'rows':>10} {'seconds':>9} {'rows/s':>12} {'peak MB':>9} {'vs base':>8}")
+    for stage, stats in results.items():
+        base = baseline.get(stage)
+        change = f"{stats['seconds'] / base['seconds'] - 1:+.0%}" if base and base["seconds"] else "-"
+        print(
+            f"{stage:<28} {stats['rows']:>10} {stats['seconds']:>9.4f} "
+            f"{stats['rows_per_second'] or 0:>12,.0f} {stats['peak_bytes'] / 1e6:>9.1f} {change:>8}"
+        )
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the transform stages on synthetic data.")
+    add_scale_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    scale = scale_from_args(args)
+    results = run_benchmark(scale, repeat=args.repeat)
+    baseline = load_baseline().get(_scale_key(scale), {})
+    print_report(results, baseline)
+
+    BENCHMARK_LOG.parent.mkdir(parents=True, exist_ok=True)
+    with BENCHMARK_LOG.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "scale": scale.as_dict(),
+            "results": results,
+        }) + "\n")
+
+    if args.save_baseline:
+        print(f"\nBaseline saved to {save_baseline(scale, results)}")
+        sys.exit(0)
+
+    if not baseline:
+        print("\nNo baseline for this scale yet; run with --save-baseline to record one.")
+        sys.exit(0)
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo regressions against baseline.")
@@ -1,8 +1,26 @@
 import os
 from dotenv import load_dotenv
-import requests
-from datetime import datetime
-from storage import save_time_entries_raw
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterator
+from http_client import TokenBucket, backoff_delay, get_session
+from http_cache import DEFAULT_TTL_SECONDS, cached_get
+import metrics
+from pathlib import Path
+from storage import (
+    save_time_entries_raw,
+    save_clockify_dimension_raw,
+    synced_time_entries_path,
+    load_synced_time_entries,
+    append_synced_time_entries,
+    load_raw_manifest,
+    load_clockify_sync_state,
+    save_clockify_sync_state,
+)
 
 load_dotenv()
 
@@ -16,6 +34,14 @@ Currently, it pulls raw time entries for every user in the workspace
 
 BASE_URL = "https://api.clockify.me/api/v1"
 
+#Clockify allows 50 requests per second per API key; stay a little under it.
+CLOCKIFY_REQUESTS_PER_SECOND = 40
+CLOCKIFY_MAX_RETRIES = 5
+CLOCKIFY_BACKOFF_SECONDS = 1.0
+
+#Users, projects and workspaces go through the local HTTP cache
+DIMENSION_CACHE_TTL = DEFAULT_TTL_SECONDS
+
 def get_api_key() -> str:
     """Read the Clockify API key from environment variables."""
     api_key = os.getenv("CLOCKIFY_API_KEY")
@@ -34,20 +60,90 @@ def get_workspace_id() -> str:
 
 
 
+def get_workspace_ids() -> list[str]:
+    """
+    Read the Clockify workspaces to ingest: CLOCKIFY_WORKSPACE_IDS (comma-separated),
+    falling back to the single CLOCKIFY_WORKSPACE_ID.
+    """
+    raw = os.getenv("CLOCKIFY_WORKSPACE_IDS") or os.getenv("CLOCKIFY_WORKSPACE_ID") or ""
+    workspace_ids = [w.strip() for w in raw.split(",") if w.strip()]
+    if not workspace_ids:
+        raise RuntimeError("Neither CLOCKIFY_WORKSPACE_IDS nor CLOCKIFY_WORKSPACE_ID is set in the environment or .env file")
+    return workspace_ids
+
+
+
+@lru_cache(maxsize=None)
 def get_headers() -> dict:
-    """Construct the headers required by the Clockify API."""
+    """Construct the headers required by the Clockify API (built once per process)."""
     return {
         "X-Api-Key": get_api_key()
     }
+
+
+
+_rate_limiter = TokenBucket(CLOCKIFY_REQUESTS_PER_SECOND)
+
+
+
+def set_requests_per_second(rate: float) -> None:
+    """Throttle this process to rate requests/s, e.g. its share when several processes use one API key."""
+    _rate_limiter.set_rate(rate)
+
+
+
+def get_clockify_session():
+    """Shared, pooled HTTP session for the Clockify API."""
+    return get_session("clockify", headers=get_headers())
+
+
+
+def _send_clockify_get(url: str, params: dict | None = None, headers: dict | None = None):
+    """
+    Send one GET through the shared session and rate limiter.
+    5xx responses and connection errors are retried by the session; 429 responses
+    are retried here with exponential backoff plus jitter, honouring Retry-After.
+    """
+    session = get_clockify_session()
+    for attempt in range(CLOCKIFY_MAX_RETRIES + 1):
+        _rate_limiter.acquire()
+        started = time.perf_counter()
+        response = session.get(url, params=params, headers=headers)
+        metrics.observe("http.clockify.latency_s", time.perf_counter() - started)
+        metrics.count("http.clockify.calls")
+        metrics.count("http.clockify.bytes", len(response.content))
+        if response.status_code != 429 or attempt == CLOCKIFY_MAX_RETRIES:
+            break
+        metrics.count("http.clockify.retries")
+        time.sleep(backoff_delay(attempt, CLOCKIFY_BACKOFF_SECONDS, response.headers.get("Retry-After")))
+
+    response.raise_for_status()
+    return response
+
+
+
+def clockify_get(url: str, params: dict | None = None, cache_ttl: float | None = None):
+    """
+    GET a Clockify endpoint and return the parsed JSON response.
+    -cache_ttl: if set, serve the response through the local HTTP cache
+        (ETag/Last-Modified revalidation, else this many seconds of freshness)
+    """
+    if cache_ttl is None:
+        return _send_clockify_get(url, params).json()
+
+    return cached_get(
+        lambda extra_headers: _send_clockify_get(url, params, extra_headers),
+        url,
+        params,
+        ttl=cache_ttl,
+    )
     
     
     
 def get_user() -> dict:
     """Call a simple, safe Clockify endpoint that returns info about the current user."""
     url = f"{BASE_URL}/user"
-    response = requests.get(url, headers=get_headers())
-    response.raise_for_status()
-    return response.json()
+    return clockify_get(url)
     
     
     
@@ -57,9 +153,7 @@ def get_users(workspace_id: str) -> list:
 	Returns a list of user objects.
 	"""
 	url = f"{BASE_URL}/workspaces/{workspace_id}/users"
-	response = requests.get(url, headers=get_headers())
-	response.raise_for_status()
-	return response.json()    
+	return clockify_get(url, cache_ttl=DIMENSION_CACHE_TTL)    
 
 
     
@@ -69,9 +163,7 @@ def get_workspaces() -> list:
     Returns a list of workspace objects.
     """
     url = f"{BASE_URL}/workspaces"
-    response = requests.get(url, headers=get_headers())
-    response.raise_for_status()
-    return response.json()
+    return clockify_get(url, cache_ttl=DIMENSION_CACHE_TTL)
     
     
     
@@ -81,12 +173,42 @@ def get_projects(workspace_id: str) -> list:
 	Returns a list of project objects.
 	"""
 	url = f"{BASE_URL}/workspaces/{workspace_id}/projects"
-	response = requests.get(url, headers=get_headers())
-	response.raise_for_status()
-	return response.json()
+	return clockify_get(url, cache_ttl=DIMENSION_CACHE_TTL)
     
     
 
+def iter_time_entries_for_user(
+    workspace_id: str,
+    user_id: str,
+    start: str,
+    end: str,
+    page_size: int = 1000,
+) -> Iterator[dict]:
+    """
+    Yield time entries for a single user, one page at a time.
+    Keeps requesting pages until the API returns a short (or empty) page.
+    Uses endpoint:  GET /workspaces/{workspaceId}/user/{userId}/time-entries
+    """
+    url = f"{BASE_URL}/workspaces/{workspace_id}/user/{user_id}/time-entries"
+    page = 1
+
+    while True:
+        params = {
+            "start": start,
+            "end": end,
+            "page": page,
+            "page-size": page_size
+        }
+
+        entries = clockify_get(url, params=params)
+        yield from entries
+
+        if len(entries) < page_size:
+            break
+        page += 1
+
+
+
 def get_time_entries_for_user(
     workspace_id: str,
     user_id: str,
@@ -95,20 +217,48 @@ def get_time_entries_for_user(
     page_size: int = 1000,
 ) -> list:
     """
-    Fetch time entries for a single user.
+    Fetch all time entries for a single user (every page).
     Uses endpoint:  GET /workspaces/{workspaceId}/user/{userId}/time-entries
     """
-    url = f"{BASE_URL}/workspaces/{workspace_id}/user/{user_id}/time-entries"
-    
-    params = {
-        "start": start,
-        "end": end,
-        "page-size": page_size
-    }
-    
-    response = requests.get(url, headers=get_headers(), params=params)
-    response.raise_for_status()
-    return response.json()
+    return list(iter_time_entries_for_user(workspace_id, user_id, start, end, page_size))
+
+
+
+def iter_time_entries_for_all_users(
+    workspace_id: str,
+    start: str,
+    end: str,
+    page_size: int = 1000,
+    max_workers: int = 1,
+) -> Iterator[dict]:
+    """
+    Yield time entries for all users in a workspace, in get_users() order.
+    Lets callers such as save_time_entries_raw or to_time_entries_dataframe consume
+    the entries as a stream instead of holding every user's entries in a list.
+    -max_workers: users fetched ahead concurrently; at most this many users' entries
+        are held in memory at once (1 streams page by page)
+    """
+    users = get_users(workspace_id)
+
+    if max_workers <= 1:
+        for u in users:
+            print(f"Fetching entries for {u.get('name')} ({u.get('id')}).")
+            yield from iter_time_entries_for_user(workspace_id, u.get("id"), start, end, page_size)
+        return
+
+    def fetch_user(u: dict) -> list:
+        print(f"Fetching entries for {u.get('name')} ({u.get('id')}).")
+        return get_time_entries_for_user(workspace_id, u.get("id"), start, end, page_size)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        window = deque(pool.submit(fetch_user, u) for u in users[:max_workers])
+        upcoming = iter(users[max_workers:])
+        while window:
+            entries = window.popleft().result()
+            next_user = next(upcoming, None)
+            if next_user is not None:
+                window.append(pool.submit(fetch_user, next_user))
+            yield from entries
 
 
 
@@ -117,30 +267,180 @@ def get_time_entries_for_all_users(
     start: str,
     end: str,
     page_size: int = 1000,
+    max_workers: int = 1,
 ) -> list:
     """
     Fetch time entries for all users in a workspace.
-    Combines per-suer results into a unified list.
+    Combines per-user results into a unified list, in the same user order as get_users().
+    -max_workers: number of users fetched concurrently (1 fetches serially)
     """
     users = get_users(workspace_id)
-    all_entries = []
-    
-    for u in users:
+
+    def fetch_user(u: dict) -> list:
         user_id = u.get("id")
         user_name = u.get("name")
-        
         print(f"Fetching entries for {user_name} ({user_id}).")
+        return get_time_entries_for_user(workspace_id, user_id, start, end, page_size)
 
-        entries = get_time_entries_for_user(workspace_id, user_id, start, end, page_size)
-        
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            per_user = list(pool.map(fetch_user, users))
+    else:
+        per_user = [fetch_user(u) for u in users]
+
+    all_entries = []
+    for entries in per_user:
         all_entries.extend(entries)
 
     print(f"Total entries fetched for all users: {len(all_entries)}")
     return all_entries
 
 
+def parse_clockify_timestamp(value: str) -> datetime:
+    """Parse a Clockify ISO8601 timestamp (e.g. 2025-01-31T23:59:59Z) to an aware datetime."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def format_clockify_timestamp(value: datetime) -> str:
+    """Format an aware datetime the way the Clockify API expects it."""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def sync_time_entries(
+    workspace_id: str,
+    initial_start: str,
+    lookback_days: int = 7,
+    end: str | None = None,
+    page_size: int = 1000,
+    max_workers: int = 1,
+) -> list:
+    """
+    Incrementally sync time entries for all users into the local store.
+
+    Each user has a high-water mark (the time they were last synced through).
+    Only the window from (mark - lookback_days) to end is re-fetched; users with
+    no mark start from initial_start.  Fetched entries replace stored ones by id,
+    and stored entries inside the re-fetched window that the API no longer
+    returns are treated as deleted.  Only new/changed entries and deletions are
+    appended to the store's log, as one batch per run.  Edits to entries older than the lookback
+    window are not picked up; run a full pull for those.
+    -max_workers: number of users fetched concurrently (1 fetches serially)
+    """
+    if end is None:
+        end = format_clockify_timestamp(datetime.now(timezone.utc))
+    end_dt = parse_clockify_timestamp(end)
+
+    state = load_clockify_sync_state()
+    marks = state.setdefault(workspace_id, {})
+    store = {e["id"]: e for e in load_synced_time_entries(workspace_id)}
+    #Stored ids per user, built once so each user's deletion check only looks at their own entries
+    stored_ids_by_user: dict[str, list[str]] = {}
+    for entry_id, entry in store.items():
+        stored_ids_by_user.setdefault(entry.get("userId"), []).append(entry_id)
+
+    users = get_users(workspace_id)
+    fetched_total = 0
+    changed: list[dict] = []
+    deleted_ids: list[str] = []
+
+    def window_start_for(user_id: str) -> datetime:
+        mark = marks.get(user_id)
+        if mark:
+            return parse_clockify_timestamp(mark) - timedelta(days=lookback_days)
+        return parse_clockify_timestamp(initial_start)
+
+    def fetch_user(u: dict) -> list:
+        user_id = u.get("id")
+        window_start = format_clockify_timestamp(window_start_for(user_id))
+        print(f"Syncing entries for {u.get('name')} ({user_id}) from {window_start}.")
+        return get_time_entries_for_user(workspace_id, user_id, window_start, end, page_size)
+
+    #Fetch concurrently; the store is only updated below, one user at a time
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            per_user = list(pool.map(fetch_user, users))
+    else:
+        per_user = [fetch_user(u) for u in users]
+
+    for u, entries in zip(users, per_user):
+        user_id = u.get("id")
+        window_start_dt = window_start_for(user_id)
+        fetched_ids = {e["id"] for e in entries}
+
+        for entry_id in stored_ids_by_user.get(user_id, []):
+            entry = store.get(entry_id)
+            if entry is None or entry.get("userId") != user_id or entry_id in fetched_ids:
+                continue
+            entry_start = (entry.get("timeInterval") or {}).get("start")
+            if entry_start and window_start_dt <= parse_clockify_timestamp(entry_start) <= end_dt:
+                del store[entry_id]
+                deleted_ids.append(entry_id)
+
+        for e in entries:
+            if store.get(e["id"]) != e:
+                changed.append(e)
+            store[e["id"]] = e
+
+        marks[user_id] = end
+        fetched_total += len(entries)
+
+    merged = sorted(
+        store.values(),
+        key=lambda e: (e.get("userId") or "", (e.get("timeInterval") or {}).get("start") or "", e["id"]),
+    )
+    if changed or deleted_ids:
+        append_synced_time_entries(changed, deleted_ids, workspace_id)
+    save_clockify_sync_state(state)
+
+    print(
+        f"Synced {fetched_total} entries ({len(changed)} new or changed, {len(deleted_ids)} deleted); "
+        f"store now holds {len(merged)} entries."
+    )
+    return merged
+
+
+
+def extract_clockify(
+    start: str,
+    end: str,
+    incremental: bool = False,
+    max_workers: int = 8,
+    workspace_id: str | None = None,
+) -> list[Path]:
+    """
+    Pull users, projects and time entries for a workspace into data/raw/clockify.
+    -start,end: ISO8601 range for a full pull (start is also the first-sync start when incremental)
+    -incremental: run sync_time_entries instead of a full pull
+    -workspace_id: defaults to CLOCKIFY_WORKSPACE_ID
+    Returns the raw files written.
+    """
+    workspace_id = workspace_id or get_workspace_id()
+
+    paths = [
+        save_clockify_dimension_raw(get_users(workspace_id), "users", workspace_id),
+        save_clockify_dimension_raw(get_projects(workspace_id), "projects", workspace_id),
+    ]
+
+    if incremental:
+        sync_time_entries(workspace_id, initial_start=start, max_workers=max_workers)
+        paths.append(synced_time_entries_path(workspace_id))
+    else:
+        print(f"Fetching time entries for {start} - {end}.")
+        time_entries = iter_time_entries_for_all_users(workspace_id, start, end, max_workers=max_workers)
+        filepath = save_time_entries_raw(time_entries, workspace_id, start, end)
+        print(f"Saved {load_raw_manifest(filepath.parent)[filepath.name]['records']} time entries to {filepath}.")
+        paths.append(filepath)
+
+    return paths
+
+
     
 if __name__ == "__main__":
+    if "--incremental" in sys.argv:
+        workspace_id = get_workspace_id()
+        sync_time_entries(workspace_id, initial_start="2025-01-01T00:00:00Z", max_workers=8)
+        sys.exit(0)
+
     try:
         user = get_user()
         print("User:", user.get("name"), "-", user.get("email"))
@@ -168,7 +468,7 @@ if __name__ == "__main__":
         end = "2025-01-31T23:59:59Z"
         print(f"\nFetching time entries for {start} - {end}.")
         
-        time_entries = get_time_entries_for_all_users(workspace_id, start, end)
+        time_entries = get_time_entries_for_all_users(workspace_id, start, end, max_workers=8)
         print(f"\nFetched {len(time_entries)} time entries.")
         
         filepath = save_time_entries_raw(time_entries, workspace_id, start, end)
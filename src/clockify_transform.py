@@ -1,7 +1,30 @@
 from pathlib import Path
 import json
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Callable, Iterable, Iterator
+import metrics
+from schema import TAG_BRIDGE_DTYPES, apply_dtypes, apply_time_entry_schema, plain_arrow_schema, tag_bridge
 from clockify_client import get_workspace_id, get_projects, get_users
+from storage import (
+    RAW_SUFFIX,
+    TIME_ENTRIES_DATASET_DIR,
+    clockify_dimension_raw_path,
+    export_parquet_csv,
+    iter_ndjson,
+    OUTPUT_POLICY,
+    iter_synced_time_entries,
+    load_clockify_transform_state,
+    load_raw_manifest,
+    load_synced_time_entry_changes,
+    save_clockify_transform_state,
+    synced_time_entries_path,
+    read_time_entries_dataset,
+    time_entries_dataset,
+    upsert_time_entries_dataset,
+    write_processed,
+)
 
 """
 This file pulls the raw data files from /data/raw/clockify and better-ify-s them.
@@ -14,35 +37,147 @@ Currently, it puts the data into a DataFrame, generates and merges dimension tab
 RAW_CLOCKIFY_DIR = Path("data/raw/clockify")
 PROCESSED_CLOCKIFY_DIR = Path("data/processed/clockify")
 
+#Raw entries converted per batch by the streaming transform (bounds peak memory)
+TIME_ENTRY_BATCH_SIZE = 50_000
+
+
+def is_ndjson(filepath: Path) -> bool:
+    """True for NDJSON raw landing files (.ndjson or .ndjson.gz)."""
+    return filepath.name.endswith((".ndjson", ".ndjson.gz"))
+
+
 def load_raw_time_entries(filepath: Path) -> list:
-    """Load raw time entry JSON from disk into a Python list."""
+    """Load a raw time entry file (NDJSON or legacy JSON array) into a Python list."""
+    if is_ndjson(filepath):
+        return list(iter_ndjson(filepath))
     with filepath.open("r", encoding="utf-8") as f:
         return json.load(f)        
+
+
+def iter_raw_time_entries(filepath: Path, chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """
+    Yield entries from a raw time entry file one at a time.
+    NDJSON files are read line by line.  Legacy JSON arrays are read in chunks of
+    chunk_size characters, so only the current chunk and entry are held in memory.
+    """
+    if is_ndjson(filepath):
+        yield from iter_ndjson(filepath)
+        return
+
+    decoder = json.JSONDecoder()
+    
+    with filepath.open("r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        opened = False
+
+        def read_more() -> bool:
+            nonlocal buf, pos
+            chunk = f.read(chunk_size)
+            buf = buf[pos:] + chunk
+            pos = 0
+            return bool(chunk)
+
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buf):
+                if not read_more():
+                    raise ValueError(f"{filepath} ended before the closing ]")
+                continue
+
+            if not opened:
+                if buf[pos] != "[":
+                    raise ValueError(f"{filepath} does not contain a JSON array")
+                opened = True
+                pos += 1
+                continue
+
+            if buf[pos] == "]":
+                return
+
+            try:
+                entry, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                #Entry is split across chunks
+                if not read_more():
+                    raise
+                continue
+
+            yield entry
+            pos = end
       
         
         
-def to_time_entries_dataframe(entries: list) -> pd.DataFrame:
-    """Convert a list of time dicts to DataFrame with important keys."""
-    if not entries:
-        return pd.DataFrame()
-        
-    records = []
-    for te in entries:
-        ti = te.get("timeInterval", {}) or {}
-        record = {
-            "id": te.get("id"),
-            "user_id": te.get("userId"),
-            "project_id": te.get("projectID"),
-            "workspace_id": te.get("workspaceId"),
-            "description": te.get("description"),
-            "billable": te.get("billable"),
-            "tag": te.get("tagIDs") or [],
-            "start": ti.get("start"),
-            "end": ti.get("end"),
-            "duration_raw": ti.get("duration"),
-        }
+#ISO8601 duration as Clockify sends it: PT#H#M#S, optionally with days (P#DT...)
+_NUM = r"(\d+\.?\d*|\.\d+)"
+DURATION_PATTERN = (
+    rf"^P(?!$)(?:{_NUM}D)?"
+    rf"(?:T(?:{_NUM}H)?(?:{_NUM}M)?(?:{_NUM}S)?)?$"
+)
+
+
+def durations_to_hours(
+    duration_raw: pd.Series,
+    start: pd.Series | None = None,
+    end: pd.Series | None = None,
+) -> pd.Series:
+    """
+    Vectorized ISO8601 duration parser: duration_raw -> hours (float).
+    Handles days, fractional seconds and null/running entries.  Where the duration
+    is missing or unparseable, falls back to end - start when both are present.
+    Matches the original scalar parser on every PT... duration it accepted.
+    """
+    raw = duration_raw.astype("string")
+    matched = raw.str.match(DURATION_PATTERN).fillna(False).astype(bool)
+
+    parts = raw.str.extract(DURATION_PATTERN).astype(float)
+    days, hours, minutes, seconds = (parts[i] for i in range(4))
+
+    total = days.fillna(0) * 24.0 + hours.fillna(0)
+    total = total + minutes.fillna(0) / 60.0
+    total = total + seconds.fillna(0) / 3600.0
+    total = total.where(matched)
+
+    if start is not None and end is not None:
+        start = pd.to_datetime(start, errors="coerce", utc=True)
+        end = pd.to_datetime(end, errors="coerce", utc=True)
+        elapsed = (end - start).dt.total_seconds() / 3600.0
+        total = total.fillna(elapsed)
+
+    return total.astype(float)
+    
+    
+    
+def time_entry_record(te: dict) -> dict:
+    """Pick the important keys out of one raw Clockify time entry."""
+    ti = te.get("timeInterval", {}) or {}
+    return {
+        "id": te.get("id"),
+        "user_id": te.get("userId"),
+        "project_id": te.get("projectId") or te.get("projectID"),
+        "workspace_id": te.get("workspaceId"),
+        "description": te.get("description"),
+        "billable": te.get("billable"),
+        "tag": te.get("tagIds") or te.get("tagIDs") or [],
+        "start": ti.get("start"),
+        "end": ti.get("end"),
+        "duration_raw": ti.get("duration"),
+    }
+
+
+@metrics.timed("clockify.to_time_entries_frames")
+def to_time_entries_frames(entries: Iterable[dict]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Convert time entry dicts to (time entries, tag bridge) DataFrames.
+    Time entries use the compact dtypes from schema.py; tags are exploded into an
+    (entry_id, tag_id) bridge table instead of a per-row list.
+    Accepts a list or any iterable (e.g. a streaming generator from clockify_client).
+    """
+    records = [time_entry_record(te) for te in entries]
         
-        records.append(record)
+    if not records:
+        return pd.DataFrame(), tag_bridge(pd.DataFrame())
         
     df = pd.DataFrame(records)
     
@@ -51,30 +186,91 @@ def to_time_entries_dataframe(entries: list) -> pd.DataFrame:
     if "end" in df.columns:
         df["end"] = pd.to_datetime(df["end"], errors="coerce")
         
-    def parse_duration_to_hours(d):
-        """Compute duration_hours from duration_raw."""
-        if not isinstance(d, str) or not d.startswith("PT"):
-            return None
-        hours = 0.0
-        num = ""
-        for ch in d[2:]:
-            if ch.isdigit() or ch == ".":
-                num += ch
-            else:
-                if num:
-                    value = float(num)
-                    if ch == "H":
-                        hours += value
-                    elif ch == "M":
-                        hours += value / 60.0
-                    elif ch == "S":
-                        hours += value / 3600.0
-                    num = ""
-        return hours
-    
-    df["duration_hours"] = df["duration_raw"].apply(parse_duration_to_hours)
+    df["duration_hours"] = durations_to_hours(
+        df["duration_raw"],
+        df.get("start"),
+        df.get("end"),
+    )
+
+    metrics.count("rows.time_entries_parsed", len(df))
+    return apply_time_entry_schema(df), tag_bridge(df)
+
+
+
+def to_time_entries_dataframe(entries: Iterable[dict]) -> pd.DataFrame:
+    """Convert time entry dicts to a DataFrame with important keys (compact dtypes, no tag list)."""
+    return to_time_entries_frames(entries)[0]
+
+
+def iter_entry_batches(entries: Iterable[dict], batch_size: int) -> Iterator[list[dict]]:
+    """Group a stream of entries into lists of at most batch_size."""
+    batch: list[dict] = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 
-    return df
+@metrics.timed("clockify.time_entries_to_parquet")
+def time_entries_to_parquet(
+    entries: Iterable[dict],
+    parquet_path: Path | None = None,
+    batch_size: int = TIME_ENTRY_BATCH_SIZE,
+    on_batch: Callable[[pd.DataFrame, pd.DataFrame], None] | None = None,
+) -> int:
+    """
+    Stream time entries through to_time_entries_frames one batch at a time.
+    Memory use is bounded by batch_size, not by the number of entries.
+    -parquet_path: if set, every batch is appended to this processed Parquet file (written
+        to a temp file and swapped in; nothing is written when there are no entries)
+    -on_batch: called with each batch's (time entries, tag bridge) frames, e.g. to upsert them
+    Returns the number of entries processed.
+    """
+    rows = 0
+    writer = None
+    tmp_path = parquet_path.with_name(f".{parquet_path.name}.tmp") if parquet_path is not None else None
+    compression = OUTPUT_POLICY["compression"]
+
+    try:
+        for batch in iter_entry_batches(entries, batch_size):
+            df, tags = to_time_entries_frames(batch)
+            if parquet_path is not None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    #Plain types: each batch's categoricals come with their own dictionaries
+                    writer = pq.ParquetWriter(
+                        tmp_path,
+                        plain_arrow_schema(table.schema).remove_metadata(),
+                        compression=None if compression == "none" else compression,
+                    )
+                writer.write_table(table.cast(writer.schema), row_group_size=OUTPUT_POLICY["row_group_size"])
+            if on_batch is not None:
+                on_batch(df, tags)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if tmp_path is not None and tmp_path.exists():
+        if rows:
+            tmp_path.replace(parquet_path)
+            metrics.count("storage.parquet_rows", rows)
+            metrics.count("storage.parquet_bytes", parquet_path.stat().st_size)
+        else:
+            tmp_path.unlink()
+    return rows
+
+
+def raw_time_entries_to_parquet(
+    raw_filepath: Path,
+    parquet_path: Path,
+    batch_size: int = TIME_ENTRY_BATCH_SIZE,
+) -> int:
+    """Stream a raw time entry file into a processed Parquet file; returns the entries written."""
+    return time_entries_to_parquet(iter_raw_time_entries(raw_filepath), parquet_path, batch_size)
     
 
 
@@ -105,7 +301,7 @@ def to_projects_dataframe(projects: list) -> pd.DataFrame:
         records.append({
             "project_id": p.get("id"),
             "project_name": p.get("name"),
-            "client_name": p.get("clientName") or p.get("client", {}).get("name") if isinstance(p.get("client"), dict) else None,
+            "client_name": p.get("clientName") or (p.get("client") or {}).get("name"),
             "project_archived": p.get("archived"),
         })
         
@@ -120,130 +316,238 @@ def ensure_processed_clockify_dir() -> None:
     
     
     
+def processed_time_entries_name(workspace_id: str, start: str, end: str) -> str:
+    """Base name of the processed file for one raw pull, e.g. time_entries_X_2025-01-01_to_2025-01-31."""
+    start_date = start.split("T")[0]
+    end_date = end.split("T")[0]
+    return f"time_entries_{workspace_id}_{start_date}_to_{end_date}"
+
+
 def save_time_entries_processed(
     df: pd.DataFrame,
     workspace_id: str,
     start: str,
     end: str
 ) -> dict:
-    """Save the processed time entries DataFrame to disk (CSV and PArquet)."""
+    """
+    Save the processed time entries DataFrame to disk as Parquet.
+    CSV is written too when the storage OUTPUT_POLICY asks for it.
+    """
     ensure_processed_clockify_dir()
-    
-    start_date = start.split("T")[0]
-    end_date = end.split("T")[0]
-    base_name = f"time_entries_{workspace_id}_{start_date}_to_{end_date}"
-    
-    csv_path = PROCESSED_CLOCKIFY_DIR / f"{base_name}.csv"
-    parquet_path = PROCESSED_CLOCKIFY_DIR / f"{base_name}.parquet"
-    
-    df.to_csv(csv_path, index=False)
-    df.to_parquet(parquet_path, index=False)
-    
-    return {"csv": csv_path, "parquet": parquet_path}
+    return write_processed(df, PROCESSED_CLOCKIFY_DIR, processed_time_entries_name(workspace_id, start, end))
 
 
 def save_dimension(
     df: pd.DataFrame,
     name: str,
 ) -> dict:
-    """Save dimension DataFrame under data/processed/clockify/"""
+    """Save dimension DataFrame under data/processed/clockify/ (Parquet, CSV per OUTPUT_POLICY)"""
     ensure_processed_clockify_dir()
     
-    csv_path = PROCESSED_CLOCKIFY_DIR / f"{name}.csv"
-    parquet_path = PROCESSED_CLOCKIFY_DIR / f"{name}.parquet"
-    
-    df.to_csv(csv_path, index=False)
-    df.to_parquet(parquet_path, index=False)
-    
-    return {"csv": csv_path, "parquet": parquet_path}
+    return write_processed(df, PROCESSED_CLOCKIFY_DIR, name)
+
+
+
+def save_time_entry_tags(
+    tags: pd.DataFrame,
+    replaced_ids: Iterable[str],
+) -> dict:
+    """
+    Upsert the time entry tag bridge (data/processed/clockify/time_entry_tags.parquet).
+    Rows for replaced_ids (entries just reprocessed or deleted) are swapped for tags.
+    """
+    ensure_processed_clockify_dir()
+
+    path = PROCESSED_CLOCKIFY_DIR / "time_entry_tags.parquet"
+    frames = [tags]
+    if path.exists():
+        existing = pd.read_parquet(path)
+        frames.insert(0, existing[~existing["entry_id"].isin(set(replaced_ids))])
+
+    merged = pd.concat([f for f in frames if not f.empty] or [tags], ignore_index=True)
+    merged = apply_dtypes(merged.astype(object), TAG_BRIDGE_DTYPES)
+    return write_processed(merged, PROCESSED_CLOCKIFY_DIR, "time_entry_tags")
+
+
+
+
+def latest_raw_time_entries_file() -> Path | None:
+    """Most recent raw time entries file (NDJSON or legacy JSON) by name, or None."""
+    raw_files = sorted(
+        list(RAW_CLOCKIFY_DIR.glob(f"time_entries_*{RAW_SUFFIX}"))
+        + list(RAW_CLOCKIFY_DIR.glob("time_entries_*.json")),
+        key=lambda p: p.name,
+    )
+    return raw_files[-1] if raw_files else None
+
+
+
+def load_raw_dimension(name: str, workspace_id: str) -> list:
+    """Raw users/projects landed by extract_clockify, falling back to the (cached) API."""
+    filepath = clockify_dimension_raw_path(name, workspace_id)
+    if filepath.exists():
+        return list(iter_ndjson(filepath))
+    return get_users(workspace_id) if name == "users" else get_projects(workspace_id)
+
+
+
+def build_dimensions(workspace_id: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Build and save dim_users and dim_projects for a workspace."""
+    dim_users = to_users_dataframe(load_raw_dimension("users", workspace_id))
+    dim_projects = to_projects_dataframe(load_raw_dimension("projects", workspace_id))
+
+    user_paths = save_dimension(dim_users, "dim_users")
+    project_paths = save_dimension(dim_projects, "dim_projects")
+
+    print("\nDim tables saved to:")
+    print("Users Parquet", user_paths["parquet"])
+    print("Projects Parquet:", project_paths["parquet"])
+    if user_paths["csv"]:
+        print("Users CSV:", user_paths["csv"])
+        print("Projects CSV:", project_paths["csv"])
+
+    return dim_users, dim_projects
+
+
+
+def transform_clockify(
+    filepath: Path | None = None,
+    incremental: bool = False,
+    workspace_id: str | None = None,
+) -> int:
+    """
+    Transform raw Clockify data into the processed tables.
+    Full mode processes one raw pull (default: the latest) into its own Parquet file and
+    upserts it into the partitioned dataset.  Incremental mode applies only the synced log
+    batches added since the last run (per the raw manifest); on the first run, or after
+    the log was compacted, it replays the whole log and removes entries deleted since.
+    Entries are streamed through in batches of TIME_ENTRY_BATCH_SIZE and each batch is
+    upserted on its own, so memory does not grow with the size of the pull.  The tag
+    bridge is written once per run.
+    Dimension tables are rebuilt either way.  Returns the number of entries processed.
+    -workspace_id: workspace to sync in incremental mode (default CLOCKIFY_WORKSPACE_ID)
+    """
+    partitions: set[Path] = set()
+    seen_ids: set[str] = set()
+    tag_frames: list[pd.DataFrame] = []
+
+    def upsert(df: pd.DataFrame, tags: pd.DataFrame) -> None:
+        partitions.update(upsert_time_entries_dataset(df))
+        tag_frames.append(tags)
+        seen_ids.update(df["id"])
+
+    def save_tags(replaced_ids: set) -> None:
+        if replaced_ids:
+            tags = pd.concat(tag_frames, ignore_index=True) if tag_frames else tag_bridge(pd.DataFrame())
+            save_time_entry_tags(tags, replaced_ids)
+
+    if incremental:
+        workspace_id = workspace_id or get_workspace_id()
+        synced_path = synced_time_entries_path(workspace_id)
+        if not synced_path.exists():
+            #Without a synced store every stored entry would look deleted
+            print(f"No synced time entries for workspace {workspace_id}; run clockify_client.py --incremental first.")
+            build_dimensions(workspace_id)
+            return 0
+
+        batches = load_raw_manifest(synced_path.parent).get(synced_path.name, {}).get("batches", [])
+        applied = load_clockify_transform_state().get(workspace_id, {})
+        applied_count = applied.get("batches", 0)
+        up_to_date = (
+            0 < applied_count <= len(batches)
+            and batches[applied_count - 1]["sha256"] == applied.get("sha256")
+            and time_entries_dataset() is not None
+        )
+
+        if up_to_date:
+            new_batches = batches[applied_count:]
+            entries, deleted_ids = (
+                load_synced_time_entry_changes(workspace_id, new_batches[0]["offset"]) if new_batches else ([], set())
+            )
+            rows = time_entries_to_parquet(entries, on_batch=upsert)
+            print(f"Applied {len(new_batches)} new sync batch(es) for workspace {workspace_id}: {rows} changed entries.")
+        else:
+            #First run, or the log was compacted/rewritten since: replay all of it
+            rows = time_entries_to_parquet(iter_synced_time_entries(workspace_id), on_batch=upsert)
+            print(f"Loaded {rows} synced entries for workspace {workspace_id}.")
+
+            deleted_ids = set()
+            if time_entries_dataset() is not None:
+                stored = read_time_entries_dataset(columns=["id"], filters=[("workspace_id", "=", workspace_id)])
+                deleted_ids = set(stored["id"]) - seen_ids
+
+        if deleted_ids:
+            partitions.update(upsert_time_entries_dataset(pd.DataFrame(), deleted_ids=deleted_ids))
+            print(f"Removed {len(deleted_ids)} deleted entries.")
+        save_tags(seen_ids | deleted_ids)
+
+        if batches:
+            state = load_clockify_transform_state()
+            state[workspace_id] = {"batches": len(batches), "sha256": batches[-1]["sha256"]}
+            save_clockify_transform_state(state)
+
+        print(f"Upserted into {len(partitions)} partition(s) of {TIME_ENTRIES_DATASET_DIR}")
+        build_dimensions(workspace_id)
+        return rows
+
+    if filepath is None:
+        filepath = latest_raw_time_entries_file()
+    if filepath is None:
+        print("No raw Clockify files found in data/raw/clockify.")
+        return 0
+
+    name_parts = filepath.name.split(".")[0].split("_")
+    workspace_id = name_parts[2]
+    start_date = name_parts[3]
+    end_date = name_parts[5]
+
+    start = f"{start_date}T00:00:00Z"
+    end = f"{end_date}T23:59:59Z"
+
+    ensure_processed_clockify_dir()
+    base_name = processed_time_entries_name(workspace_id, start, end)
+    parquet_path = PROCESSED_CLOCKIFY_DIR / f"{base_name}.parquet"
+
+    print(f"Loading raw time entries from: {filepath}")
+    rows = time_entries_to_parquet(iter_raw_time_entries(filepath), parquet_path, on_batch=upsert)
+    save_tags(seen_ids)
+    print(f"Processed {rows} raw entries.")
+    if not rows:
+        print("\nNo data to save (no entries in the raw file).")
+        return rows
+
+    #Exported from the finished Parquet file, per OUTPUT_POLICY (sync or background)
+    csv_path = export_parquet_csv(parquet_path)
+
+    print("\nProcessed data saved to:")
+    print("Parquet:", parquet_path)
+    if csv_path is not None:
+        print("CSV:", csv_path)
+    print(f"Upserted into {len(partitions)} partition(s) of {TIME_ENTRIES_DATASET_DIR}")
+
+    build_dimensions(workspace_id)
+    return rows
 
 
 
 
 if __name__ == "__main__":
     #COME BACK TO THIS!!!  Just testing for now.
-    raw_files = sorted(RAW_CLOCKIFY_DIR.glob("time_entries_*.json"))
-    if not raw_files:
-        print("No raw Clockify files found in data/raw/clockify.")
-    else:
-        filepath = raw_files[-1]
-        print(f"Loading raw time entries from: {filepath}")    
-        
-        entries = load_raw_time_entries(filepath)
-        print(f"Loaded {len(entries)} raw entries.")
-        
-        df = to_time_entries_dataframe(entries)
-        print(f"DataFrame shape: {df.shape}")
+    rows = transform_clockify()
+    print(f"Processed {rows} entries.")
+
+    if rows:
+        df = read_time_entries_dataset().head(1000)
         print("\nSample rows:")
         print(df.head())
-        
-        if df.empty:
-            print("\nNo data to save (DataFrame is empty).")
-        else:
-            name_parts = filepath.stem.split("_")
-            workspace_id = name_parts[2]
-            start_date = name_parts[3]
-            end_date = name_parts[5]
-        
-            start = f"{start_date}T00:00:00Z"
-            end = f"{end_date}T23:59:59Z"
-            
-            paths = save_time_entries_processed(df, workspace_id, start, end)
-            print("\nProcessed data saved to:")
-            print("CSV:", paths["csv"])
-            print("Parquet:", paths["parquet"])     
-            
-            print("\nFetching users and projects for dimensions.")
-            users = get_users(workspace_id)
-            projects = get_projects(workspace_id)
-            
-            dim_users = to_users_dataframe(users)
-            dim_projects = to_projects_dataframe(projects)
-            
-            user_paths = save_dimension(dim_users, "dim_users")
-            project_paths = save_dimension(dim_projects, "dim_projects")
-
-            print("\nDim tables saved to:")
-            print("Users CSV:", user_paths["csv"])
-            print("Users Parquet", user_paths["parquet"])
-            print("Projects CSV:", project_paths["csv"])
-            print("Projects Parquet:", project_paths["parquet"]) 
-            
-            df_with_dims = (
-                df
-                .merge(dim_users, on="user_id", how="left")
-                .merge(dim_projects, on="project_id", how="left")
-            )   
-            
-            print("\nSample rows with user/project names:")
-            print(df_with_dims.head())
-            
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
\ No newline at end of file
+
+        dim_users = pd.read_parquet(PROCESSED_CLOCKIFY_DIR / "dim_users.parquet")
+        dim_projects = pd.read_parquet(PROCESSED_CLOCKIFY_DIR / "dim_projects.parquet")
+        df_with_dims = (
+            df
+            .merge(dim_users, on="user_id", how="left")
+            .merge(dim_projects, on="project_id", how="left")
+        )
+
+        print("\nSample rows with user/project names:")
+        print(df_with_dims.head())
@@ -0,0 +1,319 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import pandas as pd
+import pipeline
+from pipeline import Stage
+from schema import TAG_BRIDGE_DTYPES, apply_dtypes
+from storage import (
+    PROCESSED_CLOCKIFY_DIR,
+    PROCESSED_PAYCOR_DIR,
+    TIME_ENTRIES_DATASET_DIR,
+    save_paycor_file_processed,
+    write_processed,
+)
+
+"""
+Ingestion for several Clockify workspaces and Paycor legal entities at once.
+
+Workspaces come from CLOCKIFY_WORKSPACE_IDS and legal entities from PAYCOR_COMPANY_IDS
+(comma-separated; the single CLOCKIFY_WORKSPACE_ID/PAYCOR_COMPANY_ID still work).  Each
+one is extracted and transformed in its own process, under its own root:
+
+    data/entities/clockify_<workspace_id>/data/raw/clockify, .../data/processed/clockify
+    data/entities/paycor_<legal_entity_id>/data/raw/paycor, .../data/processed/paycor
+
+Every path in the ETL is relative to the working directory, so a worker just runs the
+usual extract/transform stages (with their own content-hash skipping) from its root.
+When all of them are done the entities' processed tables are merged into data/processed
+and unify/cubes run once over the combined data, so a refresh takes about as long as the
+slowest entity rather than the sum of all of them.
+
+All workspaces share one Clockify API key and all legal entities one Paycor key, so each
+worker is throttled to its share of that key's rate limit (the limit divided by how many
+workers of the same source can run at once).
+
+Usage:
+    python src/entities.py [--incremental] [--offline] [--force] [--workers N]
+"""
+
+
+ENTITIES_DIR = Path("data/entities")
+SOURCES = ("clockify", "paycor")
+
+
+
+def entity_name(source: str, entity_id: str) -> str:
+    return f"{source}_{entity_id}"
+
+
+
+def entity_root(source: str, entity_id: str) -> Path:
+    """
+    Root directory an entity's worker runs in (absolute, so it survives the chdir).
+    Resolved against the current directory: call it from the project root.
+    """
+    return (ENTITIES_DIR / entity_name(source, entity_id)).resolve()
+
+
+
+def ingest_entity(
+    source: str,
+    entity_id: str,
+    incremental: bool = False,
+    extract: bool = True,
+    start: str = "2025-01-01T00:00:00Z",
+    end: str = "2025-01-31T23:59:59Z",
+    force: bool = False,
+    requests_per_second: float | None = None,
+    root: Path | None = None,
+) -> dict:
+    """
+    Run one workspace's or legal entity's extract/transform stages in its root directory.
+    Meant to run in a worker process: it changes the working directory for the run and
+    changes it back afterwards, so a reused worker starts the next entity where it began.
+    -requests_per_second: this worker's share of the source's API rate limit (default: all of it)
+    -root: absolute entity root (default: entity_root() of the current directory)
+    Returns {"status": ran|failed, "seconds": ..., "stages": {stage name: result}}.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"source must be one of {SOURCES}, got {source!r}")
+
+    if source == "clockify":
+        stages = pipeline.clockify_stages(incremental, extract, start, end, workspace_id=entity_id)
+    else:
+        stages = pipeline.paycor_stages(extract, legal_entity_id=entity_id, start=start, end=end)
+
+    if requests_per_second:
+        import clockify_client
+        import paycor_client
+        client = clockify_client if source == "clockify" else paycor_client
+        client.set_requests_per_second(requests_per_second)
+
+    #Stage modules are imported by now, so module-level paths that must stay shared
+    #(the Paycor token cache) were resolved against the project root
+    root = Path(root) if root is not None else entity_root(source, entity_id)
+    root.mkdir(parents=True, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(root)
+
+    started = time.perf_counter()
+    try:
+        results = pipeline.run_pipeline(stages, force=force)
+    finally:
+        os.chdir(cwd)
+    failed = any(r["status"] in ("failed", "blocked") for r in results.values())
+    return {
+        "status": "failed" if failed else "ran",
+        "seconds": time.perf_counter() - started,
+        "stages": results,
+    }
+
+
+
+def ingest_entities(
+    workspace_ids: list[str],
+    company_ids: list[str],
+    incremental: bool = False,
+    extract: bool = True,
+    start: str = "2025-01-01T00:00:00Z",
+    end: str = "2025-01-31T23:59:59Z",
+    max_workers: int | None = None,
+    force: bool = False,
+) -> dict:
+    """
+    Ingest every workspace and legal entity in parallel, one process each.
+    -max_workers: processes to use (default: one per entity)
+    Returns {entity name: result of ingest_entity}.  Raises RuntimeError once all
+    entities have finished if any of them failed.
+    """
+    jobs = [("clockify", w) for w in workspace_ids] + [("paycor", c) for c in company_ids]
+    if not jobs:
+        raise RuntimeError("No Clockify workspaces or Paycor legal entities configured.")
+
+    import clockify_client
+    import paycor_client
+
+    if extract and company_ids:
+        #Refresh the Paycor token once up front; workers then read it from the token cache
+        #instead of racing each other to rotate the refresh token
+        paycor_client.get_access_token_from_refresh()
+
+    #Rate limits are per API key, and every worker of a source uses the same key
+    workers = max_workers or len(jobs)
+    key_limits = {
+        "clockify": clockify_client.CLOCKIFY_REQUESTS_PER_SECOND,
+        "paycor": paycor_client.PAYCOR_REQUESTS_PER_SECOND,
+    }
+    worker_rates = {
+        source: key_limits[source] / max(1, min(workers, sum(1 for s, _ in jobs if s == source)))
+        for source in SOURCES
+    }
+
+    results = {}
+    started = time.perf_counter()
+    #spawn, not fork: this runs on a pipeline stage thread
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {
+            #Roots are resolved here, in the project root, not in the (reused) workers
+            pool.submit(
+                ingest_entity, source, entity_id, incremental, extract, start, end, force, worker_rates[source],
+                entity_root(source, entity_id),
+            ): entity_name(source, entity_id)
+            for source, entity_id in jobs
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = {"status": "failed", "seconds": time.perf_counter() - started, "error": repr(e)}
+            print(f"[entities] {name}: {results[name]['status']} in {results[name]['seconds']:.2f}s")
+
+    print("\n[entities] timings:")
+    for name in sorted(results, key=lambda n: results[n]["seconds"], reverse=True):
+        print(f"  {name:<40} {results[name]['status']:<8} {results[name]['seconds']:8.2f}s")
+    print(f"  {'total (wall)':<40} {'':<8} {time.perf_counter() - started:8.2f}s")
+
+    failed = sorted(name for name, r in results.items() if r["status"] == "failed")
+    if failed:
+        raise RuntimeError(f"Ingestion failed for: {', '.join(failed)}")
+    return results
+
+
+
+def _read_entity_tables(roots: dict[str, Path], relative_path: Path, id_col: str | None = None) -> list[pd.DataFrame]:
+    """The table at relative_path under each root that has it; id_col gets the entity id added."""
+    frames = []
+    for entity_id, root in roots.items():
+        path = root / relative_path
+        if not path.exists():
+            continue
+        df = pd.read_parquet(path)
+        if id_col:
+            df[id_col] = entity_id
+        frames.append(df)
+    return frames
+
+
+
+def _replace_workspace_partitions(workspace_id: str, root: Path) -> bool:
+    """Swap the combined dataset's workspace_id=X directory for the entity's copy."""
+    source = root / TIME_ENTRIES_DATASET_DIR / f"workspace_id={workspace_id}"
+    if not source.exists():
+        return False
+
+    target = TIME_ENTRIES_DATASET_DIR / f"workspace_id={workspace_id}"
+    #Dot-prefixed, so dataset discovery ignores it while it is being copied
+    tmp = TIME_ENTRIES_DATASET_DIR / f".workspace_id={workspace_id}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    shutil.copytree(source, tmp)
+    shutil.rmtree(target, ignore_errors=True)
+    tmp.replace(target)
+    return True
+
+
+
+def merge_entities(workspace_ids: list[str], company_ids: list[str]) -> list[Path]:
+    """
+    Combine the entities' processed tables into data/processed for unify and cubes.
+    Time entry partitions are copied per workspace; dim_users, dim_projects and the tag
+    bridge are concatenated across workspaces; employees_dim and payrate_history across
+    legal entities, with a legal_entity_id column.  Returns the paths written.
+    """
+    import clockify_transform
+
+    clockify_roots = {w: entity_root("clockify", w) for w in workspace_ids}
+    paycor_roots = {c: entity_root("paycor", c) for c in company_ids}
+    written = []
+
+    TIME_ENTRIES_DATASET_DIR.mkdir(parents=True, exist_ok=True)
+    for workspace_id, root in clockify_roots.items():
+        if _replace_workspace_partitions(workspace_id, root):
+            written.append(TIME_ENTRIES_DATASET_DIR / f"workspace_id={workspace_id}")
+
+    dim_keys = {"dim_users": "user_id", "dim_projects": "project_id"}
+    for name, key in dim_keys.items():
+        frames = _read_entity_tables(clockify_roots, PROCESSED_CLOCKIFY_DIR / f"{name}.parquet")
+        if frames:
+            #Users can belong to several workspaces
+            dim = pd.concat(frames, ignore_index=True).drop_duplicates(key)
+            written.append(clockify_transform.save_dimension(dim, name)["parquet"])
+
+    frames = _read_entity_tables(clockify_roots, PROCESSED_CLOCKIFY_DIR / "time_entry_tags.parquet")
+    if frames:
+        tags = apply_dtypes(pd.concat(frames, ignore_index=True).astype(object), TAG_BRIDGE_DTYPES)
+        written.append(write_processed(tags, PROCESSED_CLOCKIFY_DIR, "time_entry_tags")["parquet"])
+
+    for name in ("employees_dim", "payrate_history"):
+        frames = _read_entity_tables(paycor_roots, PROCESSED_PAYCOR_DIR / f"{name}.parquet", id_col="legal_entity_id")
+        if frames:
+            written.append(save_paycor_file_processed(pd.concat(frames, ignore_index=True), name)["parquet"])
+
+    print(f"[entities] merged {len(clockify_roots)} workspace(s) and {len(paycor_roots)} legal entities into data/processed")
+    return written
+
+
+
+def build_entity_stages(
+    incremental: bool = False,
+    extract: bool = True,
+    start: str = "2025-01-01T00:00:00Z",
+    end: str = "2025-01-31T23:59:59Z",
+    workspace_ids: list[str] | None = None,
+    company_ids: list[str] | None = None,
+    max_workers: int | None = None,
+    force: bool = False,
+) -> list[Stage]:
+    """
+    The multi-entity refresh DAG:
+        entities (one process per workspace/legal entity) -> merge_entities -> unify -> cubes
+    -workspace_ids,company_ids: default to CLOCKIFY_WORKSPACE_IDS and PAYCOR_COMPANY_IDS
+    """
+    import clockify_client
+    import paycor_client
+
+    workspace_ids = workspace_ids if workspace_ids is not None else clockify_client.get_workspace_ids()
+    company_ids = company_ids if company_ids is not None else paycor_client.get_company_ids()
+
+    entity_processed_dirs = (
+        [entity_root("clockify", w) / PROCESSED_CLOCKIFY_DIR for w in workspace_ids]
+        + [entity_root("paycor", c) / PROCESSED_PAYCOR_DIR for c in company_ids]
+    )
+
+    return [
+        Stage(
+            "entities",
+            lambda: ingest_entities(workspace_ids, company_ids, incremental, extract, start, end, max_workers, force),
+        ),
+        Stage(
+            "merge_entities",
+            lambda: merge_entities(workspace_ids, company_ids),
+            deps=["entities"],
+            inputs=entity_processed_dirs,
+            outputs=[PROCESSED_CLOCKIFY_DIR / "dim_users.parquet", PROCESSED_PAYCOR_DIR / "payrate_history.parquet"],
+        ),
+        *pipeline.unify_stages(incremental, deps=["merge_entities"]),
+    ]
+
+
+
+if __name__ == "__main__":
+    workers = None
+    if "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+
+    stages = build_entity_stages(
+        incremental="--incremental" in sys.argv,
+        extract="--offline" not in sys.argv,
+        max_workers=workers,
+        force="--force" in sys.argv,
+    )
+    results = pipeline.run_pipeline(stages, force="--force" in sys.argv)
+    if any(r["status"] in ("failed", "blocked") for r in results.values()):
+        sys.exit(1)
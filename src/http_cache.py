@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+import metrics
+
+"""
+Local HTTP response cache for slow-changing API endpoints (users, projects,
+workspaces, Paycor employees).
+
+Responses are keyed by URL and query params and kept both in memory (shared by all
+pipeline stages in one process) and on disk under data/cache/http (shared across runs).
+When the API sent an ETag or Last-Modified header, a cached response is revalidated
+with a conditional request and a 304 reuses the cached body.  Otherwise the cached
+body is served until it is older than the TTL.
+"""
+
+
+HTTP_CACHE_DIR = Path("data/cache/http")
+DEFAULT_TTL_SECONDS = float(os.getenv("HTTP_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+CACHE_DISABLED = os.getenv("HTTP_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+_memory: dict[str, dict] = {}
+_memory_lock = threading.Lock()
+
+
+
+def cache_key(url: str, params: dict | None = None) -> str:
+    """Stable cache key for a URL plus query params."""
+    raw = json.dumps([url, sorted((params or {}).items())], default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+
+def _entry_path(key: str) -> Path:
+    return HTTP_CACHE_DIR / f"{key}.json"
+
+
+
+def load_entry(key: str) -> dict | None:
+    """Return the cached entry for key from disk, or None."""
+    path = _entry_path(key)
+    if not path.exists():
+        return None
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+
+def save_entry(key: str, entry: dict) -> None:
+    """Store an entry in memory and atomically on disk."""
+    with _memory_lock:
+        _memory[key] = entry
+
+    HTTP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    tmp_path.replace(path)
+
+
+
+def clear_cache(memory_only: bool = False) -> None:
+    """Drop cached responses (in memory, and on disk unless memory_only)."""
+    with _memory_lock:
+        _memory.clear()
+    if not memory_only and HTTP_CACHE_DIR.exists():
+        for path in HTTP_CACHE_DIR.glob("*.json"):
+            path.unlink()
+
+
+
+def cached_get(
+    send: Callable[[dict], Any],
+    url: str,
+    params: dict | None = None,
+    ttl: float | None = None,
+) -> Any:
+    """
+    Return the JSON body for url/params, using the cache where possible.
+    -send: callable taking extra request headers and returning a requests.Response;
+        it does the actual (rate-limited, authenticated) GET
+    -ttl: seconds a response without validators stays fresh (default DEFAULT_TTL_SECONDS)
+    Responses fetched or revalidated earlier in this process are reused without a request.
+    Error responses (4xx/5xx) raise requests.HTTPError; only 200s are cached.
+    Don't use this for continuation pages of a paged endpoint (see cached_records).
+    """
+    if CACHE_DISABLED:
+        return send({}).json()
+
+    if ttl is None:
+        ttl = DEFAULT_TTL_SECONDS
+
+    key = cache_key(url, params)
+
+    #Already fetched or revalidated earlier in this run
+    with _memory_lock:
+        entry = _memory.get(key)
+    if entry is not None:
+        metrics.count("http_cache.memory_hits")
+        return entry["body"]
+
+    entry = load_entry(key)
+    now = time.time()
+
+    extra_headers = {}
+    if entry is not None:
+        has_validators = bool(entry.get("etag") or entry.get("last_modified"))
+        if not has_validators and now - entry["fetched_at"] < ttl:
+            with _memory_lock:
+                _memory[key] = entry
+            metrics.count("http_cache.disk_hits")
+            return entry["body"]
+
+        if entry.get("etag"):
+            extra_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            extra_headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = send(extra_headers)
+
+    if response.status_code == 304 and entry is not None:
+        metrics.count("http_cache.revalidated")
+        entry = dict(entry, fetched_at=now)
+        save_entry(key, entry)
+        return entry["body"]
+
+    metrics.count("http_cache.misses")
+    response.raise_for_status()
+    body = response.json()
+    if response.status_code == 200:
+        save_entry(key, {
+            "url": url,
+            "params": params,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": now,
+            "body": body,
+        })
+    return body
+
+
+
+def cached_records(
+    fetch: Callable[[], list],
+    url: str,
+    params: dict | None = None,
+    ttl: float | None = None,
+) -> list:
+    """
+    Return the records of a whole paged listing, cached as one entry.
+    -fetch: callable returning every record (following all continuation pages)
+    Continuation tokens belong to the listing they came from, so pages are never cached
+    one by one; the combined records are served until older than ttl, then re-fetched.
+    """
+    if CACHE_DISABLED:
+        return fetch()
+
+    if ttl is None:
+        ttl = DEFAULT_TTL_SECONDS
+
+    key = cache_key(url, dict(params or {}, _listing="all_pages"))
+
+    with _memory_lock:
+        entry = _memory.get(key)
+    if entry is not None:
+        metrics.count("http_cache.memory_hits")
+        return entry["body"]
+
+    entry = load_entry(key)
+    now = time.time()
+    if entry is not None and now - entry["fetched_at"] < ttl:
+        with _memory_lock:
+            _memory[key] = entry
+        metrics.count("http_cache.disk_hits")
+        return entry["body"]
+
+    metrics.count("http_cache.misses")
+    records = fetch()
+    save_entry(key, {"url": url, "params": params, "fetched_at": now, "body": records})
+    return records
@@ -0,0 +1,127 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+"""
+Shared HTTP layer for the API clients (Clockify, Paycor).
+Each service gets one pooled requests.Session, so connections (and TLS handshakes)
+are reused across calls, with retry/backoff on 5xx responses and connection errors.
+"""
+
+
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_POOL_SIZE = 16
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+    -rate: tokens added per second
+    -capacity: maximum burst size (defaults to rate)
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def set_rate(self, rate: float, capacity: float | None = None) -> None:
+        """Change the refill rate (and burst size, defaulting to the new rate)."""
+        with self.lock:
+            self.rate = rate
+            self.capacity = capacity if capacity is not None else rate
+            self.tokens = min(self.tokens, self.capacity)
+
+
+
+def backoff_delay(attempt: int, base: float, retry_after: str | None = None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based).
+    Uses Retry-After when the server sent one, else exponential backoff; adds jitter either way.
+    """
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = base * 2 ** attempt
+    return delay + random.uniform(0, delay)
+
+
+
+def build_session(
+    headers: dict | None = None,
+    retries: int = DEFAULT_RETRIES,
+    backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+    pool_size: int = DEFAULT_POOL_SIZE,
+) -> requests.Session:
+    """
+    Build a requests.Session with a keep-alive connection pool and retries.
+    -headers: default headers sent on every request
+    -retries: retry attempts on connection errors and 5xx responses
+    -backoff_factor: urllib3 backoff factor between retries
+    -pool_size: connections kept per host (should be >= the number of worker threads)
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+
+def get_session(service: str, headers: dict | None = None, **options) -> requests.Session:
+    """
+    Return the shared session for a service, creating it on first use.
+    headers and options (see build_session) only apply when the session is created.
+    """
+    with _sessions_lock:
+        session = _sessions.get(service)
+        if session is None:
+            session = build_session(headers=headers, **options)
+            _sessions[service] = session
+        return session
+
+
+
+def reset_sessions() -> None:
+    """Close and forget all shared sessions (e.g. after credentials change)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,187 @@
+from pathlib import Path
+import sys
+import pandas as pd
+from storage import write_parquet
+from transform_unify import UNIFIED_DIR, load_dimensions
+
+"""
+Pre-aggregated cost cubes for the dashboard, built from fact_time_costed joined with
+dim_projects and dim_users.
+
+One cube per grain (day, week, month), each with one row per
+period x client x project x employee holding total/billable/non-billable hours and
+cost.  Revenue (and so margin) will be added once the QuickBooks pipeline exists;
+the cube layout leaves room for those columns.
+
+Cubes are maintained incrementally: update_cubes() re-aggregates only the periods
+touched by changed facts (or by renamed users, projects and clients) and swaps those
+rows in.
+"""
+
+
+FACT_FILE = UNIFIED_DIR / "fact_time_costed.parquet"
+CUBES_DIR = UNIFIED_DIR / "cubes"
+CUBE_STATE_FILE = CUBES_DIR / "_fact_state.parquet"
+GRAINS = {
+    "day": "D",
+    "week": "W-SUN",
+    "month": "M",
+}
+DIMENSION_COLS = ["client_name", "project_id", "project_name", "user_id", "user_name", "paycor_emp_id"]
+MEASURE_COLS = [
+    "hours",
+    "billable_hours",
+    "non_billable_hours",
+    "cost",
+    "billable_cost",
+    "non_billable_cost",
+    "entry_count",
+]
+FACT_HASH_COLS = [
+    "id", "user_id", "paycor_emp_id", "project_id", "start", "duration_hours", "billable", "cost",
+    #Dimension attributes joined onto the fact, so a rename re-aggregates its periods
+    "user_name", "project_name", "client_name",
+]
+
+
+
+def cube_path(grain: str) -> Path:
+    return CUBES_DIR / f"cost_by_{grain}.parquet"
+
+
+
+def period_start(start: pd.Series, grain: str) -> pd.Series:
+    """First day of the day/week/month containing each (UTC) entry start."""
+    start = pd.to_datetime(start, errors="coerce", utc=True).dt.tz_convert(None)
+    return start.dt.to_period(GRAINS[grain]).dt.start_time
+
+
+
+def enrich_facts(
+    fact: pd.DataFrame,
+    dim_users: pd.DataFrame,
+    dim_projects: pd.DataFrame,
+) -> pd.DataFrame:
+    """Join facts with user and project dimensions and split hours/cost by billable."""
+    df = (
+        fact
+        .merge(dim_users[["user_id", "user_name"]], on="user_id", how="left")
+        .merge(dim_projects[["project_id", "project_name", "client_name"]], on="project_id", how="left")
+    )
+
+    billable = df["billable"].astype("boolean").fillna(False).astype(bool)
+    hours = df["duration_hours"].astype("float64").fillna(0.0)
+    cost = df["cost"].astype("float64").fillna(0.0)
+
+    df["hours"] = hours
+    df["billable_hours"] = hours.where(billable, 0.0)
+    df["non_billable_hours"] = hours.where(~billable, 0.0)
+    df["cost"] = cost
+    df["billable_cost"] = cost.where(billable, 0.0)
+    df["non_billable_cost"] = cost.where(~billable, 0.0)
+    df["entry_count"] = 1
+    return df
+
+
+
+def aggregate(enriched: pd.DataFrame, grain: str) -> pd.DataFrame:
+    """Roll enriched facts up to one row per period and dimension combination."""
+    df = enriched.copy()
+    df["period_start"] = period_start(df["start"], grain)
+
+    keys = ["period_start", *DIMENSION_COLS]
+    for col in DIMENSION_COLS:
+        df[col] = df[col].astype("string").fillna("(none)")
+
+    cube = df.groupby(keys, sort=True, observed=True)[MEASURE_COLS].sum().reset_index()
+    cube.insert(0, "grain", grain)
+    return cube
+
+
+
+def _fact_state(enriched: pd.DataFrame) -> pd.DataFrame:
+    """Per-row content hash (of enriched facts) plus start, enough to find the periods a later change touches."""
+    cols = [c for c in FACT_HASH_COLS if c in enriched.columns]
+    return pd.DataFrame({
+        "id": enriched["id"].astype("string"),
+        "row_hash": pd.util.hash_pandas_object(enriched[cols].astype("string"), index=False).to_numpy(),
+        "start": pd.to_datetime(enriched["start"], errors="coerce", utc=True),
+    })
+
+
+
+def build_cubes(fact: pd.DataFrame | None = None) -> dict[str, Path]:
+    """Build every cube from scratch and save them under unified/cubes/."""
+    if fact is None:
+        fact = pd.read_parquet(FACT_FILE)
+    dim_users, dim_projects = load_dimensions()
+    enriched = enrich_facts(fact, dim_users, dim_projects)
+
+    CUBES_DIR.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for grain in GRAINS:
+        paths[grain] = write_parquet(aggregate(enriched, grain), cube_path(grain))
+    write_parquet(_fact_state(enriched), CUBE_STATE_FILE)
+    return paths
+
+
+
+def update_cubes(fact: pd.DataFrame | None = None) -> dict[str, Path]:
+    """
+    Incrementally refresh the cubes after fact_time_costed changed.
+    Facts are compared with the snapshot saved by the last cube build; only periods
+    holding an added, changed or removed row (old and new start dates both count) are
+    re-aggregated and swapped into each cube.  The snapshot hashes the user, project and
+    client names joined onto each fact, so dim_users/dim_projects changes count too.
+    Falls back to build_cubes() when there are no cubes or snapshot yet.
+    """
+    if fact is None:
+        fact = pd.read_parquet(FACT_FILE)
+    if not CUBE_STATE_FILE.exists() or not all(cube_path(g).exists() for g in GRAINS):
+        return build_cubes(fact)
+
+    dim_users, dim_projects = load_dimensions()
+    enriched = enrich_facts(fact, dim_users, dim_projects)
+    previous = pd.read_parquet(CUBE_STATE_FILE)
+    current = _fact_state(enriched)
+    changed_starts = pd.concat([
+        current.loc[~current["row_hash"].isin(previous["row_hash"]), "start"],
+        previous.loc[~previous["row_hash"].isin(current["row_hash"]), "start"],
+    ])
+    if changed_starts.empty:
+        return {grain: cube_path(grain) for grain in GRAINS}
+
+    paths = {}
+    for grain in GRAINS:
+        touched = set(period_start(changed_starts, grain).dropna())
+        in_touched = period_start(enriched["start"], grain).isin(touched).to_numpy()
+        fresh = aggregate(enriched[in_touched], grain)
+
+        cube = pd.read_parquet(cube_path(grain))
+        cube = cube[~cube["period_start"].isin(touched)]
+        #Both are empty when every fact in the touched periods was deleted
+        frames = [f for f in (cube, fresh) if not f.empty] or [cube]
+        cube = pd.concat(frames, ignore_index=True)
+        cube = cube.sort_values(["period_start", *DIMENSION_COLS], kind="stable", ignore_index=True)
+        paths[grain] = write_parquet(cube, cube_path(grain))
+
+    write_parquet(current, CUBE_STATE_FILE)
+    return paths
+
+
+
+def load_cube(grain: str = "month") -> pd.DataFrame:
+    """Read a saved cube (day, week or month)."""
+    return pd.read_parquet(cube_path(grain))
+
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    grain_arg = args[0] if args else "month"
+    paths = update_cubes() if "--incremental" in sys.argv else build_cubes()
+    for grain, path in paths.items():
+        print(f"Saved {grain} cube to {path}")
+
+    print(f"\nSample of the {grain_arg} cube:")
+    print(load_cube(grain_arg).head())
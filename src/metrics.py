@@ -0,0 +1,240 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+
+"""
+Lightweight run metrics for the ETL: stage/function timings, counters (rows, bytes,
+HTTP calls, retries) and latency distributions, collected in-process and written as
+one JSON line per run to data/metrics/runs.jsonl.
+
+    with timer("unify.attach_pay_rates"): ...
+    @timed("clockify.transform")
+    count("rows.fact_time_costed", len(df))
+    observe("http.clockify.latency_s", seconds)
+
+Opt-in profiling per stage (see profile_stage) is controlled by HIHR_PROFILE:
+"cpu" writes a cProfile dump, "mem" records the tracemalloc peak and top allocations,
+"cpu,mem" does both.  HIHR_METRICS_DISABLED=1 turns collection off.
+"""
+
+
+METRICS_DIR = Path("data/metrics")
+METRICS_RUN_LOG = METRICS_DIR / "runs.jsonl"
+PROFILE_DIR = METRICS_DIR / "profiles"
+PROFILE_MODES = {m.strip() for m in os.getenv("HIHR_PROFILE", "").lower().split(",") if m.strip()}
+METRICS_DISABLED = os.getenv("HIHR_METRICS_DISABLED", "").lower() in ("1", "true", "yes")
+TOP_ALLOCATIONS = 10
+
+
+
+class RunMetrics:
+    """Thread-safe collector for one pipeline run."""
+
+    def __init__(self, run_id: str | None = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started_at = datetime.now(timezone.utc)
+        self.timers: dict[str, dict] = {}
+        self.counters: dict[str, float] = {}
+        self.observations: dict[str, list[float]] = {}
+        self.profiles: dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self.lock:
+            entry = self.timers.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        with self.lock:
+            self.observations.setdefault(name, []).append(value)
+
+    def summary(self) -> dict:
+        """JSON-ready snapshot: timers, counters, and p50/p95/max per observed series."""
+        with self.lock:
+            distributions = {}
+            for name, values in self.observations.items():
+                ordered = sorted(values)
+                distributions[name] = {
+                    "count": len(ordered),
+                    "p50": ordered[len(ordered) // 2],
+                    "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    "max": ordered[-1],
+                    "total": sum(ordered),
+                }
+            return {
+                "run_id": self.run_id,
+                "started_at": self.started_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "finished_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "timers": {k: dict(v) for k, v in self.timers.items()},
+                "counters": dict(self.counters),
+                "distributions": distributions,
+                "profiles": dict(self.profiles),
+            }
+
+
+
+_run = RunMetrics()
+_run_lock = threading.Lock()
+
+#Stages profiling memory at the same time share one tracemalloc session
+_tracing_users = 0
+_tracing_lock = threading.Lock()
+
+
+
+def current_run() -> RunMetrics:
+    return _run
+
+
+
+def start_run(run_id: str | None = None) -> RunMetrics:
+    """Begin collecting into a fresh RunMetrics (e.g. at the start of a pipeline run)."""
+    global _run
+    with _run_lock:
+        _run = RunMetrics(run_id)
+        return _run
+
+
+
+def count(name: str, value: float = 1) -> None:
+    """Add value to a counter (rows, bytes, calls, retries, ...)."""
+    if not METRICS_DISABLED:
+        _run.count(name, value)
+
+
+
+def observe(name: str, value: float) -> None:
+    """Record one sample of a distribution (e.g. a request latency in seconds)."""
+    if not METRICS_DISABLED:
+        _run.observe(name, value)
+
+
+
+@contextmanager
+def timer(name: str):
+    """Time the enclosed block under name (also when it raises)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if not METRICS_DISABLED:
+            _run.add_time(name, time.perf_counter() - started)
+
+
+
+def timed(name: str | None = None):
+    """Decorator timing every call of a function (default name: module.function)."""
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+
+def _start_tracing() -> None:
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+        tracemalloc.reset_peak()
+
+
+
+def _stop_tracing() -> dict:
+    """Peak and top allocation sites since the last reset; stops tracing when no stage needs it."""
+    global _tracing_users
+    with _tracing_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics("lineno")[:TOP_ALLOCATIONS]
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+    return {
+        "peak_bytes": peak,
+        "top_allocations": [{"where": str(stat.traceback), "bytes": stat.size} for stat in top],
+    }
+
+
+
+@contextmanager
+def profile_stage(name: str, modes: set[str] | None = None):
+    """
+    Time a stage and, when enabled, profile it.
+    -modes: {"cpu", "mem"}; defaults to HIHR_PROFILE
+    CPU profiles go to data/metrics/profiles/<run_id>_<name>.prof (open with pstats or
+    snakeviz).  Memory profiling records the traced peak and top allocation sites in the
+    run's "profiles" section.  tracemalloc is process-wide, so memory numbers for stages
+    that run concurrently overlap.
+    """
+    modes = PROFILE_MODES if modes is None else modes
+    profiler = cProfile.Profile() if "cpu" in modes else None
+    trace_mem = "mem" in modes
+    if trace_mem:
+        _start_tracing()
+
+    try:
+        with timer(f"stage.{name}"):
+            if profiler is not None:
+                try:
+                    profiler.enable()
+                except ValueError:
+                    #Newer Pythons allow only one active profiler across threads
+                    profiler = None
+            try:
+                yield
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+    finally:
+        profile = {}
+        if profiler is not None:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            path = PROFILE_DIR / f"{_run.run_id}_{name}.prof"
+            profiler.dump_stats(str(path))
+            profile["cpu_profile"] = str(path)
+        if trace_mem:
+            profile.update(_stop_tracing())
+        if profile:
+            with _run.lock:
+                _run.profiles[name] = profile
+
+
+
+def write_run(path: Path | None = None, **extra) -> Path:
+    """Append the current run's summary (plus any extra fields) as one JSON line."""
+    path = Path(path or METRICS_RUN_LOG)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    record = {**_run.summary(), **extra}
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+    return path
+
+
+
+def load_runs(path: Path | None = None) -> list[dict]:
+    """All run records from the JSON lines log, oldest first."""
+    path = Path(path or METRICS_RUN_LOG)
+    if not path.exists():
+        return []
+    with path.open("r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
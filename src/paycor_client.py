@@ -1,16 +1,56 @@
 import os
+import json
+import threading
+import sys
+import time
 from dotenv import load_dotenv
-from typing import Any
-import requests
-from storage import save_paycor_employees_raw, save_paycor_payrates_raw, save_paycor_payruns_raw, save_employee_earnings
-from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator
+from http_client import TokenBucket, backoff_delay, get_session
+from http_cache import DEFAULT_TTL_SECONDS, cached_get, cached_records
+import metrics
+from storage import save_paycor_employees_raw, save_paycor_payrates_raw, save_paycor_payruns_raw
 
 load_dotenv()
 
+#Per-employee pay rate pulls share this many pooled connections
+PAYCOR_POOL_SIZE = 16
+
+#APIM subscription limits are per key; override with PAYCOR_REQUESTS_PER_SECOND
+PAYCOR_REQUESTS_PER_SECOND = float(os.getenv("PAYCOR_REQUESTS_PER_SECOND", "10"))
+PAYCOR_MAX_RETRIES = 5
+PAYCOR_BACKOFF_SECONDS = 1.0
+
+#The employee list rarely changes; it is served through the local HTTP cache
+EMPLOYEE_CACHE_TTL = DEFAULT_TTL_SECONDS
+
+#Default on-disk access token cache; set PAYCOR_TOKEN_CACHE="" to keep it in memory only
+PAYCOR_TOKEN_CACHE_FILE = ".paycor_token_cache.json"
+
+
+def get_company_ids(required: bool = True) -> list[str]:
+    """
+    Read the Paycor legal entities to ingest: PAYCOR_COMPANY_IDS (comma-separated),
+    falling back to the single PAYCOR_COMPANY_ID.
+    """
+    raw = os.getenv("PAYCOR_COMPANY_IDS") or os.getenv("PAYCOR_COMPANY_ID") or ""
+    company_ids = [c.strip() for c in raw.split(",") if c.strip()]
+    if required and not company_ids:
+        raise RuntimeError("Neither PAYCOR_COMPANY_IDS nor PAYCOR_COMPANY_ID is set in the environment or .env file.")
+    return company_ids
+
+
+
+@lru_cache(maxsize=None)
 def get_paycor_credentials() -> dict:
-    """Read the Paycor credentials from environment variables and return a dict."""
+    """
+    Read the Paycor credentials from environment variables and return a dict.
+    Cached for the process; don't mutate the returned dict.
+    """
     PAYCOR_CLIENT_ID = os.getenv("PAYCOR_CLIENT_ID")
-    PAYCOR_COMPANY_ID = os.getenv("PAYCOR_COMPANY_ID")
+    PAYCOR_COMPANY_ID = os.getenv("PAYCOR_COMPANY_ID") or next(iter(get_company_ids(required=False)), None)
     PAYCOR_CLIENT_SECRET = os.getenv("PAYCOR_CLIENT_SECRET")
     
     if not PAYCOR_CLIENT_ID or not PAYCOR_COMPANY_ID or not PAYCOR_CLIENT_SECRET:
@@ -29,26 +69,50 @@ def get_paycor_credentials() -> dict:
     
 
 
-def get_paycor_headers(access_token: str) -> dict:
-    """Construct the headers required by the Paycor API."""
+@lru_cache(maxsize=None)
+def get_paycor_subscription_key() -> str:
+    """Read the Paycor APIM subscription key from environment variables (cached)."""
     subscription_key = os.getenv("PAYCOR_APIM_SUBSCRIPTION_KEY")
     if not subscription_key:
         raise RuntimeError(
             "PAYCOR_APIM_SUBSCRIPTION_KEY is not set in the envrionment or .env"
         )
-        
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Ocp-Apim-Subscription-Key": subscription_key,
-        "Content-Type": "application/json"
-    }
-    
-    return headers
+    return subscription_key
+
+
+
+@lru_cache(maxsize=None)
+def get_paycor_base_url() -> str:
+    """Read the Paycor API base URL from environment variables (cached)."""
+    base_url = os.getenv("PAYCOR_BASE_URL")
+    if not base_url:
+        raise RuntimeError("PAYCOR_BASE_URL is not set in the environment or .env file.")
+    return base_url.rstrip("/")
+
+
+
+def get_paycor_session():
+    """
+    Shared, pooled HTTP session for the Paycor API.
+    Carries the subscription key; the bearer token is added per request.
+    """
+    return get_session(
+        "paycor",
+        headers={
+            "Ocp-Apim-Subscription-Key": get_paycor_subscription_key(),
+            "Content-Type": "application/json",
+        },
+        pool_size=PAYCOR_POOL_SIZE,
+    )
 
     
     
-def get_access_token_from_refresh() -> str:
-    """Use stored Paycor refresh token to request a new access token."""
+def request_paycor_tokens(refresh_token: str) -> dict:
+    """
+    Exchange a refresh token for a new access token at the Paycor token endpoint.
+    Returns the raw token response (access_token, expires_in, and possibly a
+    rotated refresh_token).
+    """
     creds = get_paycor_credentials()
     client_id = creds["client_id"]
     client_secret = creds["client_secret"]
@@ -59,12 +123,6 @@ def get_access_token_from_refresh() -> str:
             "PAYCOR_TOKEN_URL not set in .env"
         )
     
-    refresh_token = os.getenv("PAYCOR_REFRESH_TOKEN")
-    if not refresh_token:
-        raise RuntimeError(
-            "PAYCOR_REFRESH_TOKEN not set in .env"
-        )
-    
     data = {
         "grant_type": "refresh_token",
         "refresh_token": refresh_token,
@@ -72,7 +130,7 @@ def get_access_token_from_refresh() -> str:
         "client_secret": client_secret,
     }
     
-    response = requests.post(token_url, data=data)
+    response = get_session("paycor_auth").post(token_url, data=data)
     
     """DETELE THIS LATER, JUST FOR DEBUGGING
     if response.status_code >= 400:
@@ -83,55 +141,244 @@ def get_access_token_from_refresh() -> str:
     response.raise_for_status()
     
     token_data = response.json()
-    access_token = token_data.get("access_token")
-    if not access_token:
+    if not token_data.get("access_token"):
         raise RuntimeError(
             f"Token endpoint did not return an access_token.  Response was: {token_data}"
         )
     
-    return access_token
+    return token_data
+
+
+
+class PaycorTokenManager:
+    """
+    Caches the Paycor access token until shortly before it expires.
+
+    The token is kept in memory and, if cache_path is set, in a JSON file readable
+    only by the current user, so separate pipeline stages and runs can reuse it.
+    Rotated refresh tokens returned by the token endpoint are saved to the same file
+    and used for the next refresh.  If PAYCOR_REFRESH_TOKEN in .env is changed by
+    hand, the new value wins over a previously rotated one.
+    -cache_path: on-disk token cache, or None for memory only
+    -expiry_margin: seconds before expires_in at which the token is treated as expired
+    """
+
+    def __init__(self, cache_path: Path | None = None, expiry_margin: int = 60):
+        self.cache_path = cache_path
+        self.expiry_margin = expiry_margin
+        self.lock = threading.Lock()
+        self.state: dict = {}
+        self.loaded = False
+
+    def _load(self) -> None:
+        if self.loaded:
+            return
+        self.loaded = True
+        if self.cache_path is None or not self.cache_path.exists():
+            return
+        try:
+            with self.cache_path.open("r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+
+    def _save(self) -> None:
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        #Write a temp file and swap it in, so other processes never read a half-written cache
+        tmp_path = self.cache_path.with_name(f".{self.cache_path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.chmod(tmp_path, 0o600)
+        tmp_path.replace(self.cache_path)
+
+    def _refresh_token(self) -> str:
+        env_token = os.getenv("PAYCOR_REFRESH_TOKEN")
+        if self.state.get("refresh_token") and self.state.get("env_refresh_token") == env_token:
+            return self.state["refresh_token"]
+        if not env_token:
+            raise RuntimeError(
+                "PAYCOR_REFRESH_TOKEN not set in .env"
+            )
+        return env_token
+
+    def _is_valid(self) -> bool:
+        token = self.state.get("access_token")
+        expires_at = self.state.get("expires_at") or 0
+        return bool(token) and time.time() < expires_at - self.expiry_margin
+
+    def get_access_token(self, force_refresh: bool = False) -> str:
+        """Return a valid access token, refreshing it only when needed."""
+        with self.lock:
+            self._load()
+            if not force_refresh and self._is_valid():
+                return self.state["access_token"]
+
+            refresh_token = self._refresh_token()
+            token_data = request_paycor_tokens(refresh_token)
+            expires_in = float(token_data.get("expires_in") or 0)
+            self.state = {
+                "access_token": token_data["access_token"],
+                "expires_at": time.time() + expires_in,
+                "refresh_token": token_data.get("refresh_token") or refresh_token,
+                "env_refresh_token": os.getenv("PAYCOR_REFRESH_TOKEN"),
+            }
+            self._save()
+            return self.state["access_token"]
+
+    def invalidate(self, access_token: str | None = None) -> None:
+        """
+        Forget the cached access token.
+        If access_token is given, only forget it if it is still the cached one
+        (so concurrent 401s don't trigger several refreshes).
+        """
+        with self.lock:
+            self._load()
+            if access_token is None or self.state.get("access_token") == access_token:
+                self.state.pop("access_token", None)
+                self.state.pop("expires_at", None)
+
+
+
+#Resolved now so workers running in another directory (see entities.py) share the same cache
+_cache_path = os.getenv("PAYCOR_TOKEN_CACHE", PAYCOR_TOKEN_CACHE_FILE)
+token_manager = PaycorTokenManager(Path(_cache_path).resolve() if _cache_path else None)
+
+_rate_limiter = TokenBucket(PAYCOR_REQUESTS_PER_SECOND)
+
+
+
+def set_requests_per_second(rate: float) -> None:
+    """Throttle this process to rate requests/s, e.g. its share when several processes use one key."""
+    _rate_limiter.set_rate(rate)
+
+
+
+def get_access_token_from_refresh() -> str:
+    """
+    Return a Paycor access token, using the stored refresh token only when
+    the cached access token is missing or about to expire.
+    """
+    return token_manager.get_access_token()
     
 
     
-def paycor_get(path: str, access_token: str, params: dict | None = None) -> dict:
+def _send_paycor_get(request_url: str, headers: dict, params: dict | None):
+    """
+    Send one GET through the Paycor session and APIM rate limiter.
+    429 responses are retried with exponential backoff plus jitter.
+    """
+    session = get_paycor_session()
+    for attempt in range(PAYCOR_MAX_RETRIES + 1):
+        _rate_limiter.acquire()
+        started = time.perf_counter()
+        response = session.get(request_url, headers=headers, params=params)
+        metrics.observe("http.paycor.latency_s", time.perf_counter() - started)
+        metrics.count("http.paycor.calls")
+        metrics.count("http.paycor.bytes", len(response.content))
+        if response.status_code != 429 or attempt == PAYCOR_MAX_RETRIES:
+            break
+        metrics.count("http.paycor.retries")
+        time.sleep(backoff_delay(attempt, PAYCOR_BACKOFF_SECONDS, response.headers.get("Retry-After")))
+    return response
+
+
+    
+def paycor_get(
+    path: str,
+    access_token: str | None = None,
+    params: dict | None = None,
+    cache_ttl: float | None = None,
+) -> dict:
     """
     Make a GET request to Paycor API using the relative path and access token.
+    If access_token is None (the normal case), the cached token from token_manager is used,
+    refreshed when it is about to expire.
+    On a 401 the token is refreshed and the request retried once.
+    Raises requests.HTTPError if the final response is an error (4xx/5xx).
+    -cache_ttl: if set, serve the response through the local HTTP cache
+        (ETag/Last-Modified revalidation, else this many seconds of freshness)
     Return the parsed JSON response as a dict.
     """
     
-    base_url = os.getenv("PAYCOR_BASE_URL")
-    if not base_url:
-        raise RuntimeError("PAYCOR_BASE_URL is not set in the environment or .env file.")
-    base_url = base_url.rstrip("/")
     path = path.lstrip("/")
-    request_url = f"{base_url}/{path}"
-    
-    headers = get_paycor_headers(access_token)
-    
-    response = requests.get(request_url, headers=headers, params=params)
+    request_url = f"{get_paycor_base_url()}/{path}"
+
+    def send(extra_headers: dict):
+        token = access_token or token_manager.get_access_token()
+        headers = {"Authorization": f"Bearer {token}", **extra_headers}
+
+        response = _send_paycor_get(request_url, headers, params)
+
+        if response.status_code == 401:
+            token_manager.invalidate(token)
+            headers["Authorization"] = f"Bearer {token_manager.get_access_token()}"
+            response = _send_paycor_get(request_url, headers, params)
 
-    """Debugging helper, delete later:"""
-    if not response.ok:
-        print("Paycor GET error:", response.status_code, response.text)
+        #Once retries are used up an error must not pass for an empty page of data
+        if not response.ok:
+            print("Paycor GET error:", response.status_code, response.text)
+        response.raise_for_status()
+        return response
 
-    #response.raise_for_status()
+    if cache_ttl is None:
+        return send({}).json()
 
-    return response.json()
+    return cached_get(send, request_url, params, ttl=cache_ttl)
 
     
 
     
+def iter_paycor_records(
+    path: str,
+    access_token: str | None = None,
+    params: dict | None = None,
+    cache_ttl: float | None = None,
+) -> Iterator[dict]:
+    """
+    Yield every record from a paged Paycor endpoint.
+    Follows continuationToken until the API reports no more results.
+    -cache_ttl: if set, cache the whole listing (all pages) as one entry for this many
+        seconds; continuation pages are never cached on their own, since their tokens
+        belong to the listing they came from
+    """
+    if cache_ttl is not None:
+        request_url = f"{get_paycor_base_url()}/{path.lstrip('/')}"
+        yield from cached_records(
+            lambda: list(iter_paycor_records(path, access_token, params)),
+            request_url,
+            params,
+            ttl=cache_ttl,
+        )
+        return
+
+    params = dict(params or {})
+
+    while True:
+        page = paycor_get(path, access_token, params=params)
+        yield from page.get("records") or []
+
+        token = page.get("continuationToken")
+        if not token or page.get("hasMoreResults") is False:
+            break
+        params["continuationToken"] = token
+
+
+
 def get_employees_identifying_data(
-    access_token: str,
+    access_token: str | None = None,
     include_status: list[str] | None = None,
     continuation_token: str | None = None,
+    legal_entity_id: str | None = None,
 ) -> dict[str, Any]:
     """
-    Fetch employee data for all employees in the workspace.
+    Fetch one page of employee data for the legal entity (default: PAYCOR_COMPANY_ID).
     Uses Paycor's API endpoint /v1/legalentities/{legalEntityId}/employeesIdentifyingData
+    Use get_all_employees_identifying_data to follow continuation tokens.
     """
-    creds = get_paycor_credentials()
-    legal_entity_id = creds["company_id"]
+    legal_entity_id = legal_entity_id or get_paycor_credentials()["company_id"]
     
     path = f"v1/legalentities/{legal_entity_id}/employeesIdentifyingData"
     
@@ -144,42 +391,114 @@ def get_employees_identifying_data(
     emp_info =  paycor_get(path, access_token, params=params)
     
     return emp_info
+
+
+
+def iter_employees_identifying_data(
+    access_token: str | None = None,
+    include_status: list[str] | None = None,
+    legal_entity_id: str | None = None,
+) -> Iterator[dict]:
+    """Yield employee records for the legal entity (default: PAYCOR_COMPANY_ID) across all result pages."""
+    legal_entity_id = legal_entity_id or get_paycor_credentials()["company_id"]
+    
+    path = f"v1/legalentities/{legal_entity_id}/employeesIdentifyingData"
+    
+    params: dict[str, Any] = {}
+    if include_status:
+        params["include"] = include_status
+    
+    yield from iter_paycor_records(path, access_token, params=params, cache_ttl=EMPLOYEE_CACHE_TTL)
+
+
+
+def get_all_employees_identifying_data(
+    access_token: str | None = None,
+    include_status: list[str] | None = None,
+    legal_entity_id: str | None = None,
+) -> dict[str, Any]:
+    """
+    Fetch employee data for all employees in the legal entity, every page.
+    Returns the same shape as a single page, with all records combined.
+    """
+    records = list(iter_employees_identifying_data(access_token, include_status, legal_entity_id))
+    return {"hasMoreResults": False, "records": records}
     
     
     
 def get_pay_data_for_user(
-    access_token: str,
+    access_token: str | None,
     employee_id: str,
     continuation_token: str | None = None,
-) -> list:
+) -> dict:
     """
-    Fetch pay rates for a single user.
+    Fetch pay rates for a single user, following continuation tokens.
+    Returns {"records": [...]}.
     """
-    creds = get_paycor_credentials()
-    legal_entity_id = creds["company_id"]
-    
     path = f"v1/employees/{employee_id}/payrates"
     
-    user_pay_data = paycor_get(path, access_token)
+    params = {"continuationToken": continuation_token} if continuation_token else None
+    records = list(iter_paycor_records(path, access_token, params=params))
    
-    return user_pay_data
+    return {"records": records}
 
 
     
 def get_pay_rates_for_all_users(
-    access_token: str,
+    access_token: str | None,
     employees: list[dict],
     continuation_token: str | None = None,
+    max_workers: int = 1,
+    latencies: dict | None = None,
 ) -> dict:
     """
     Fetch pay rates for all users in a legal entity.
-    Combines results into a unified list.
+    Combines results into a dict keyed by employeeId, in the order of employees.
+    -max_workers: number of employees fetched concurrently; all requests still go
+        through the Paycor rate limiter in paycor_get
+    -latencies: optional dict filled with {employeeId: seconds} per employee
+    Every employee is attempted; if any of them failed, RuntimeError lists them all
+    (an employee silently missing pay rates would leave their time uncosted).
     """
+    if latencies is None:
+        latencies = {}
+    failed: dict[str, str] = {}
+
+    def fetch(e: dict) -> dict | None:
+        started = time.perf_counter()
+        try:
+            rates = get_pay_data_for_user(access_token, e["employeeId"])
+        except Exception as error:
+            failed[e["employeeId"]] = repr(error)
+            return None
+        latencies[e["employeeId"]] = time.perf_counter() - started
+        return rates
+
+    started = time.perf_counter()
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(fetch, employees))
+    else:
+        results = [fetch(e) for e in employees]
+    elapsed = time.perf_counter() - started
+
+    if failed:
+        metrics.count("paycor.payrate_failures", len(failed))
+        details = "; ".join(f"{emp_id}: {error}" for emp_id, error in sorted(failed.items()))
+        raise RuntimeError(f"Pay rate pull failed for {len(failed)} of {len(employees)} employees: {details}")
+
     all_employee_rates = {}
-    
-    for e in employees:
-        e_id = e["employeeId"]
-        all_employee_rates[e_id] = get_pay_data_for_user(access_token, e_id)
+    for e, rates in zip(employees, results):
+        all_employee_rates[e["employeeId"]] = rates
+
+    if latencies:
+        ordered = sorted(latencies.values())
+        p50 = ordered[len(ordered) // 2]
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        print(
+            f"Fetched pay rates for {len(employees)} employees in {elapsed:.1f}s "
+            f"(per employee p50 {p50:.2f}s, p95 {p95:.2f}s, max {ordered[-1]:.2f}s)"
+        )
         
     return all_employee_rates
 
@@ -188,18 +507,23 @@ def get_pay_rates_for_all_users(
 
 def get_payruns(
         access_token: str,
+        start: str,
+        end: str,
         continuation_token: str | None = None,
+        legal_entity_id: str | None = None,
 ) -> dict:
-    """Returns payrun data for a date range."""
+    """
+    Returns payrun data for payrolls with a check date between start and end (inclusive).
+    -start,end: YYYY-MM-DD (an ISO8601 timestamp is cut to its date)
+    """
 
-    creds = get_paycor_credentials()
-    legal_entity_id = creds["company_id"]
+    legal_entity_id = legal_entity_id or get_paycor_credentials()["company_id"]
 
     path = f"v1/legalentities/{legal_entity_id}/paydata"
 
     params = {
-        "fromCheckDate": start,
-        "toCheckDate": end,
+        "fromCheckDate": start[:10],
+        "toCheckDate": end[:10],
     }
 
     if continuation_token:
@@ -210,37 +534,51 @@ def get_payruns(
     return payrun
 
 
-    
-if __name__ == "__main__":
-    access_token = get_access_token_from_refresh()
 
-    #Get employees
-    employees_response = get_employees_identifying_data(access_token)
+def extract_paycor(
+    max_workers: int = 8,
+    legal_entity_id: str | None = None,
+    start: str = "2025-01-01",
+    end: str = "2025-01-31",
+) -> list[Path]:
+    """
+    Pull employees (every page), pay rate history and payruns into data/raw/paycor.
+    -legal_entity_id: defaults to PAYCOR_COMPANY_ID
+    -start,end: check date range of the payruns pulled
+    Returns the raw files written.
+    """
+    #Fail fast on bad credentials.  No token is passed on below: paycor_get asks token_manager
+    #for every request, so a token that expires mid-extract is refreshed once, not sent stale
+    get_access_token_from_refresh()
+    access_token = None
+
+    #Get employees (every page)
+    employees_response = get_all_employees_identifying_data(access_token, legal_entity_id=legal_entity_id)
     employees = employees_response["records"]
 
     #Save raw employee JSON
-    save_paycor_employees_raw(employees_response)
+    paths = [save_paycor_employees_raw(employees_response)]
 
     #Get payrate history for each employee
-    payrates = get_pay_rates_for_all_users(access_token, employees)
+    payrates = get_pay_rates_for_all_users(access_token, employees, max_workers=max_workers)
 
     #Save raw payrate JSON
-    save_paycor_payrates_raw(payrates)
+    paths.append(save_paycor_payrates_raw(payrates))
 
     #Get raw payruns
-    start = "2025-01-01T00:00:00Z"
-    end = "2025-01-31T23:59:59Z"
-    payruns = get_payruns(access_token)
+    payruns = get_payruns(access_token, start, end, legal_entity_id=legal_entity_id)
+    paths.append(save_paycor_payruns_raw(payruns))
 
-    save_paycor_payruns_raw(payruns)
+    return paths
 
-    print("Saved raw Paycor data → data/raw/paycor/")
 
-    
-    
-    
-    
-    
-    
-    
-    
\ No newline at end of file
+
+if __name__ == "__main__":
+    #python src/paycor_client.py [start end]  (payrun check dates, YYYY-MM-DD)
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) == 2:
+        extract_paycor(start=args[0], end=args[1])
+    else:
+        extract_paycor()
+
+    print("Saved raw Paycor data → data/raw/paycor/")
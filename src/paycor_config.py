@@ -4,6 +4,9 @@ import csv
 CONFIG_DIR = Path("config")
 PROJECT_PAY_RATE_OVERRIDES_FILE = CONFIG_DIR / "project_pay_rate_overrides.csv"
 
+#filepath -> (mtime_ns, rules); rules are reloaded only when the CSV changes
+_overrides_cache: dict[Path, tuple[int, list[dict]]] = {}
+
 
 
 def load_project_pay_rate_overrides(filepath: Path | None = None) -> list[dict]:
@@ -11,26 +14,32 @@ def load_project_pay_rate_overrides(filepath: Path | None = None) -> list[dict]:
     Lead the project pay rate overrides CSV into a list of dictionaries.
     Each dict is one override rule (keys are taken from headers).
     If filepath is not provided, it defaults to config/project_pay_rate_overrides.csv
+    The parsed rules are cached and only re-read when the file's mtime changes.
     """
     if filepath is None:
         filepath = PROJECT_PAY_RATE_OVERRIDES_FILE
-   
-   overrides: list[dict] = []
-   
+    filepath = Path(filepath)
+
+    mtime = filepath.stat().st_mtime_ns
+    cached = _overrides_cache.get(filepath)
+    if cached is not None and cached[0] == mtime:
+        return [dict(rule) for rule in cached[1]]
+
+    overrides: list[dict] = []
+
     with filepath.open("r", encoding="utf-8") as f:
         reader = csv.DictReader(f)
-        
+
         for row in reader:
-            if not any(row.value()):
+            if not any(row.values()):
                 continue
-                
+
             clean_row = {
                 key: (value.strip() if isinstance(value, str) else value)
                 for key, value in row.items()
             }
-            
+
             overrides.append(clean_row)
-        
-        return overrides
-    
- 
+
+    _overrides_cache[filepath] = (mtime, overrides)
+    return [dict(rule) for rule in overrides]
@@ -1,7 +1,7 @@
 from pathlib import Path
 import json
 import pandas as pd
-from storage import save_paycor_file_processed
+from storage import RAW_SUFFIX, iter_ndjson, save_paycor_file_processed
 
 """
 This file pulls the raw data files from /data/raw/paycor and better-ify-s them.
@@ -24,6 +24,32 @@ The function above makes sense to be here, but it's identical to a function  in
 clockify_transform.py -- it doesn't make sense to put it somewhere else . . . but it feels
 wasteful to have two identical functions.  Should I be importing it?
 """
+
+
+def raw_paycor_path(name: str) -> Path:
+    """Raw Paycor landing file for name: the NDJSON file if present, else legacy JSON."""
+    ndjson_path = RAW_PAYCOR_DIR / f"{name}{RAW_SUFFIX}"
+    if ndjson_path.exists():
+        return ndjson_path
+    return RAW_PAYCOR_DIR / f"{name}.json"
+
+
+def load_raw_payrates(filepath: Path) -> list[dict]:
+    """
+    Load raw pay rates as flat records (each with emp_id).
+    NDJSON files are already flat and are streamed line by line; legacy JSON
+    ({employeeId: {"records": [...]}}) is flattened.
+    """
+    if filepath.name.endswith(RAW_SUFFIX):
+        return list(iter_ndjson(filepath))
+    return flatten_payrates(load_paycor_file(filepath))
+
+
+def load_raw_employees(filepath: Path) -> dict:
+    """Load raw employees as {"records": [...]}, from NDJSON or legacy JSON."""
+    if filepath.name.endswith(RAW_SUFFIX):
+        return {"records": list(iter_ndjson(filepath))}
+    return load_paycor_file(filepath)
         
         
 def flatten_payrates(raw: dict) -> list[dict]:
@@ -77,9 +103,8 @@ def to_pay_rate_dataframe(payrates: list) -> pd.DataFrame:
 
 
 def paycor_payrates_to_dataframe(raw_filepath: Path) -> pd.DataFrame:
-    """Loads JSON, flattens structure and builds Dataframe."""
-    raw_files = load_paycor_file(raw_filepath)
-    flat = flatten_payrates(raw_files)
+    """Loads raw pay rates, flattens structure and builds Dataframe."""
+    flat = load_raw_payrates(raw_filepath)
     df = to_pay_rate_dataframe(flat)
     return df
 
@@ -105,9 +130,8 @@ def employees_to_dataframe(raw: dict) -> pd.DataFrame:
 
 def build_fact_payrate_history() -> None:
     """Build and save the pay rate history table from raw Paycor JSON."""
-    raw_path = RAW_PAYCOR_DIR / "payrates_all_employees.json"
-    raw_files = load_paycor_file(raw_path)
-    flat = flatten_payrates(raw_files)
+    raw_path = raw_paycor_path("payrates_all_employees")
+    flat = load_raw_payrates(raw_path)
     df_rates = to_pay_rate_dataframe(flat)
     save_paycor_file_processed(df_rates, name="payrate_history")
     print("Saved processed pay rate history to data/processed/paycor/payrate_history.*")
@@ -115,27 +139,21 @@ def build_fact_payrate_history() -> None:
 
 def build_dim_employee() -> None:
     """Build and save the employee dimension table from raw Paycor JSON."""
-    raw_path = RAW_PAYCOR_DIR / "employee_identifying_info.json"
-    raw_employees = load_paycor_file(raw_path)
+    raw_path = raw_paycor_path("employee_identifying_info")
+    raw_employees = load_raw_employees(raw_path)
     df_employees = employees_to_dataframe(raw_employees)
     save_paycor_file_processed(df_employees, name="employees_dim")
     print("Saved dim_employee to data/processed/paycor/employees_dim.*")
 
 
+def transform_paycor() -> None:
+    """Build the processed Paycor tables (employee dimension, pay rate history) from raw data."""
+    build_dim_employee()
+    build_fact_payrate_history()
 
 
 
-if __name__ == "__main__":
-    raw_rates_path = RAW_PAYCOR_DIR / "payrates_all_employees.json"
-    raw_emps_path = RAW_PAYCOR_DIR / "employee_identifying_info.json"
-    raw_employees = load_paycor_file(raw_emps_path)
-    df_rates = paycor_payrates_to_dataframe(raw_rates_path)
-    df_employees = employees_to_dataframe(raw_employees)
-    name = f"payrates_all_employees_{pd.Timestamp.today().date()}"
-    save_paycor_file_processed(df_rates, "payrate_history")
-    save_paycor_file_processed(df_employees, "employees_dim")
-
-    build_dim_employee()
-    build_fact_payrate_history()
 
 
+if __name__ == "__main__":
+    transform_paycor()
@@ -0,0 +1,173 @@
+from pathlib import Path
+import threading
+import numpy as np
+import pandas as pd
+
+"""
+Point-in-time pay rate lookups ("what was employee X's rate on date D").
+
+PayRateIndex is built once from payrate_history.parquet (as produced by
+paycor_transform.to_pay_rate_dataframe) and keeps, per employee, sorted arrays of
+effective start/end dates so a lookup is a binary search.  load_payrate_index()
+memoizes the index per file modification time, so repeated calls are cheap.
+
+Lookup rules match transform_unify.attach_pay_rates: the rate with the latest
+start_date on or before the date wins, as long as the date is on or before its
+end_date (open-ended rates run until 2100-01-01).
+"""
+
+
+PAYRATE_HISTORY_FILE = Path("data/processed/paycor/payrate_history.parquet")
+FAR_FUTURE = pd.Timestamp("2100-01-01", tz="UTC")
+
+_index_cache: dict[Path, tuple[int, "PayRateIndex"]] = {}
+_index_lock = threading.Lock()
+
+
+
+def _to_utc_ns(values) -> np.ndarray:
+    """Convert dates/timestamps to int64 UTC nanoseconds (NaT -> int64 min)."""
+    stamps = pd.to_datetime(pd.Series(values), errors="coerce", utc=True)
+    return stamps.dt.tz_convert(None).dt.as_unit("ns").to_numpy().view("int64")
+
+
+def _stamp_ns(when) -> int | None:
+    """Convert one date/timestamp to UTC nanoseconds (naive values are taken as UTC)."""
+    stamp = pd.Timestamp(when)
+    if pd.isna(stamp):
+        return None
+    stamp = stamp.tz_localize("UTC") if stamp.tzinfo is None else stamp.tz_convert("UTC")
+    return stamp.as_unit("ns").value
+
+
+
+class PayRateIndex:
+    """
+    Per-employee interval index over pay rate history.
+    -df_rates: pay rate history with emp_id, start_date, end_date and rate
+        (or hourly_rate) columns
+    """
+
+    def __init__(self, df_rates: pd.DataFrame):
+        rate_col = "hourly_rate" if "hourly_rate" in df_rates.columns else "rate"
+
+        rates = pd.DataFrame({
+            "emp_id": df_rates["emp_id"],
+            "start": _to_utc_ns(df_rates["start_date"]),
+            "end": _to_utc_ns(
+                df_rates["end_date"] if "end_date" in df_rates.columns else pd.Series(pd.NaT, index=df_rates.index)
+            ),
+            "rate": pd.to_numeric(df_rates[rate_col], errors="coerce"),
+            "rate_id": df_rates["id"] if "id" in df_rates.columns else None,
+        })
+        nat = np.iinfo(np.int64).min
+        rates = rates[rates["emp_id"].notna() & (rates["start"] != nat)].copy()
+        rates.loc[rates["end"] == nat, "end"] = FAR_FUTURE.value
+        rates = rates.sort_values(["emp_id", "start"], kind="stable")
+
+        #emp_id -> (starts, ends, rates, rate_ids), each sorted by start
+        self.intervals: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+        for emp_id, group in rates.groupby("emp_id", sort=False):
+            self.intervals[str(emp_id)] = (
+                group["start"].to_numpy(),
+                group["end"].to_numpy(),
+                group["rate"].to_numpy(dtype=float),
+                group["rate_id"].to_numpy(dtype=object),
+            )
+
+    def _position(self, emp_id: str, when: int) -> int | None:
+        """Index of the applicable interval for emp_id at when (ns), or None."""
+        found = self.intervals.get(str(emp_id))
+        if found is None:
+            return None
+        starts, ends, _, _ = found
+
+        i = int(np.searchsorted(starts, when, side="right")) - 1
+        #Usually the latest start covers the date; walk back only for overlapping intervals
+        while i >= 0:
+            if when <= ends[i]:
+                return i
+            i -= 1
+        return None
+
+    def lookup(self, emp_id: str, when) -> float | None:
+        """Hourly rate for emp_id on date/timestamp when, or None."""
+        stamp = _stamp_ns(when)
+        i = None if stamp is None else self._position(emp_id, stamp)
+        if i is None:
+            return None
+        return float(self.intervals[str(emp_id)][2][i])
+
+    def lookup_rate_id(self, emp_id: str, when) -> str | None:
+        """Pay rate record id in effect for emp_id on date when, or None."""
+        stamp = _stamp_ns(when)
+        i = None if stamp is None else self._position(emp_id, stamp)
+        if i is None:
+            return None
+        return self.intervals[str(emp_id)][3][i]
+
+    def lookup_many(self, emp_ids, whens) -> np.ndarray:
+        """
+        Vectorized lookup: hourly rate for each (emp_id, when) pair, NaN where none applies.
+        -emp_ids: array-like of employee ids
+        -whens: array-like of dates/timestamps (same length)
+        """
+        emp_ids = np.asarray(emp_ids, dtype=object)
+        stamps = _to_utc_ns(whens)
+        out = np.full(len(emp_ids), np.nan)
+        nat = np.iinfo(np.int64).min
+
+        codes, uniques = pd.factorize(emp_ids, use_na_sentinel=True)
+
+        #Group row numbers by employee once: sort by code, then slice each run
+        valid = np.flatnonzero((codes >= 0) & (stamps != nat))
+        grouped = valid[np.argsort(codes[valid], kind="stable")]
+        group_codes, group_starts = np.unique(codes[grouped], return_index=True)
+        group_ends = np.append(group_starts[1:], len(grouped))
+
+        for code, first, last in zip(group_codes, group_starts, group_ends):
+            emp_id = uniques[code]
+            found = self.intervals.get(str(emp_id))
+            if found is None:
+                continue
+            starts, ends, rates, _ = found
+
+            rows = grouped[first:last]
+            when = stamps[rows]
+            pos = np.searchsorted(starts, when, side="right") - 1
+            hit = (pos >= 0) & (when <= ends[np.maximum(pos, 0)])
+            out[rows[hit]] = rates[pos[hit]]
+
+            #Rows whose latest interval had already ended may still fall in an earlier one
+            for row in rows[(pos >= 0) & ~hit]:
+                i = self._position(emp_id, stamps[row])
+                if i is not None:
+                    out[row] = rates[i]
+
+        return out
+
+
+
+def load_payrate_index(path: Path | None = None) -> PayRateIndex:
+    """
+    Return the PayRateIndex for a payrate_history.parquet file.
+    The index is rebuilt only when the file's modification time changes.
+    """
+    path = Path(path or PAYRATE_HISTORY_FILE)
+    mtime = path.stat().st_mtime_ns
+
+    with _index_lock:
+        cached = _index_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    index = PayRateIndex(pd.read_parquet(path))
+    with _index_lock:
+        _index_cache[path] = (mtime, index)
+    return index
+
+
+
+def rate_on(emp_id: str, when, path: Path | None = None) -> float | None:
+    """Convenience lookup: employee emp_id's hourly rate on date when."""
+    return load_payrate_index(path).lookup(emp_id, when)
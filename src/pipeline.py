@@ -0,0 +1,330 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+import hashlib
+import json
+import sys
+import time
+from typing import Callable, Iterable
+import metrics
+from storage import PROCESSED_CLOCKIFY_DIR, PROCESSED_PAYCOR_DIR, RAW_CLOCKIFY_DIR, RAW_PAYCOR_DIR, RAW_MANIFEST_NAME
+
+"""
+Single entry point for the whole refresh: extract -> transform -> unify -> cubes.
+
+Stages declare their dependencies and run on a thread pool as soon as those are done,
+so the Clockify and Paycor branches run side by side and the refresh takes as long as
+its critical path.  Each stage also declares the files it reads; when their content
+hash matches the last successful run (and its outputs still exist) the stage is skipped.
+
+Usage:
+    python src/pipeline.py [--incremental] [--offline] [--force]
+    --incremental: incremental Clockify sync and fact/cube updates
+    --offline: skip the API extract stages and rebuild from what is on disk
+    --force: run every stage even if its inputs are unchanged
+"""
+
+
+PIPELINE_STATE_FILE = Path("data/processed/_pipeline_state.json")
+CONFIG_DIR = Path("config")
+UNIFIED_DIR = Path("data/processed/unified")
+
+#Bookkeeping files that change on every write without changing the data
+IGNORED_INPUT_NAMES = {RAW_MANIFEST_NAME, "sync_state.json"}
+HASH_CHUNK_SIZE = 1 << 20
+
+
+
+class Stage:
+    """
+    One pipeline step.
+    -name: unique stage name
+    -func: callable run with no arguments
+    -deps: names of stages that must finish first
+    -inputs: files/directories whose content decides whether the stage can be skipped;
+        a stage without inputs (e.g. an API pull) always runs
+    -outputs: files/directories the stage produces; it is never skipped while one is missing
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], object],
+        deps: Iterable[str] = (),
+        inputs: Iterable[Path] = (),
+        outputs: Iterable[Path] = (),
+    ):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.inputs = tuple(Path(p) for p in inputs)
+        self.outputs = tuple(Path(p) for p in outputs)
+
+
+
+def _input_files(paths: Iterable[Path]) -> list[Path]:
+    files = []
+    for path in paths:
+        if path.is_dir():
+            candidates = path.rglob("*")
+        elif path.exists():
+            candidates = [path]
+        else:
+            continue
+        files.extend(
+            f for f in candidates
+            if f.is_file() and f.name not in IGNORED_INPUT_NAMES and not f.name.startswith(".")
+        )
+    return sorted(set(files))
+
+
+
+def hash_inputs(paths: Iterable[Path]) -> str:
+    """Content hash over every file under paths (names and bytes)."""
+    digest = hashlib.sha256()
+    for filepath in _input_files(paths):
+        digest.update(str(filepath).encode("utf-8"))
+        with filepath.open("rb") as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+
+def load_pipeline_state() -> dict:
+    """Input hashes of each stage's last successful run: {stage name: sha256}."""
+    if not PIPELINE_STATE_FILE.exists():
+        return {}
+    with PIPELINE_STATE_FILE.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+
+def save_pipeline_state(state: dict) -> None:
+    PIPELINE_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = PIPELINE_STATE_FILE.with_suffix(".json.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    tmp_path.replace(PIPELINE_STATE_FILE)
+
+
+
+def _run_stage(stage: Stage, previous_hash: str | None, force: bool) -> dict:
+    """Run (or skip) one stage; returns its result record."""
+    started = time.perf_counter()
+    input_hash = hash_inputs(stage.inputs) if stage.inputs else None
+    outputs_exist = all(p.exists() for p in stage.outputs)
+
+    if not force and input_hash is not None and input_hash == previous_hash and outputs_exist:
+        return {"status": "skipped", "seconds": time.perf_counter() - started, "input_hash": input_hash}
+
+    print(f"[pipeline] {stage.name}: starting")
+    try:
+        with metrics.profile_stage(stage.name):
+            stage.func()
+    except Exception as e:
+        print(f"[pipeline] {stage.name}: failed with {e!r}")
+        return {"status": "failed", "seconds": time.perf_counter() - started, "error": repr(e)}
+
+    seconds = time.perf_counter() - started
+    print(f"[pipeline] {stage.name}: done in {seconds:.2f}s")
+    return {"status": "ran", "seconds": seconds, "input_hash": input_hash}
+
+
+
+def critical_path_seconds(stages: list[Stage], results: dict) -> float:
+    """Longest chain of stage times through the dependency graph."""
+    by_name = {s.name: s for s in stages}
+    longest: dict[str, float] = {}
+
+    def finish(name: str) -> float:
+        if name not in longest:
+            stage = by_name[name]
+            own = results.get(name, {}).get("seconds", 0.0)
+            longest[name] = own + max((finish(d) for d in stage.deps), default=0.0)
+        return longest[name]
+
+    return max((finish(s.name) for s in stages), default=0.0)
+
+
+
+def run_pipeline(stages: list[Stage], max_workers: int = 4, force: bool = False) -> dict:
+    """
+    Run stages in dependency order, independent ones concurrently.
+    A stage whose dependency failed is marked "blocked" and not run.
+    Returns {stage name: {"status": ran|skipped|failed|blocked, "seconds": ...}}.
+    Run metrics (see metrics.py) are appended to data/metrics/runs.jsonl.
+    """
+    by_name = {s.name: s for s in stages}
+    for stage in stages:
+        missing = [d for d in stage.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stage(s): {missing}")
+
+    run = metrics.start_run()
+    state = load_pipeline_state()
+    results: dict[str, dict] = {}
+    pending = dict(by_name)
+    running = {}
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            progressed = False
+            for name, stage in list(pending.items()):
+                if not all(d in results for d in stage.deps):
+                    continue
+                del pending[name]
+                progressed = True
+                if any(results[d]["status"] in ("failed", "blocked") for d in stage.deps):
+                    results[name] = {"status": "blocked", "seconds": 0.0}
+                    continue
+                running[pool.submit(_run_stage, stage, state.get(name), force)] = name
+
+            if not running:
+                if pending and not progressed:
+                    raise ValueError(f"Dependency cycle between stages: {sorted(pending)}")
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                results[name] = future.result()
+                if results[name]["status"] == "ran" and results[name].get("input_hash"):
+                    state[name] = results[name]["input_hash"]
+                    save_pipeline_state(state)
+
+    wall = time.perf_counter() - started
+    print("\n[pipeline] stage timings:")
+    for stage in stages:
+        result = results[stage.name]
+        print(f"  {stage.name:<20} {result['status']:<8} {result['seconds']:8.2f}s")
+    print(f"  {'total (wall)':<20} {'':<8} {wall:8.2f}s")
+    critical_path = critical_path_seconds(stages, results)
+    print(f"  {'critical path':<20} {'':<8} {critical_path:8.2f}s")
+
+    log_path = metrics.write_run(
+        stages={name: {k: v for k, v in r.items() if k != "input_hash"} for name, r in results.items()},
+        wall_seconds=wall,
+        critical_path_seconds=critical_path,
+    )
+    print(f"[pipeline] run {run.run_id} metrics appended to {log_path}")
+    return results
+
+
+
+def clockify_stages(
+    incremental: bool = False,
+    extract: bool = True,
+    start: str = "2025-01-01T00:00:00Z",
+    end: str = "2025-01-31T23:59:59Z",
+    workspace_id: str | None = None,
+) -> list[Stage]:
+    """clockify_extract -> clockify_transform for one workspace (default CLOCKIFY_WORKSPACE_ID)."""
+    import clockify_client
+    import clockify_transform
+
+    stages = []
+    if extract:
+        stages.append(Stage(
+            "clockify_extract",
+            lambda: clockify_client.extract_clockify(start, end, incremental=incremental, workspace_id=workspace_id),
+        ))
+    stages.append(Stage(
+        "clockify_transform",
+        lambda: clockify_transform.transform_clockify(incremental=incremental, workspace_id=workspace_id),
+        deps=["clockify_extract"] if extract else [],
+        inputs=[RAW_CLOCKIFY_DIR],
+        outputs=[PROCESSED_CLOCKIFY_DIR / "dim_users.parquet", PROCESSED_CLOCKIFY_DIR / "dim_projects.parquet"],
+    ))
+    return stages
+
+
+
+def paycor_stages(
+    extract: bool = True,
+    legal_entity_id: str | None = None,
+    start: str = "2025-01-01T00:00:00Z",
+    end: str = "2025-01-31T23:59:59Z",
+) -> list[Stage]:
+    """
+    paycor_extract -> paycor_transform for one legal entity (default PAYCOR_COMPANY_ID).
+    -start,end: check date range of the payruns pulled
+    """
+    import paycor_client
+    import paycor_transform
+
+    stages = []
+    if extract:
+        stages.append(Stage("paycor_extract", lambda: paycor_client.extract_paycor(legal_entity_id=legal_entity_id, start=start, end=end)))
+    stages.append(Stage(
+        "paycor_transform",
+        paycor_transform.transform_paycor,
+        deps=["paycor_extract"] if extract else [],
+        inputs=[RAW_PAYCOR_DIR],
+        outputs=[PROCESSED_PAYCOR_DIR / "payrate_history.parquet"],
+    ))
+    return stages
+
+
+
+def unify_stages(incremental: bool = False, deps: Iterable[str] = ("clockify_transform", "paycor_transform")) -> list[Stage]:
+    """unify -> cubes over the processed Clockify and Paycor tables."""
+    import margin_cubes
+    import transform_unify
+
+    return [
+        Stage(
+            "unify",
+            transform_unify.update_fact_time_costed if incremental else transform_unify.build_fact_time_costed,
+            deps=deps,
+            inputs=[PROCESSED_CLOCKIFY_DIR, PROCESSED_PAYCOR_DIR, CONFIG_DIR],
+            outputs=[UNIFIED_DIR / "fact_time_costed.parquet"],
+        ),
+        Stage(
+            "cubes",
+            margin_cubes.update_cubes if incremental else margin_cubes.build_cubes,
+            deps=["unify"],
+            inputs=[
+                UNIFIED_DIR / "fact_time_costed.parquet",
+                PROCESSED_CLOCKIFY_DIR / "dim_users.parquet",
+                PROCESSED_CLOCKIFY_DIR / "dim_projects.parquet",
+            ],
+            outputs=[margin_cubes.cube_path(grain) for grain in margin_cubes.GRAINS],
+        ),
+    ]
+
+
+
+def build_stages(
+    incremental: bool = False,
+    extract: bool = True,
+    start: str = "2025-01-01T00:00:00Z",
+    end: str = "2025-01-31T23:59:59Z",
+) -> list[Stage]:
+    """
+    The standard refresh DAG:
+        clockify_extract -> clockify_transform --+
+                                                 +--> unify -> cubes
+        paycor_extract   -> paycor_transform  --+
+    -incremental: Clockify sync + incremental fact/cube updates instead of full rebuilds
+    -extract: include the API extract stages (False rebuilds from raw data on disk)
+    -start,end: date range of a full Clockify pull and of the Paycor payruns
+    Modules are imported inside the stage builders so e.g. --offline runs don't need
+    API credentials at import time.  For several workspaces/legal entities see entities.py.
+    """
+    return (
+        clockify_stages(incremental, extract, start, end)
+        + paycor_stages(extract, start=start, end=end)
+        + unify_stages(incremental)
+    )
+
+
+
+if __name__ == "__main__":
+    stages = build_stages(
+        incremental="--incremental" in sys.argv,
+        extract="--offline" not in sys.argv,
+    )
+    results = run_pipeline(stages, force="--force" in sys.argv)
+    if any(r["status"] in ("failed", "blocked") for r in results.values()):
+        sys.exit(1)
@@ -0,0 +1,280 @@
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from storage import PROCESSED_CLOCKIFY_DIR, PROCESSED_PAYCOR_DIR, time_entries_dataset
+from transform_unify import UNIFIED_DIR
+from margin_cubes import cube_path
+
+"""
+Read-side query API over the processed and unified Parquet files, for the dashboard.
+
+Every query takes a column projection and date range / client / employee filters and
+pushes both down into a pyarrow dataset scan, so only the needed columns and the row
+groups whose statistics can match are read.  Client filters are resolved to project
+ids through dim_projects.  Employee filters match either the Clockify user_id or the
+Paycor employee id, whichever the table has.
+"""
+
+
+FACT_TIME_COSTED_FILE = UNIFIED_DIR / "fact_time_costed.parquet"
+DIM_USERS_FILE = PROCESSED_CLOCKIFY_DIR / "dim_users.parquet"
+DIM_PROJECTS_FILE = PROCESSED_CLOCKIFY_DIR / "dim_projects.parquet"
+PAYRATE_HISTORY_FILE = PROCESSED_PAYCOR_DIR / "payrate_history.parquet"
+
+
+
+def _as_list(values) -> list | None:
+    if values is None:
+        return None
+    if isinstance(values, (str, int)):
+        return [values]
+    return list(values)
+
+
+
+def _bound(field_type: pa.DataType, value):
+    """Convert a date/timestamp bound to a scalar comparable with a column of field_type."""
+    stamp = pd.Timestamp(value)
+    if pa.types.is_timestamp(field_type):
+        if field_type.tz is None:
+            stamp = stamp.tz_convert("UTC").tz_localize(None) if stamp.tzinfo else stamp
+        else:
+            stamp = stamp.tz_localize("UTC") if stamp.tzinfo is None else stamp
+        return pa.scalar(stamp, type=field_type)
+    if pa.types.is_date(field_type):
+        return pa.scalar(stamp.date(), type=field_type)
+
+    #ISO strings (e.g. demo data) compare correctly as text
+    stamp = stamp.tz_convert("UTC") if stamp.tzinfo else stamp
+    return stamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+
+def date_range_filter(
+    dataset: ds.Dataset,
+    field: str,
+    start=None,
+    end=None,
+) -> ds.Expression | None:
+    """
+    Expression selecting rows with start <= field < end (either bound optional).
+    Naive bounds are taken as UTC.
+    """
+    field_type = dataset.schema.field(field).type
+    expr = None
+    if start is not None:
+        expr = pc.field(field) >= _bound(field_type, start)
+    if end is not None:
+        upper = pc.field(field) < _bound(field_type, end)
+        expr = upper if expr is None else expr & upper
+    return expr
+
+
+
+def _and(*exprs: ds.Expression | None) -> ds.Expression | None:
+    result = None
+    for expr in exprs:
+        if expr is not None:
+            result = expr if result is None else result & expr
+    return result
+
+
+
+def _isin(dataset: ds.Dataset, field: str, values) -> ds.Expression:
+    field_type = dataset.schema.field(field).type
+    if pa.types.is_dictionary(field_type):
+        field_type = field_type.value_type
+    return pc.field(field).isin(pa.array([str(v) for v in values]).cast(field_type))
+
+
+
+def employee_filter(dataset: ds.Dataset, employees) -> ds.Expression | None:
+    """Match employees by Clockify user_id or Paycor employee id, whichever columns exist."""
+    employees = _as_list(employees)
+    if employees is None:
+        return None
+
+    names = set(dataset.schema.names)
+    exprs = [
+        _isin(dataset, field, employees)
+        for field in ("user_id", "paycor_emp_id", "emp_id")
+        if field in names
+    ]
+    if not exprs:
+        raise ValueError("Dataset has no employee id column to filter on.")
+
+    result = exprs[0]
+    for expr in exprs[1:]:
+        result = result | expr
+    return result
+
+
+
+def scan(
+    source: Path | ds.Dataset,
+    columns: list[str] | None = None,
+    filter: ds.Expression | None = None,
+) -> pd.DataFrame:
+    """Scan a Parquet file/directory or dataset with projection and filter pushdown."""
+    dataset = source if isinstance(source, ds.Dataset) else ds.dataset(source, format="parquet")
+    return dataset.to_table(columns=columns, filter=filter).to_pandas()
+
+
+
+def query_dimension(
+    path: Path,
+    columns: list[str] | None = None,
+    filter: ds.Expression | None = None,
+) -> pd.DataFrame:
+    """Read a dimension table (dim_users, dim_projects, ...) with optional projection/filter."""
+    return scan(path, columns=columns, filter=filter)
+
+
+
+def resolve_client_project_ids(clients) -> list[str]:
+    """Project ids belonging to the given client name(s), via dim_projects."""
+    clients = _as_list(clients)
+    dataset = ds.dataset(DIM_PROJECTS_FILE, format="parquet")
+    projects = scan(dataset, columns=["project_id"], filter=_isin(dataset, "client_name", clients))
+    return projects["project_id"].dropna().astype(str).tolist()
+
+
+
+def _project_filter(dataset: ds.Dataset, clients, project_ids) -> ds.Expression | None:
+    """Filter on explicit project ids and/or all projects of the given clients."""
+    if clients is None and project_ids is None:
+        return None
+
+    wanted = set(_as_list(project_ids) or [])
+    if clients is not None:
+        client_projects = set(resolve_client_project_ids(clients))
+        wanted = client_projects if project_ids is None else wanted & client_projects
+    return _isin(dataset, "project_id", sorted(wanted))
+
+
+
+def query_fact_time_costed(
+    start=None,
+    end=None,
+    clients=None,
+    project_ids=None,
+    employees=None,
+    columns: list[str] | None = None,
+    path: Path | None = None,
+) -> pd.DataFrame:
+    """
+    Costed time entries from fact_time_costed, filtered at scan time.
+    -start/end: entry start range, start inclusive and end exclusive
+    -clients: client name(s), resolved to their projects via dim_projects
+    -project_ids: project id(s)
+    -employees: Clockify user id(s) or Paycor employee id(s)
+    -columns: columns to return (default all)
+    """
+    dataset = ds.dataset(path or FACT_TIME_COSTED_FILE, format="parquet")
+    filter = _and(
+        date_range_filter(dataset, "start", start, end),
+        _project_filter(dataset, clients, project_ids),
+        employee_filter(dataset, employees),
+    )
+    return scan(dataset, columns=columns, filter=filter)
+
+
+
+def _month_range_filter(start=None, end=None) -> ds.Expression | None:
+    """Partition filter on year/month keys covering [start, end), so whole directories are skipped."""
+    expr = None
+    if start is not None:
+        stamp = pd.Timestamp(start)
+        stamp = stamp.tz_convert("UTC") if stamp.tzinfo else stamp
+        expr = (pc.field("year") > stamp.year) | (
+            (pc.field("year") == stamp.year) & (pc.field("month") >= stamp.month)
+        )
+    if end is not None:
+        stamp = pd.Timestamp(end)
+        stamp = stamp.tz_convert("UTC") if stamp.tzinfo else stamp
+        upper = (pc.field("year") < stamp.year) | (
+            (pc.field("year") == stamp.year) & (pc.field("month") <= stamp.month)
+        )
+        expr = upper if expr is None else expr & upper
+    return expr
+
+
+
+def query_time_entries(
+    start=None,
+    end=None,
+    workspace_id: str | None = None,
+    clients=None,
+    project_ids=None,
+    employees=None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Processed time entries from the partitioned dataset (see storage.time_entries_dataset).
+    Filters as in query_fact_time_costed; workspace and month partitions outside the
+    range are pruned before any file is opened.
+    """
+    dataset = time_entries_dataset()
+    if dataset is None:
+        raise FileNotFoundError("No time entries dataset found; run clockify_transform.py first.")
+
+    filter = _and(
+        pc.field("workspace_id") == workspace_id if workspace_id is not None else None,
+        _month_range_filter(start, end),
+        date_range_filter(dataset, "start", start, end),
+        _project_filter(dataset, clients, project_ids),
+        employee_filter(dataset, employees),
+    )
+    return scan(dataset, columns=columns, filter=filter)
+
+
+
+def query_payrate_history(
+    employees=None,
+    as_of=None,
+    columns: list[str] | None = None,
+    path: Path | None = None,
+) -> pd.DataFrame:
+    """
+    Pay rate history rows, optionally for given Paycor employee id(s) and only the
+    rates in effect on as_of (start_date <= as_of and end_date open or >= as_of).
+    """
+    dataset = ds.dataset(path or PAYRATE_HISTORY_FILE, format="parquet")
+    filter = employee_filter(dataset, employees)
+    if as_of is not None:
+        start_type = dataset.schema.field("start_date").type
+        end_type = dataset.schema.field("end_date").type
+        in_effect = (pc.field("start_date") <= _bound(start_type, as_of)) & (
+            pc.field("end_date").is_null() | (pc.field("end_date") >= _bound(end_type, as_of))
+        )
+        filter = _and(filter, in_effect)
+    return scan(dataset, columns=columns, filter=filter)
+
+
+
+def query_cube(
+    grain: str = "month",
+    start=None,
+    end=None,
+    clients=None,
+    project_ids=None,
+    employees=None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """Rows of a margin_cubes cube whose period starts in [start, end), filtered like the facts."""
+    dataset = ds.dataset(cube_path(grain), format="parquet")
+
+    project_filter = None
+    if clients is not None and project_ids is None:
+        project_filter = _isin(dataset, "client_name", _as_list(clients))
+    elif project_ids is not None:
+        project_filter = _project_filter(dataset, clients, project_ids)
+
+    filter = _and(
+        date_range_filter(dataset, "period_start", start, end),
+        project_filter,
+        employee_filter(dataset, employees),
+    )
+    return scan(dataset, columns=columns, filter=filter)
@@ -0,0 +1,188 @@
+from collections import OrderedDict
+from functools import wraps
+import inspect
+from pathlib import Path
+import os
+import threading
+from typing import Callable
+import pandas as pd
+import pyarrow.dataset as ds
+import query
+from margin_cubes import cube_path
+from storage import TIME_ENTRIES_DATASET_DIR
+
+"""
+In-process result cache for dashboard queries (query.py).
+
+Results are kept in an LRU cache bounded by memory (QUERY_CACHE_MAX_MB, default 256).
+The key is the query function plus its arguments plus the version of every file the
+query reads (path, mtime, size), so when the pipeline rewrites a Parquet file the next
+call misses and reads fresh data; stale entries simply age out of the LRU.
+Callers get a copy of the cached DataFrame, so mutating a result never corrupts the cache.
+"""
+
+
+QUERY_CACHE_MAX_BYTES = int(float(os.getenv("QUERY_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of DataFrames with a memory budget.
+    -max_bytes: total size (DataFrame.memory_usage(deep=True)) kept before evicting
+    """
+
+    def __init__(self, max_bytes: int = QUERY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, tuple[pd.DataFrame, int]] = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple) -> pd.DataFrame | None:
+        with self.lock:
+            found = self.entries.get(key)
+            if found is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return found[0]
+
+    def put(self, key: tuple, df: pd.DataFrame) -> None:
+        size = int(df.memory_usage(deep=True, index=True).sum())
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self.entries[key] = (df, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+
+_cache = QueryCache()
+
+
+
+def file_version(path: Path) -> tuple:
+    """(path, mtime_ns, size) of a file, or of every Parquet file under a directory."""
+    path = Path(path)
+    if path.is_dir():
+        return tuple(file_version(f) for f in sorted(path.rglob("*.parquet")))
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return (str(path), None, None)
+    return (str(path), stat.st_mtime_ns, stat.st_size)
+
+
+
+def _freeze(value):
+    """Hashable, stable form of a query argument."""
+    if isinstance(value, (list, tuple, set, frozenset, pd.Index, pd.Series)):
+        items = [_freeze(v) for v in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else tuple(items)
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in sorted(value.items()))
+    if isinstance(value, ds.Expression):
+        return str(value)
+    if isinstance(value, pd.Timestamp) or hasattr(value, "isoformat"):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, Path):
+        return str(value)
+    return value
+
+
+
+def cached_query(sources: Callable[..., list[Path]], cache: QueryCache | None = None):
+    """
+    Decorator memoizing a DataFrame-returning query.
+    -sources: called with the query's arguments (by name, defaults filled in); returns
+        the files/directories the query reads
+    -cache: QueryCache to use (default the module-level cache)
+    Positional and keyword spellings of the same call share one cache entry.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            target = cache or _cache
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            versions = tuple(file_version(p) for p in sources(**bound.arguments))
+            key = (func.__module__, func.__qualname__, _freeze(bound.arguments), versions)
+
+            df = target.get(key)
+            if df is None:
+                df = func(*args, **kwargs)
+                target.put(key, df)
+            return df.copy()
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+
+def _fact_sources(path=None, **kwargs) -> list[Path]:
+    return [path or query.FACT_TIME_COSTED_FILE, query.DIM_PROJECTS_FILE]
+
+
+def _time_entries_sources(**kwargs) -> list[Path]:
+    return [TIME_ENTRIES_DATASET_DIR, query.DIM_PROJECTS_FILE]
+
+
+def _payrate_sources(path=None, **kwargs) -> list[Path]:
+    return [path or query.PAYRATE_HISTORY_FILE]
+
+
+def _cube_sources(grain="month", **kwargs) -> list[Path]:
+    return [cube_path(grain), query.DIM_PROJECTS_FILE]
+
+
+def _dimension_sources(path, **kwargs) -> list[Path]:
+    return [path]
+
+
+
+fact_time_costed = cached_query(_fact_sources)(query.query_fact_time_costed)
+time_entries = cached_query(_time_entries_sources)(query.query_time_entries)
+payrate_history = cached_query(_payrate_sources)(query.query_payrate_history)
+cube = cached_query(_cube_sources)(query.query_cube)
+dimension = cached_query(_dimension_sources)(query.query_dimension)
+
+
+
+def cache_stats() -> dict:
+    """Entry count, bytes used and hit/miss counts of the shared query cache."""
+    return _cache.stats()
+
+
+
+def clear_query_cache() -> None:
+    """Drop every cached query result."""
+    _cache.clear()
@@ -0,0 +1,116 @@
+import pandas as pd
+import pyarrow as pa
+
+"""
+Compact in-memory dtypes for the time entry and fact tables.
+
+ID columns that repeat across rows (user, project, workspace, Paycor employee) are
+categoricals, so joins and group-bys work on integer codes; unique ids and free text
+are Arrow-backed strings; billable is a nullable boolean; hours and rates are float32.
+cost stays float64 because it is summed into money totals.
+
+Tags are not kept as a per-row list: tag_bridge() explodes them into an
+(entry_id, tag_id) bridge table.
+
+Parquet files written from these frames store the IDs dictionary-encoded.  Readers
+should call apply_time_entry_schema()/apply_fact_schema() after loading, since files
+written at different times can come back with different types.
+"""
+
+
+STRING = pd.StringDtype("pyarrow")
+
+TIME_ENTRY_DTYPES = {
+    "id": STRING,
+    "user_id": "category",
+    "project_id": "category",
+    "workspace_id": "category",
+    "paycor_emp_id": "category",
+    "description": STRING,
+    "billable": "boolean",
+    "duration_raw": STRING,
+    "duration_hours": "float32",
+}
+
+FACT_DTYPES = {
+    "id": STRING,
+    "user_id": "category",
+    "paycor_emp_id": "category",
+    "project_id": "category",
+    "billable": "boolean",
+    "duration_hours": "float32",
+    "hourly_rate": "float32",
+    "rate_rule": "category",
+    "cost": "float64",
+}
+
+TAG_BRIDGE_DTYPES = {
+    "entry_id": STRING,
+    "tag_id": "category",
+}
+
+TIMESTAMP_COLUMNS = ("start", "end")
+
+
+
+def _convert(series: pd.Series, dtype) -> pd.Series:
+    if dtype == "category":
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series
+        #Categories as Arrow strings keep the category index compact too
+        return series.astype(STRING).astype("category")
+    if series.dtype == pd.api.types.pandas_dtype(dtype):
+        return series
+    return series.astype(dtype)
+
+
+
+def apply_dtypes(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """Return df with every column named in dtypes (that exists) converted; start/end as UTC timestamps."""
+    df = df.copy()
+    for col, dtype in dtypes.items():
+        if col in df.columns:
+            df[col] = _convert(df[col], dtype)
+    for col in TIMESTAMP_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.DatetimeTZDtype):
+            df[col] = pd.to_datetime(df[col], errors="coerce", utc=True)
+    return df
+
+
+
+def apply_time_entry_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Compact dtypes for processed time entries; the per-row tag list is dropped (see tag_bridge)."""
+    if "tag" in df.columns:
+        df = df.drop(columns="tag")
+    return apply_dtypes(df, TIME_ENTRY_DTYPES)
+
+
+
+def apply_fact_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Compact dtypes for fact_time_costed."""
+    return apply_dtypes(df, FACT_DTYPES)
+
+
+
+def tag_bridge(df: pd.DataFrame, id_col: str = "id", tag_col: str = "tag") -> pd.DataFrame:
+    """Explode per-entry tag lists into an (entry_id, tag_id) bridge table."""
+    if df.empty or tag_col not in df.columns:
+        return apply_dtypes(pd.DataFrame({"entry_id": [], "tag_id": []}), TAG_BRIDGE_DTYPES)
+
+    exploded = df[[id_col, tag_col]].explode(tag_col).dropna(subset=[tag_col])
+    bridge = pd.DataFrame({
+        "entry_id": exploded[id_col].to_numpy(dtype=object),
+        "tag_id": exploded[tag_col].to_numpy(dtype=object),
+    })
+    return apply_dtypes(bridge, TAG_BRIDGE_DTYPES)
+
+
+
+def plain_arrow_schema(schema: pa.Schema) -> pa.Schema:
+    """Replace dictionary-encoded fields with their value type, so files written with and without
+    dictionaries (or with different index widths) can be read as one dataset."""
+    fields = [
+        field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+        for field in schema
+    ]
+    return pa.schema(fields, metadata=schema.metadata)
@@ -1,11 +1,153 @@
 from pathlib import Path
+import atexit
 import json
-from typing import Any, List
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import gzip
+import hashlib
+import io
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import metrics
+from schema import apply_time_entry_schema, plain_arrow_schema
 
 
 RAW_CLOCKIFY_DIR = Path("data/raw/clockify")
 RAW_PAYCOR_DIR = Path("data/raw/paycor")
 PROCESSED_PAYCOR_DIR = Path("data/processed/paycor")
+CLOCKIFY_SYNC_STATE_FILE = RAW_CLOCKIFY_DIR / "sync_state.json"
+PROCESSED_CLOCKIFY_DIR = Path("data/processed/clockify")
+#Synced log batches already applied to the processed tables, per workspace
+CLOCKIFY_TRANSFORM_STATE_FILE = PROCESSED_CLOCKIFY_DIR / "_synced_transform_state.json"
+TIME_ENTRIES_DATASET_DIR = PROCESSED_CLOCKIFY_DIR / "time_entries"
+
+#Raw landing files are gzip-compressed NDJSON; every write/append is one gzip member
+RAW_SUFFIX = ".ndjson.gz"
+RAW_MANIFEST_NAME = "manifest.json"
+
+CSV_MODES = ("off", "sync", "background")
+
+#How processed tables are written.  Parquet is always written; CSV is opt-in.
+#-csv: "off" (default), "sync" (write inline) or "background" (writer thread)
+#-compression: Parquet codec passed to pyarrow (snappy, zstd, gzip, none)
+#-row_group_size: rows per Parquet row group (None lets pyarrow decide)
+OUTPUT_POLICY = {
+    "csv": os.getenv("HIHR_CSV_OUTPUT", "off"),
+    "compression": os.getenv("HIHR_PARQUET_COMPRESSION", "snappy"),
+    "row_group_size": int(os.getenv("HIHR_PARQUET_ROW_GROUP_SIZE", "0")) or None,
+}
+
+_csv_executor: ThreadPoolExecutor | None = None
+_csv_futures: list[Future] = []
+_csv_lock = threading.Lock()
+
+
+class _HashingWriter:
+    """File wrapper that counts and hashes the bytes written through it."""
+
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+        self.bytes = 0
+
+    def write(self, data) -> int:
+        self.sha256.update(data)
+        self.bytes += len(data)
+        return self.f.write(data)
+
+    def flush(self) -> None:
+        self.f.flush()
+
+
+def _write_ndjson_member(records: Iterable[dict], filepath: Path, mode: str) -> dict:
+    """Write records as one gzip member of NDJSON; returns the batch manifest entry."""
+    count = 0
+    with filepath.open(mode) as f:
+        offset = f.tell()
+        writer = _HashingWriter(f)
+        #mtime=0 keeps the bytes (and so content hashes) identical for identical records
+        with gzip.GzipFile(fileobj=writer, mode="wb", mtime=0) as gz:
+            for record in records:
+                gz.write(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+                gz.write(b"\n")
+                count += 1
+
+    metrics.count("storage.ndjson_records", count)
+    metrics.count("storage.ndjson_bytes", writer.bytes)
+    return {
+        "records": count,
+        "offset": offset,
+        "bytes": writer.bytes,
+        "sha256": writer.sha256.hexdigest(),
+        "written_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def _update_manifest(filepath: Path, batch: dict, replace: bool) -> None:
+    """Record a batch for filepath in the manifest.json next to it."""
+    manifest_path = filepath.parent / RAW_MANIFEST_NAME
+    manifest = load_raw_manifest(filepath.parent)
+
+    entry = {"records": 0, "batches": []} if replace else manifest.get(filepath.name, {"records": 0, "batches": []})
+    entry["batches"].append(batch)
+    entry["records"] += batch["records"]
+    manifest[filepath.name] = entry
+
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    tmp_path.replace(manifest_path)
+
+
+def load_raw_manifest(directory: Path) -> dict:
+    """
+    Load the manifest of raw landing files in a directory.
+    Shape: {filename: {"records": total, "batches": [{records, offset, bytes, sha256, written_at}]}}
+    Each batch is one gzip member, so it can be checked or read on its own.
+    """
+    manifest_path = directory / RAW_MANIFEST_NAME
+    if not manifest_path.exists():
+        return {}
+
+    with manifest_path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_ndjson(records: Iterable[dict], filepath: Path) -> Path:
+    """Overwrite filepath with gzip-compressed NDJSON (one record per line)."""
+    tmp_path = filepath.with_name(f".{filepath.name}.tmp")
+    batch = _write_ndjson_member(records, tmp_path, "wb")
+    batch["offset"] = 0
+    tmp_path.replace(filepath)
+    _update_manifest(filepath, batch, replace=True)
+    return filepath
+
+
+def append_ndjson(records: Iterable[dict], filepath: Path) -> Path:
+    """Append records to a gzip NDJSON file as a new member (one batch in the manifest)."""
+    batch = _write_ndjson_member(records, filepath, "ab")
+    _update_manifest(filepath, batch, replace=False)
+    return filepath
+
+
+def iter_ndjson(filepath: Path, offset: int = 0) -> Iterator[dict]:
+    """
+    Yield records from a (gzip-compressed or plain) NDJSON file, one line at a time.
+    -offset: byte offset to start reading at, e.g. a batch offset from the manifest
+        (every batch starts a new gzip member)
+    """
+    with filepath.open("rb") as raw:
+        raw.seek(offset)
+        stream = gzip.GzipFile(fileobj=raw, mode="rb") if filepath.suffix == ".gz" else raw
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)
 
 
 def ensure_raw_clockify_dir() -> None:
@@ -14,14 +156,15 @@ def ensure_raw_clockify_dir() -> None:
 
 
 def save_time_entries_raw(
-    entries: List[dict],
+    entries: Iterable[dict],
     workspace_id: str,
     start: str,
     end: str
 ) -> Path:
     """
-    Save raw Clockify time entries to a JSON file.
-    -entries: the list returned by get_time_entries()
+    Save raw Clockify time entries as gzip-compressed NDJSON.
+    -entries: the list returned by get_time_entries(), or any iterable of entries
+        (e.g. iter_time_entries_for_all_users) which is written as it is consumed
     -workspace_id: which workspace the entries belong to
     -start,end: the original IS08601 timestamps
     """
@@ -31,13 +174,151 @@ def save_time_entries_raw(
     start_date = start.split("T")[0]
     end_date = end.split("T")[0]
     
-    filename = f"time_entries_{workspace_id}_{start_date}_to_{end_date}.json"
+    filename = f"time_entries_{workspace_id}_{start_date}_to_{end_date}{RAW_SUFFIX}"
     filepath = RAW_CLOCKIFY_DIR / filename
     
-    with filepath.open("w", encoding="utf-8") as f:
-        json.dump(entries, f, indent=2, ensure_ascii=False)
-        
-    return filepath
+    return write_ndjson(entries, filepath)
+
+
+def synced_time_entries_path(workspace_id: str) -> Path:
+    """Path of the append-only synced time entry log for a workspace."""
+    return RAW_CLOCKIFY_DIR / f"synced_time_entries_{workspace_id}{RAW_SUFFIX}"
+
+
+def load_synced_time_entries(workspace_id: str) -> List[dict]:
+    """
+    Replay the synced time entry log into the current entries, or [] on the first run.
+    Later lines win for the same id; {"id": ..., "deleted": true} lines remove an entry.
+    """
+    filepath = synced_time_entries_path(workspace_id)
+    store: dict = {}
+
+    if filepath.exists():
+        for record in iter_ndjson(filepath):
+            if record.get("deleted"):
+                store.pop(record["id"], None)
+            else:
+                store[record["id"]] = record
+
+    return list(store.values())
+
+
+def iter_synced_time_entries(workspace_id: str) -> Iterator[dict]:
+    """
+    Yield the current entries of the synced log without holding them all in memory.
+    Same result as load_synced_time_entries (in log order of each entry's latest line),
+    at the cost of reading the log twice: the first pass only keeps ids.
+    """
+    filepath = synced_time_entries_path(workspace_id)
+    if not filepath.exists():
+        return
+
+    latest: dict[str, int] = {}
+    for line_number, record in enumerate(iter_ndjson(filepath)):
+        if record.get("deleted"):
+            latest.pop(record["id"], None)
+        else:
+            latest[record["id"]] = line_number
+
+    for line_number, record in enumerate(iter_ndjson(filepath)):
+        if latest.get(record["id"]) == line_number:
+            yield record
+
+
+def load_synced_time_entry_changes(workspace_id: str, offset: int) -> tuple[List[dict], set]:
+    """
+    Replay only the synced log from byte offset on (the start of a batch).
+    Returns (entries added or changed, ids deleted) by those batches; later lines win.
+    """
+    filepath = synced_time_entries_path(workspace_id)
+    changed: dict = {}
+    deleted: set = set()
+
+    for record in iter_ndjson(filepath, offset):
+        if record.get("deleted"):
+            changed.pop(record["id"], None)
+            deleted.add(record["id"])
+        else:
+            changed[record["id"]] = record
+            deleted.discard(record["id"])
+
+    return list(changed.values()), deleted
+
+
+def append_synced_time_entries(
+    entries: List[dict],
+    deleted_ids: Iterable[str],
+    workspace_id: str,
+) -> Path:
+    """
+    Append one sync batch to the synced time entry log.
+    -entries: new or changed raw entries
+    -deleted_ids: ids the API no longer returns (written as tombstones)
+    """
+    ensure_raw_clockify_dir()
+    records = list(entries) + [{"id": entry_id, "deleted": True} for entry_id in deleted_ids]
+    return append_ndjson(records, synced_time_entries_path(workspace_id))
+
+
+def compact_synced_time_entries(workspace_id: str) -> Path:
+    """Rewrite the synced log as one batch holding only the current entries."""
+    entries = sorted(load_synced_time_entries(workspace_id), key=lambda e: e["id"])
+    return write_ndjson(entries, synced_time_entries_path(workspace_id))
+
+
+def clockify_dimension_raw_path(name: str, workspace_id: str) -> Path:
+    """Path of a raw Clockify dimension file (users, projects) for a workspace."""
+    return RAW_CLOCKIFY_DIR / f"{name}_{workspace_id}{RAW_SUFFIX}"
+
+
+def save_clockify_dimension_raw(records: Iterable[dict], name: str, workspace_id: str) -> Path:
+    """Save raw Clockify users or projects as gzip-compressed NDJSON."""
+    ensure_raw_clockify_dir()
+    return write_ndjson(records, clockify_dimension_raw_path(name, workspace_id))
+
+
+def load_clockify_sync_state() -> dict:
+    """
+    Load the per-user high-water marks from the last incremental sync.
+    Shape: {workspace_id: {user_id: ISO8601 timestamp synced through}}
+    """
+    if not CLOCKIFY_SYNC_STATE_FILE.exists():
+        return {}
+
+    with CLOCKIFY_SYNC_STATE_FILE.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_clockify_sync_state(state: dict) -> Path:
+    """Save the per-user high-water marks for incremental sync."""
+    ensure_raw_clockify_dir()
+
+    with CLOCKIFY_SYNC_STATE_FILE.open("w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+    return CLOCKIFY_SYNC_STATE_FILE
+
+
+def load_clockify_transform_state() -> dict:
+    """
+    Load which synced log batches the incremental transform has applied.
+    Shape: {workspace_id: {"batches": count applied, "sha256": hash of the last one}}
+    """
+    if not CLOCKIFY_TRANSFORM_STATE_FILE.exists():
+        return {}
+
+    with CLOCKIFY_TRANSFORM_STATE_FILE.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_clockify_transform_state(state: dict) -> Path:
+    """Save which synced log batches the incremental transform has applied."""
+    PROCESSED_CLOCKIFY_DIR.mkdir(parents=True, exist_ok=True)
+
+    with CLOCKIFY_TRANSFORM_STATE_FILE.open("w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+    return CLOCKIFY_TRANSFORM_STATE_FILE
     
     
     
@@ -49,55 +330,52 @@ def ensure_raw_paycor_dir() -> None:
     
 def save_paycor_employees_raw(employees: dict) -> Path:
     """
-    Save raw Paycor employee data to a JSON file.
+    Save raw Paycor employee records as gzip NDJSON, one employee per line.
     -employees_response: the dict returned by get_employees_identifying_data
     """
     ensure_raw_paycor_dir()
     
-    filepath = RAW_PAYCOR_DIR / "employee_identifying_info.json"
+    filepath = RAW_PAYCOR_DIR / f"employee_identifying_info{RAW_SUFFIX}"
     
-    with filepath.open("w", encoding="utf-8") as f:
-        json.dump(employees, f, indent=2, ensure_ascii=False)
-        
-    return filepath
+    return write_ndjson(employees.get("records") or [], filepath)
     
     
     
 def save_paycor_payrates_raw(payrates_by_employee: dict) -> Path:
     """
-    Save raw payrate history for all employees.
-    payrates_by_employee: {employeeId: [payrate records]} dictionary
+    Save raw payrate history for all employees as gzip NDJSON.
+    payrates_by_employee: {employeeId: {"records": [payrate records]}} dictionary
+    Each line is one payrate record with its employee in "emp_id".
     """
     ensure_raw_paycor_dir()
 
-    filepath = RAW_PAYCOR_DIR / "payrates_all_employees.json"
-    
-    with filepath.open("w", encoding="utf-8") as f:
-        json.dump(payrates_by_employee, f, indent=2, ensure_ascii=False)
+    filepath = RAW_PAYCOR_DIR / f"payrates_all_employees{RAW_SUFFIX}"
 
-    return filepath
+    def rows():
+        for emp_id, info in payrates_by_employee.items():
+            for rate in (info or {}).get("records") or []:
+                if isinstance(rate, dict):
+                    yield {**rate, "emp_id": emp_id}
+    
+    return write_ndjson(rows(), filepath)
 
 
 def save_paycor_payruns_raw(payruns: dict) -> Path:
-    """Save raw Paycor payrun data to a JSON file."""
-    ensure_raw_clockify_dir()
-    filepath = RAW_PAYCOR_DIR / "payruns.json"
-
-    with filepath.open("w", encoding="utf-8") as f:
-        json.dump(payruns, f, indent=2, ensure_ascii=False)
+    """Save raw Paycor payrun records as gzip NDJSON."""
+    ensure_raw_paycor_dir()
+    filepath = RAW_PAYCOR_DIR / f"payruns{RAW_SUFFIX}"
 
-    return filepath
+    records = payruns["records"] if "records" in payruns else [payruns]
+    return write_ndjson(records, filepath)
 
 
 def save_employee_earnings(earnings: dict) -> Path:
-    """Save raw Paycor payrun data to a JSON file."""
-    ensure_raw_clockify_dir()
-    filepath = RAW_PAYCOR_DIR / "earnings.json"
-
-    with filepath.open("w", encoding="utf-8") as f:
-        json.dump(payruns, f, indent=2, ensure_ascii=False)
+    """Save raw Paycor earnings records as gzip NDJSON."""
+    ensure_raw_paycor_dir()
+    filepath = RAW_PAYCOR_DIR / f"earnings{RAW_SUFFIX}"
 
-    return filepath
+    records = earnings["records"] if "records" in earnings else [earnings]
+    return write_ndjson(records, filepath)
 
 
 
@@ -106,20 +384,268 @@ def ensure_processed_paycor_dir():
     PROCESSED_PAYCOR_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def save_paycor_file_processed(df, name: str) -> None:
-    """Save processed paycor file as CSV and Parquet"""
+def save_paycor_file_processed(df, name: str) -> dict:
+    """Save processed paycor file as Parquet (and CSV, per OUTPUT_POLICY)"""
     ensure_processed_paycor_dir()
-    csv_path = PROCESSED_PAYCOR_DIR / f"{name}.csv"
-    parquet_path = PROCESSED_PAYCOR_DIR / f"{name}.parquet"
+    return write_processed(df, PROCESSED_PAYCOR_DIR, name)
 
-    df.to_csv(csv_path, index=False)
-    df.to_parquet(parquet_path, index=False)
 
 
-    
-    
-    
-    
-    
-    
-    
\ No newline at end of file
+
+def set_output_policy(
+    csv: str | None = None,
+    compression: str | None = None,
+    row_group_size: int | None = None,
+) -> dict:
+    """
+    Change how processed tables are written (see OUTPUT_POLICY).
+    Only the arguments that are passed are changed.  Returns the updated policy.
+    """
+    if csv is not None:
+        if csv not in CSV_MODES:
+            raise ValueError(f"csv must be one of {CSV_MODES}, got {csv!r}")
+        OUTPUT_POLICY["csv"] = csv
+    if compression is not None:
+        OUTPUT_POLICY["compression"] = compression
+    if row_group_size is not None:
+        OUTPUT_POLICY["row_group_size"] = row_group_size or None
+    return OUTPUT_POLICY
+
+
+def write_parquet(df: pd.DataFrame, path: Path) -> Path:
+    """Write a DataFrame to Parquet with the compression/row group settings in OUTPUT_POLICY."""
+    compression = OUTPUT_POLICY["compression"]
+    with metrics.timer("storage.write_parquet"):
+        df.to_parquet(
+            path,
+            index=False,
+            compression=None if compression == "none" else compression,
+            row_group_size=OUTPUT_POLICY["row_group_size"],
+        )
+    metrics.count("storage.parquet_rows", len(df))
+    metrics.count("storage.parquet_bytes", Path(path).stat().st_size)
+    return path
+
+
+def _write_csv(df: pd.DataFrame, path: Path) -> Path:
+    df.to_csv(path, index=False)
+    return path
+
+
+def _parquet_to_csv(parquet_path: Path, path: Path) -> Path:
+    """Write a Parquet file out as CSV one record batch at a time."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    header = True
+    for batch in pq.ParquetFile(parquet_path).iter_batches():
+        batch.to_pandas().to_csv(tmp_path, mode="w" if header else "a", header=header, index=False)
+        header = False
+    if header:
+        pd.read_parquet(parquet_path).to_csv(tmp_path, index=False)
+    tmp_path.replace(path)
+    return path
+
+
+def _submit_csv_export(func, *args) -> None:
+    global _csv_executor
+
+    with _csv_lock:
+        if _csv_executor is None:
+            _csv_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="csv-export")
+        _csv_futures.append(_csv_executor.submit(func, *args))
+
+
+def write_processed(
+    df: pd.DataFrame,
+    directory: Path,
+    name: str,
+    csv: str | None = None,
+) -> dict:
+    """
+    Write a processed table as directory/name.parquet, plus name.csv if requested.
+    -csv: override OUTPUT_POLICY["csv"] for this table ("off", "sync", "background")
+    Returns {"parquet": path, "csv": path or None}.  A background CSV may still be
+    in progress; call flush_csv_exports() to wait for it.
+    """
+    csv = csv or OUTPUT_POLICY["csv"]
+    if csv not in CSV_MODES:
+        raise ValueError(f"csv must be one of {CSV_MODES}, got {csv!r}")
+
+    parquet_path = write_parquet(df, directory / f"{name}.parquet")
+
+    csv_path = None
+    if csv == "sync":
+        csv_path = _write_csv(df, directory / f"{name}.csv")
+    elif csv == "background":
+        csv_path = directory / f"{name}.csv"
+        #Copy so later changes by the caller don't leak into the export
+        _submit_csv_export(_write_csv, df.copy(), csv_path)
+
+    return {"parquet": parquet_path, "csv": csv_path}
+
+
+def export_parquet_csv(parquet_path: Path, csv: str | None = None) -> Path | None:
+    """
+    CSV copy (same name, .csv) of a finished Parquet file, for tables streamed straight
+    to Parquet rather than passed through write_processed.
+    -csv: override OUTPUT_POLICY["csv"] ("off", "sync", "background")
+    Returns the CSV path, or None when CSV output is off.  Reads the Parquet file one
+    record batch at a time, so memory does not grow with the table.
+    """
+    csv = csv or OUTPUT_POLICY["csv"]
+    if csv not in CSV_MODES:
+        raise ValueError(f"csv must be one of {CSV_MODES}, got {csv!r}")
+    if csv == "off":
+        return None
+
+    csv_path = parquet_path.with_suffix(".csv")
+    if csv == "sync":
+        return _parquet_to_csv(parquet_path, csv_path)
+    _submit_csv_export(_parquet_to_csv, parquet_path, csv_path)
+    return csv_path
+
+
+def flush_csv_exports() -> list[Path]:
+    """Wait for all background CSV exports; re-raises the first failure."""
+    with _csv_lock:
+        futures = list(_csv_futures)
+        _csv_futures.clear()
+    return [f.result() for f in futures]
+
+
+atexit.register(flush_csv_exports)
+
+
+def time_entries_partitioning() -> ds.Partitioning:
+    """Hive partitioning of the time entries dataset: workspace_id=/year=/month=."""
+    return ds.partitioning(
+        pa.schema([
+            ("workspace_id", pa.string()),
+            ("year", pa.int16()),
+            ("month", pa.int8()),
+        ]),
+        flavor="hive",
+    )
+
+
+def _partition_path(workspace_id: str, year: int, month: int) -> Path:
+    return TIME_ENTRIES_DATASET_DIR / f"workspace_id={workspace_id}" / f"year={year}" / f"month={month}"
+
+
+def _with_partition_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Add year/month partition keys from the entry start (UTC); undated entries go to 0/0."""
+    df = df.copy()
+    start = pd.to_datetime(df["start"], errors="coerce", utc=True)
+    df["year"] = start.dt.year.fillna(0).astype("int16")
+    df["month"] = start.dt.month.fillna(0).astype("int8")
+    return df
+
+
+def time_entries_dataset() -> ds.Dataset | None:
+    """Open the partitioned time entries dataset, or None if nothing has been written yet."""
+    files = sorted(TIME_ENTRIES_DATASET_DIR.glob("workspace_id=*/year=*/month=*/*.parquet"))
+    if not files:
+        return None
+
+    #Partitions written from different batches can disagree on all-null columns and
+    #dictionary encodings; read everything as plain types (schema.py re-applies categories)
+    schema = pa.unify_schemas(
+        [plain_arrow_schema(pq.read_schema(f)) for f in files],
+        promote_options="permissive",
+    )
+    partitioning = time_entries_partitioning()
+    for field in partitioning.schema:
+        schema = schema.append(field)
+
+    return ds.dataset(TIME_ENTRIES_DATASET_DIR, format="parquet", schema=schema, partitioning=partitioning)
+
+
+@metrics.timed("storage.upsert_time_entries_dataset")
+def upsert_time_entries_dataset(
+    df: pd.DataFrame,
+    deleted_ids: Iterable[str] | None = None,
+) -> list[Path]:
+    """
+    Insert or replace processed time entries in the partitioned dataset, keyed on id.
+
+    Layout: data/processed/clockify/time_entries/workspace_id=X/year=YYYY/month=M/part-0.parquet
+    Only partitions that receive rows, or currently hold one of the incoming or deleted
+    ids (e.g. an entry whose start moved to another month), are rewritten.  Running the
+    same upsert twice leaves the dataset unchanged.
+    -df: processed time entries (as from to_time_entries_dataframe)
+    -deleted_ids: entry ids to remove from the dataset
+    Returns the partition files that were rewritten or removed.
+    """
+    partition_cols = ["workspace_id", "year", "month"]
+    if df.empty:
+        incoming = pd.DataFrame(columns=["id", *partition_cols])
+    else:
+        incoming = _with_partition_keys(df)
+
+    touched_ids = set(incoming["id"]) | set(deleted_ids or [])
+    if not touched_ids:
+        return []
+
+    affected = set(map(tuple, incoming[partition_cols].drop_duplicates().itertuples(index=False)))
+
+    dataset = time_entries_dataset()
+    if dataset is not None:
+        existing = dataset.to_table(
+            columns=partition_cols,
+            filter=pc.field("id").isin(pa.array(sorted(touched_ids), pa.string())),
+        ).to_pandas()
+        affected |= set(map(tuple, existing.drop_duplicates().itertuples(index=False)))
+
+    written = []
+    for workspace_id, year, month in sorted(affected, key=lambda k: (str(k[0]), k[1], k[2])):
+        part_dir = _partition_path(workspace_id, int(year), int(month))
+        part_file = part_dir / "part-0.parquet"
+
+        frames = []
+        if part_file.exists():
+            current = pd.read_parquet(part_file)
+            frames.append(current[~current["id"].isin(touched_ids)])
+
+        new_rows = incoming[
+            (incoming["workspace_id"] == workspace_id)
+            & (incoming["year"] == year)
+            & (incoming["month"] == month)
+        ]
+        frames.append(new_rows.drop(columns=partition_cols))
+
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            if part_file.exists():
+                part_file.unlink()
+                written.append(part_file)
+            continue
+
+        merged = apply_time_entry_schema(pd.concat(frames, ignore_index=True))
+        merged = merged.drop_duplicates("id", keep="last").sort_values(["start", "id"], kind="stable")
+
+        part_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = part_dir / ".part-0.parquet.tmp"
+        write_parquet(merged, tmp_file)
+        tmp_file.replace(part_file)
+        written.append(part_file)
+
+    return written
+
+
+def read_time_entries_dataset(
+    columns: list[str] | None = None,
+    filters: list | ds.Expression | None = None,
+) -> pd.DataFrame:
+    """
+    Read processed time entries from the partitioned dataset.
+    -columns: columns to load (partition keys workspace_id/year/month are valid too)
+    -filters: pyarrow expression or DNF list, e.g. [("workspace_id", "=", ws), ("year", "=", 2025),
+        ("month", "=", 1)]; partition filters prune directories, others are pushed into the scan
+    """
+    dataset = time_entries_dataset()
+    if dataset is None:
+        raise FileNotFoundError(f"No time entries dataset found in {TIME_ENTRIES_DATASET_DIR}.")
+
+    if filters is not None and not isinstance(filters, ds.Expression):
+        filters = pq.filters_to_expression(filters)
+
+    return apply_time_entry_schema(dataset.to_table(columns=columns, filter=filters).to_pandas())
@@ -0,0 +1,303 @@
+from pathlib import Path
+import argparse
+import csv
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator
+import numpy as np
+from storage import RAW_SUFFIX, write_ndjson
+
+"""
+Scalable synthetic data for performance work (make_demo_data.py only has a handful of rows).
+
+Produces raw Clockify time entries/users/projects and raw Paycor employees/pay rates in
+the same shapes the APIs return, plus the matching config/employee_id_mapping.csv, so the
+real transforms can be run and benchmarked at any size:
+
+    python src/synthetic_data.py --users 200 --projects 80 --years 2 --entries-per-day 4 \
+        --rate-changes 3 --out data/synthetic
+
+Output is deterministic for a given seed.
+"""
+
+
+WORKSPACE_ID = "synthetic-ws"
+DEFAULT_START = date(2024, 1, 1)
+DESCRIPTIONS = ["Client meeting", "Workshop prep", "Policy review", "Training", "Internal planning", "Onboarding"]
+TAGS = [f"tag-{i}" for i in range(12)]
+
+
+
+class SyntheticScale:
+    """
+    Size of a synthetic dataset.
+    -users: Clockify users (each mapped to one Paycor employee)
+    -projects: Clockify projects, spread over projects // 4 clients
+    -years: length of the time entry history, starting at start
+    -entries_per_day: average entries per user per working day (Poisson)
+    -rate_changes: pay rate changes per employee over the history
+    """
+
+    def __init__(
+        self,
+        users: int = 50,
+        projects: int = 20,
+        years: float = 1,
+        entries_per_day: float = 3,
+        rate_changes: int = 2,
+        start: date = DEFAULT_START,
+        seed: int = 0,
+    ):
+        self.users = users
+        self.projects = projects
+        self.years = years
+        self.entries_per_day = entries_per_day
+        self.rate_changes = rate_changes
+        self.start = start
+        self.seed = seed
+
+    @property
+    def days(self) -> int:
+        return int(round(self.years * 365))
+
+    def as_dict(self) -> dict:
+        return {
+            "users": self.users,
+            "projects": self.projects,
+            "years": self.years,
+            "entries_per_day": self.entries_per_day,
+            "rate_changes": self.rate_changes,
+            "start": self.start.isoformat(),
+            "seed": self.seed,
+        }
+
+
+
+def user_ids(scale: SyntheticScale) -> list[str]:
+    return [f"clk-user-{i:05d}" for i in range(scale.users)]
+
+
+def employee_ids(scale: SyntheticScale) -> list[str]:
+    return [f"pc-emp-{i:05d}" for i in range(scale.users)]
+
+
+def project_ids(scale: SyntheticScale) -> list[str]:
+    return [f"clk-proj-{i:05d}" for i in range(scale.projects)]
+
+
+
+def generate_users(scale: SyntheticScale) -> list[dict]:
+    """Raw Clockify users."""
+    return [
+        {"id": uid, "name": f"Consultant {i}", "email": f"consultant{i}@example.com", "status": "ACTIVE"}
+        for i, uid in enumerate(user_ids(scale))
+    ]
+
+
+
+def generate_projects(scale: SyntheticScale) -> list[dict]:
+    """Raw Clockify projects, four per client."""
+    return [
+        {
+            "id": pid,
+            "name": f"Project {i}",
+            "clientName": f"Client {i // 4}",
+            "archived": False,
+        }
+        for i, pid in enumerate(project_ids(scale))
+    ]
+
+
+
+def _format_duration(seconds: int) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes = rest // 60
+    out = "PT"
+    if hours:
+        out += f"{hours}H"
+    if minutes or not hours:
+        out += f"{minutes}M"
+    return out
+
+
+
+def iter_time_entries(scale: SyntheticScale) -> Iterator[dict]:
+    """
+    Raw Clockify time entries, one working day at a time (so memory stays flat).
+    Each user works a few favourite projects; entries are 15 minutes to 4 hours between
+    8:00 and 18:00 UTC, about 80% billable, with zero to two tags.
+    """
+    rng = np.random.default_rng(scale.seed)
+    users = user_ids(scale)
+    projects = project_ids(scale)
+    favourites = [rng.choice(len(projects), size=min(5, len(projects)), replace=False) for _ in users]
+
+    entry_number = 0
+    for day_offset in range(scale.days):
+        day = scale.start + timedelta(days=day_offset)
+        if day.weekday() >= 5:
+            continue
+        day_start = datetime(day.year, day.month, day.day, 8, tzinfo=timezone.utc)
+
+        counts = rng.poisson(scale.entries_per_day, size=len(users))
+        for u, (user_id, n) in enumerate(zip(users, counts)):
+            offsets = np.sort(rng.integers(0, 10 * 60, size=n)) * 60
+            durations = rng.integers(1, 17, size=n) * 15 * 60
+            for offset, seconds in zip(offsets, durations):
+                start = day_start + timedelta(seconds=int(offset))
+                end = start + timedelta(seconds=int(seconds))
+                tag_count = int(rng.integers(0, 3))
+                entry_number += 1
+                yield {
+                    "id": f"te-{entry_number:010d}",
+                    "description": DESCRIPTIONS[entry_number % len(DESCRIPTIONS)],
+                    "userId": user_id,
+                    "projectId": projects[favourites[u][int(rng.integers(0, len(favourites[u])))]],
+                    "workspaceId": WORKSPACE_ID,
+                    "billable": bool(rng.random() < 0.8),
+                    "tagIds": [TAGS[int(t)] for t in rng.choice(len(TAGS), size=tag_count, replace=False)],
+                    "timeInterval": {
+                        "start": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        "end": end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        "duration": _format_duration(int(seconds)),
+                    },
+                }
+
+
+
+def generate_employees(scale: SyntheticScale) -> dict:
+    """Raw Paycor employees response ({"records": [...]})."""
+    return {
+        "hasMoreResults": False,
+        "records": [
+            {"employeeId": emp_id, "firstName": "Consultant", "lastName": str(i), "status": "Active"}
+            for i, emp_id in enumerate(employee_ids(scale))
+        ],
+    }
+
+
+
+def generate_payrates(scale: SyntheticScale) -> dict:
+    """
+    Raw Paycor pay rate history: {employeeId: {"records": [...]}}.
+    Each employee starts before the history and changes rate scale.rate_changes times;
+    every rate but the latest has an effectiveEndDate.
+    """
+    rng = np.random.default_rng(scale.seed + 1)
+    first = scale.start - timedelta(days=365)
+    span = scale.days + 365
+
+    payrates = {}
+    for emp_id in employee_ids(scale):
+        change_days = np.sort(rng.choice(np.arange(1, span), size=min(scale.rate_changes, span - 1), replace=False))
+        starts = [first] + [first + timedelta(days=int(d)) for d in change_days]
+        rate = float(rng.uniform(25, 90))
+
+        records = []
+        for n, start in enumerate(starts):
+            end = starts[n + 1] - timedelta(days=1) if n + 1 < len(starts) else None
+            records.append({
+                "id": f"{emp_id}-rate-{n}",
+                "effectiveStartDate": start.isoformat() + "T00:00:00",
+                "effectiveEndDate": end.isoformat() + "T23:59:59" if end else None,
+                "sequenceNumber": n + 1,
+                "payRate": round(rate, 2),
+                "annualPayRate": None,
+                "description": "Hourly",
+                "type": "Hourly",
+                "reason": "Merit" if n else "Hire",
+                "notes": None,
+            })
+            rate *= float(rng.uniform(1.0, 1.08))
+        payrates[emp_id] = {"records": records}
+    return payrates
+
+
+
+def employee_id_mapping(scale: SyntheticScale) -> list[dict]:
+    """Rows for config/employee_id_mapping.csv."""
+    return [
+        {"clockify_user_id": uid, "paycor_emp_id": emp_id}
+        for uid, emp_id in zip(user_ids(scale), employee_ids(scale))
+    ]
+
+
+
+def write_synthetic_dataset(scale: SyntheticScale, out_dir: Path) -> dict[str, Path]:
+    """
+    Write a full synthetic raw dataset under out_dir, laid out like the project root:
+    out_dir/data/raw/clockify, out_dir/data/raw/paycor and out_dir/config.
+    Run the pipeline from out_dir (python ../src/pipeline.py --offline) to process it.
+    """
+    out_dir = Path(out_dir)
+    clockify_dir = out_dir / "data/raw/clockify"
+    paycor_dir = out_dir / "data/raw/paycor"
+    config_dir = out_dir / "config"
+    for d in (clockify_dir, paycor_dir, config_dir):
+        d.mkdir(parents=True, exist_ok=True)
+
+    end = scale.start + timedelta(days=scale.days - 1)
+    paths = {
+        "time_entries": write_ndjson(
+            iter_time_entries(scale),
+            clockify_dir / f"time_entries_{WORKSPACE_ID}_{scale.start.isoformat()}_to_{end.isoformat()}{RAW_SUFFIX}",
+        ),
+        "users": write_ndjson(generate_users(scale), clockify_dir / f"users_{WORKSPACE_ID}{RAW_SUFFIX}"),
+        "projects": write_ndjson(generate_projects(scale), clockify_dir / f"projects_{WORKSPACE_ID}{RAW_SUFFIX}"),
+        "employees": write_ndjson(
+            generate_employees(scale)["records"],
+            paycor_dir / f"employee_identifying_info{RAW_SUFFIX}",
+        ),
+        "payrates": write_ndjson(
+            (
+                {**rate, "emp_id": emp_id}
+                for emp_id, info in generate_payrates(scale).items()
+                for rate in info["records"]
+            ),
+            paycor_dir / f"payrates_all_employees{RAW_SUFFIX}",
+        ),
+    }
+
+    mapping_path = config_dir / "employee_id_mapping.csv"
+    with mapping_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["clockify_user_id", "paycor_emp_id"])
+        writer.writeheader()
+        writer.writerows(employee_id_mapping(scale))
+    paths["mapping"] = mapping_path
+
+    return paths
+
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """Add the scale options (shared with benchmark.py) to a parser."""
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--entries-per-day", type=float, default=3)
+    parser.add_argument("--rate-changes", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+
+def scale_from_args(args: argparse.Namespace) -> SyntheticScale:
+    return SyntheticScale(
+        users=args.users,
+        projects=args.projects,
+        years=args.years,
+        entries_per_day=args.entries_per_day,
+        rate_changes=args.rate_changes,
+        seed=args.seed,
+    )
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic raw dataset.")
+    add_scale_arguments(parser)
+    parser.add_argument("--out", type=Path, default=Path("data/synthetic"))
+    args = parser.parse_args()
+
+    paths = write_synthetic_dataset(scale_from_args(args), args.out)
+    for name, path in paths.items():
+        print(f"{name}: {path}")
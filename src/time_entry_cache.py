@@ -0,0 +1,319 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import json
+import os
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import metrics
+from clockify_client import format_clockify_timestamp, get_time_entries_for_user, get_users, parse_clockify_timestamp
+from clockify_transform import to_time_entries_frames
+from query import date_range_filter
+from schema import TAG_BRIDGE_DTYPES, TIME_ENTRY_DTYPES, apply_dtypes, apply_time_entry_schema, plain_arrow_schema
+from storage import write_parquet
+
+"""
+Local range cache for Clockify time entries, for ad hoc date-range questions
+("last 90 days", "Q1", "January") that would otherwise each be a full API pull.
+
+For every (workspace, user) the cache records which time ranges are already stored
+locally.  A request fetches only the uncovered sub-ranges from the API, merges them into
+the user's Parquet files and serves the whole window from Parquet.  Covered ranges are
+kept coalesced, so January followed by February is one range.
+
+    data/cache/time_entries/<workspace_id>/<user_id>.parquet        (compact dtypes, see schema.py)
+    data/cache/time_entries/<workspace_id>/<user_id>.tags.parquet   (entry_id, tag_id bridge)
+    data/cache/time_entries/<workspace_id>/_intervals.json          ({user_id: [[start, end), ...]})
+
+Newly covered ranges are merged into the intervals file as it is on disk at save time, so
+concurrent requests add to each other's coverage instead of overwriting it.
+
+Entries from the last CACHE_SETTLE_DAYS are stored but never marked covered (they can
+still be edited), so requests reaching into that window re-fetch it.
+"""
+
+
+TIME_ENTRY_CACHE_DIR = Path("data/cache/time_entries")
+INTERVALS_FILE_NAME = "_intervals.json"
+
+#Same window sync_time_entries re-fetches by default
+CACHE_SETTLE_DAYS = float(os.getenv("CLOCKIFY_RANGE_CACHE_SETTLE_DAYS", "7"))
+
+#Clockify timestamps have second precision; an inclusive end of 23:59:59 covers up to midnight
+TIMESTAMP_RESOLUTION = timedelta(seconds=1)
+
+TIME_ENTRY_COLUMNS = [
+    "id", "user_id", "project_id", "workspace_id", "description", "billable",
+    "start", "end", "duration_raw", "duration_hours",
+]
+
+#Guards the read-modify-write of cache files within this process
+_cache_lock = threading.Lock()
+
+
+
+def coalesce_intervals(intervals: list[tuple[datetime, datetime]]) -> list[tuple[datetime, datetime]]:
+    """Sort half-open [start, end) intervals and merge overlapping or adjacent ones."""
+    merged: list[tuple[datetime, datetime]] = []
+    for start, end in sorted(i for i in intervals if i[0] < i[1]):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+
+def missing_intervals(
+    covered: list[tuple[datetime, datetime]],
+    start: datetime,
+    end: datetime,
+) -> list[tuple[datetime, datetime]]:
+    """Sub-intervals of [start, end) not inside any covered interval (covered must be coalesced)."""
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+
+def _workspace_dir(workspace_id: str) -> Path:
+    return TIME_ENTRY_CACHE_DIR / workspace_id
+
+
+
+def _user_path(workspace_id: str, user_id: str) -> Path:
+    return _workspace_dir(workspace_id) / f"{user_id}.parquet"
+
+
+
+def _user_tags_path(workspace_id: str, user_id: str) -> Path:
+    return _workspace_dir(workspace_id) / f"{user_id}.tags.parquet"
+
+
+
+def _empty_time_entries() -> pd.DataFrame:
+    return apply_time_entry_schema(pd.DataFrame(columns=TIME_ENTRY_COLUMNS))
+
+
+
+def _empty_tags() -> pd.DataFrame:
+    return apply_dtypes(pd.DataFrame({"entry_id": [], "tag_id": []}), TAG_BRIDGE_DTYPES)
+
+
+
+def _replace_file(df: pd.DataFrame, path: Path) -> None:
+    """Write df next to path and swap it in (temp name per process)."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    write_parquet(df, tmp_path)
+    tmp_path.replace(path)
+
+
+
+def load_intervals(workspace_id: str) -> dict[str, list[tuple[datetime, datetime]]]:
+    """Covered ranges per user: {user_id: [(start, end), ...]}, half-open and coalesced."""
+    path = _workspace_dir(workspace_id) / INTERVALS_FILE_NAME
+    if not path.exists():
+        return {}
+
+    with path.open("r", encoding="utf-8") as f:
+        raw = json.load(f)
+    return {
+        user_id: [(parse_clockify_timestamp(s), parse_clockify_timestamp(e)) for s, e in intervals]
+        for user_id, intervals in raw.items()
+    }
+
+
+
+def save_intervals(workspace_id: str, intervals: dict[str, list[tuple[datetime, datetime]]]) -> Path:
+    """
+    Add intervals to the covered ranges on disk and save the coalesced result.
+    The file is re-read under the cache lock right before writing, so ranges saved by
+    another request in the meantime are kept.
+    """
+    path = _workspace_dir(workspace_id) / INTERVALS_FILE_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _cache_lock:
+        merged = load_intervals(workspace_id)
+        for user_id, ranges in intervals.items():
+            merged[user_id] = coalesce_intervals(merged.get(user_id, []) + list(ranges))
+
+        raw = {
+            user_id: [[format_clockify_timestamp(s), format_clockify_timestamp(e)] for s, e in ranges]
+            for user_id, ranges in sorted(merged.items())
+        }
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(raw, f, indent=2)
+        tmp_path.replace(path)
+    return path
+
+
+
+def _fetch_gaps(
+    workspace_id: str,
+    user_id: str,
+    gaps: list[tuple[datetime, datetime]],
+    page_size: int,
+) -> int:
+    """
+    Fetch each gap from the API and merge it into the user's cache files.
+    Stored entries starting inside a fetched gap (and their tags) are replaced, so
+    deletions are picked up.  Returns the number of entries fetched.
+    """
+    entries = []
+    for gap_start, gap_end in gaps:
+        entries.extend(get_time_entries_for_user(
+            workspace_id,
+            user_id,
+            format_clockify_timestamp(gap_start),
+            format_clockify_timestamp(gap_end - TIMESTAMP_RESOLUTION),
+            page_size,
+        ))
+
+    fetched, fetched_tags = to_time_entries_frames(entries) if entries else (_empty_time_entries(), _empty_tags())
+
+    path = _user_path(workspace_id, user_id)
+    tags_path = _user_tags_path(workspace_id, user_id)
+    with _cache_lock:
+        frames = [fetched]
+        tag_frames = [fetched_tags]
+        if path.exists():
+            stored = apply_time_entry_schema(pd.read_parquet(path))
+            in_gap = pd.Series(False, index=stored.index)
+            for gap_start, gap_end in gaps:
+                in_gap |= (stored["start"] >= gap_start) & (stored["start"] < gap_end)
+            kept = stored[~in_gap & ~stored["id"].isin(fetched["id"])]
+            frames.insert(0, kept)
+            if tags_path.exists():
+                stored_tags = pd.read_parquet(tags_path)
+                tag_frames.insert(0, stored_tags[stored_tags["entry_id"].isin(kept["id"])])
+
+        merged = pd.concat([f.astype(object) for f in frames if not f.empty] or [_empty_time_entries()], ignore_index=True)
+        merged = apply_time_entry_schema(merged).sort_values(["start", "id"], kind="stable", ignore_index=True)
+        tags = pd.concat([f.astype(object) for f in tag_frames if not f.empty] or [_empty_tags()], ignore_index=True)
+        tags = apply_dtypes(tags, TAG_BRIDGE_DTYPES)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _replace_file(merged, path)
+        _replace_file(tags, tags_path)
+    return len(entries)
+
+
+
+@metrics.timed("clockify.get_time_entries_range")
+def get_time_entries_range_frames(
+    workspace_id: str,
+    start: str,
+    end: str,
+    user_ids: list[str] | None = None,
+    max_workers: int = 8,
+    page_size: int = 1000,
+    settle_days: float | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Time entries starting between start and end (ISO8601, both inclusive, like
+    get_time_entries_for_all_users), pulling only ranges not already cached.
+    -user_ids: limit to these users (default: every user in the workspace)
+    -max_workers: users fetched concurrently
+    -settle_days: recent days never treated as covered (default CACHE_SETTLE_DAYS)
+    Returns (time entries, tag bridge): entries with the compact dtypes from schema.py,
+    sorted by user and start, and the (entry_id, tag_id) rows for those entries.
+    """
+    start_dt = parse_clockify_timestamp(start)
+    end_dt = parse_clockify_timestamp(end) + TIMESTAMP_RESOLUTION
+    settle_days = CACHE_SETTLE_DAYS if settle_days is None else settle_days
+    settled_until = datetime.now(timezone.utc) - timedelta(days=settle_days)
+
+    if user_ids is None:
+        user_ids = [u.get("id") for u in get_users(workspace_id)]
+
+    intervals = load_intervals(workspace_id)
+    gaps_by_user = {}
+    for user_id in user_ids:
+        gaps = missing_intervals(intervals.get(user_id, []), start_dt, end_dt)
+        if gaps:
+            gaps_by_user[user_id] = gaps
+    metrics.count("time_entry_cache.users_served", len(user_ids))
+    metrics.count("time_entry_cache.users_fetched", len(gaps_by_user))
+    metrics.count("time_entry_cache.gaps_fetched", sum(len(g) for g in gaps_by_user.values()))
+
+    if gaps_by_user:
+        print(f"Fetching {sum(len(g) for g in gaps_by_user.values())} uncached range(s) for {len(gaps_by_user)} user(s).")
+        covered = {}
+        errors = []
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {
+                pool.submit(_fetch_gaps, workspace_id, user_id, gaps, page_size): user_id
+                for user_id, gaps in gaps_by_user.items()
+            }
+            for future in as_completed(futures):
+                user_id = futures[future]
+                try:
+                    metrics.count("time_entry_cache.entries_fetched", future.result())
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                covered[user_id] = [(s, min(e, settled_until)) for s, e in gaps_by_user[user_id]]
+
+        #Keep what was fetched even if some users failed
+        save_intervals(workspace_id, covered)
+        if errors:
+            raise errors[0]
+
+    files = [p for p in (_user_path(workspace_id, u) for u in user_ids) if p.exists()]
+    if not files:
+        return _empty_time_entries(), _empty_tags()
+
+    #Files written from different fetches can disagree on dictionaries and all-null columns
+    schema = pa.unify_schemas([plain_arrow_schema(pq.read_schema(f)) for f in files], promote_options="permissive")
+    dataset = ds.dataset(files, format="parquet", schema=schema)
+    table = dataset.to_table(filter=date_range_filter(dataset, "start", start_dt, end_dt))
+    metrics.count("time_entry_cache.entries_served", table.num_rows)
+
+    df = table.to_pandas().sort_values(["user_id", "start", "id"], kind="stable", ignore_index=True)
+    df = apply_dtypes(df, TIME_ENTRY_DTYPES)
+
+    tag_files = [p for p in (_user_tags_path(workspace_id, u) for u in user_ids) if p.exists()]
+    tag_frames = [pd.read_parquet(p).astype(object) for p in tag_files]
+    tags = pd.concat([f for f in tag_frames if not f.empty] or [_empty_tags()], ignore_index=True)
+    tags = tags[tags["entry_id"].isin(df["id"])].reset_index(drop=True)
+    return df, apply_dtypes(tags, TAG_BRIDGE_DTYPES)
+
+
+
+def get_time_entries_range(
+    workspace_id: str,
+    start: str,
+    end: str,
+    user_ids: list[str] | None = None,
+    max_workers: int = 8,
+    page_size: int = 1000,
+    settle_days: float | None = None,
+) -> pd.DataFrame:
+    """Time entries for a date range (see get_time_entries_range_frames), without the tag bridge."""
+    return get_time_entries_range_frames(workspace_id, start, end, user_ids, max_workers, page_size, settle_days)[0]
+
+
+
+def clear_time_entry_cache(workspace_id: str | None = None) -> None:
+    """Drop cached time entries and covered ranges (for one workspace, or all)."""
+    directories = [_workspace_dir(workspace_id)] if workspace_id else list(TIME_ENTRY_CACHE_DIR.glob("*"))
+    for directory in directories:
+        if not directory.is_dir():
+            continue
+        for path in directory.iterdir():
+            path.unlink()
+        directory.rmdir()
@@ -1,5 +1,16 @@
 from pathlib import Path
+import sys
+import numpy as np
 import pandas as pd
+import metrics
+from schema import apply_fact_schema, apply_time_entry_schema
+from paycor_config import PROJECT_PAY_RATE_OVERRIDES_FILE, load_project_pay_rate_overrides
+from storage import (
+    TIME_ENTRIES_DATASET_DIR,
+    read_time_entries_dataset,
+    time_entries_dataset,
+    write_processed,
+)
 
 
 CLOCKIFY_PROCESSED_DIR = Path("data/processed/clockify")
@@ -8,14 +19,23 @@ CONFIG_DIR = Path("config")
 UNIFIED_DIR = Path("data/processed/unified")
 
 
+@metrics.timed("unify.load_latest_time_entries")
 def load_latest_time_entries() -> pd.DataFrame:
-    """Load the most recent processed Clockify time entries file."""
+    """
+    Load processed Clockify time entries.
+    Reads the partitioned time entries dataset when it exists, otherwise falls back
+    to the most recent per-range processed file.
+    """
+    if time_entries_dataset() is not None:
+        print(f"Loading time entries from {TIME_ENTRIES_DATASET_DIR}")
+        return read_time_entries_dataset()
+
     files = sorted(CLOCKIFY_PROCESSED_DIR.glob("time_entries_*.parquet"))
     if not files:
         raise FileNotFoundError("No processed Clockify time_entries parquet files found.")
     latest = files[-1]
     print(f"Loading time entries from {latest}")
-    return pd.read_parquet(latest)
+    return apply_time_entry_schema(pd.read_parquet(latest))
 
 
 def load_dimensions() -> tuple[pd.DataFrame, pd.DataFrame]:
@@ -67,17 +87,8 @@ def attach_employee_ids(df_time: pd.DataFrame, mapping: pd.DataFrame) -> pd.Data
     return merged
 
 
-def attach_pay_rates(df_time: pd.DataFrame, df_rates: pd.DataFrame) -> pd.DataFrame:
-    """
-    Attach applicable hourly_rate from pay rate history to each time entry,
-    based on paycor_emp_id and entry start date.
-
-    This is a simple, correct-first version, not heavily optimized.
-    """
-
-    df_time = df_time.copy()
-    df_time["start"] = pd.to_datetime(df_time["start"], errors="coerce", utc="true")
-
+def _prepare_rates(df_rates: pd.DataFrame) -> pd.DataFrame:
+    """Normalize pay rate dates to UTC and fill open-ended end dates."""
     rates = df_rates.copy()
     rates["start_date"] = pd.to_datetime(rates["start_date"], errors="coerce", utc="true")
 
@@ -88,32 +99,159 @@ def attach_pay_rates(df_time: pd.DataFrame, df_rates: pd.DataFrame) -> pd.DataFr
     else:
         rates["end_date"] = pd.Timestamp("2100-01-01", tz="UTC")
 
-    def find_rate_for_entry(row):
-        emp_id = row.get("paycor_emp_id")
-        entry_start = row.get("start")
-        if pd.isna(emp_id) or pd.isna(entry_start):
-            return None
+    return rates
 
-        subset = rates[rates["emp_id"] == emp_id]
-        if subset.empty:
-            return None
 
-        mask = (subset["start_date"] <= entry_start) & (entry_start <= subset["end_date"])
-        subset = subset[mask]
-        if subset.empty:
-            return None
+@metrics.timed("unify.attach_pay_rates")
+def attach_pay_rates(df_time: pd.DataFrame, df_rates: pd.DataFrame) -> pd.DataFrame:
+    """
+    Attach applicable hourly_rate from pay rate history to each time entry,
+    based on paycor_emp_id and entry start date.
 
-        best = subset.sort_values("start_date").iloc[-1]
-        return best.get("hourly_rate")
+    Sort-based as-of join: each entry gets the rate with the latest start_date
+    on or before the entry start, provided the entry also falls on or before
+    that rate's end_date.  Entries with no applicable rate get null.
+    """
+    df_time = df_time.copy()
+    df_time["start"] = pd.to_datetime(df_time["start"], errors="coerce", utc="true")
+    df_time["hourly_rate"] = np.nan
+
+    rates = _prepare_rates(df_rates)
+    rates = rates[rates["emp_id"].notna() & rates["start_date"].notna()]
+
+    valid = df_time["paycor_emp_id"].notna() & df_time["start"].notna()
+    if rates.empty or not valid.any():
+        return df_time
+
+    left = pd.DataFrame({
+        "_row": np.flatnonzero(valid.to_numpy()),
+        "_emp": df_time.loc[valid, "paycor_emp_id"].astype(str).to_numpy(),
+        "_start": df_time.loc[valid, "start"].to_numpy(),
+    })
+    right = pd.DataFrame({
+        "_emp": rates["emp_id"].astype(str).to_numpy(),
+        "_rate_start": rates["start_date"].to_numpy(),
+        "_rate_end": rates["end_date"].to_numpy(),
+        "_hourly_rate": rates["hourly_rate"].to_numpy(),
+    })
+
+    left = left.sort_values("_start", kind="stable")
+    right = right.sort_values("_rate_start", kind="stable")
+
+    matched = pd.merge_asof(
+        left,
+        right,
+        left_on="_start",
+        right_on="_rate_start",
+        by="_emp",
+        direction="backward",
+    )
 
-    df_time["hourly_rate"] = df_time.apply(find_rate_for_entry, axis=1)
+    # The latest rate that started before the entry may already have ended
+    # while an earlier, overlapping rate is still in effect.  Those rows are
+    # rare, so resolve them with an exact interval join on just that subset.
+    expired = matched["_rate_start"].notna() & (matched["_start"] > matched["_rate_end"])
+    if expired.any():
+        retry = matched.loc[expired, ["_row", "_emp", "_start"]]
+        candidates = retry.merge(right, on="_emp", how="inner")
+        in_window = (
+            (candidates["_rate_start"] <= candidates["_start"])
+            & (candidates["_start"] <= candidates["_rate_end"])
+        )
+        best = (
+            candidates[in_window]
+            .sort_values("_rate_start", kind="stable")
+            .drop_duplicates("_row", keep="last")
+            .set_index("_row")["_hourly_rate"]
+        )
+        matched.loc[expired, "_hourly_rate"] = matched.loc[expired, "_row"].map(best)
+
+    rate_col = df_time.columns.get_loc("hourly_rate")
+    df_time.iloc[matched["_row"].to_numpy(), rate_col] = matched["_hourly_rate"].to_numpy(dtype=float)
     return df_time
 
 
+def load_pay_rate_overrides() -> pd.DataFrame:
+    """
+    Load project pay rate override rules as a DataFrame.
+    Returns an empty frame when config/project_pay_rate_overrides.csv doesn't exist.
+    """
+    if not PROJECT_PAY_RATE_OVERRIDES_FILE.exists():
+        return pd.DataFrame(columns=["clockify_project_id", "paycor_employee_id", "paycor_pay_rate_id"])
+    return pd.DataFrame(load_project_pay_rate_overrides(), dtype=str)
+
+
+@metrics.timed("unify.apply_pay_rate_overrides")
+def apply_pay_rate_overrides(
+    df_time: pd.DataFrame,
+    df_rates: pd.DataFrame,
+    overrides: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Replace the base hourly_rate with a project-specific rate where an override applies.
+
+    Rules are keyed on (clockify_project_id, paycor_employee_id) and name a
+    paycor_pay_rate_id, which is looked up in the pay rate history.  If that id has
+    several history rows, the one in effect at the entry start wins, else its latest.
+    Adds rate_rule: "base", "override:<paycor_pay_rate_id>", or null when unpriced.
+    """
+    df = df_time.copy()
+    df["rate_rule"] = np.where(df["hourly_rate"].notna(), "base", None)
+
+    if overrides.empty or df.empty:
+        return df
+
+    rules = (
+        overrides[["clockify_project_id", "paycor_employee_id", "paycor_pay_rate_id"]]
+        .dropna()
+        .drop_duplicates(["clockify_project_id", "paycor_employee_id"], keep="last")
+    )
+
+    entries = pd.DataFrame({
+        "_row": np.arange(len(df)),
+        "clockify_project_id": df["project_id"].astype("string").to_numpy(dtype=object),
+        "paycor_employee_id": df["paycor_emp_id"].astype("string").to_numpy(dtype=object),
+        "_start": pd.to_datetime(df["start"], errors="coerce", utc=True).to_numpy(),
+    }).merge(rules, on=["clockify_project_id", "paycor_employee_id"], how="inner")
+
+    if entries.empty:
+        return df
+
+    rates = _prepare_rates(df_rates)
+    rates = pd.DataFrame({
+        "paycor_pay_rate_id": rates["id"].astype(str).to_numpy(),
+        "_rate_start": rates["start_date"].to_numpy(),
+        "_rate_end": rates["end_date"].to_numpy(),
+        "_override_rate": rates["hourly_rate"].to_numpy(),
+    })
+
+    candidates = entries.merge(rates, on="paycor_pay_rate_id", how="inner")
+    candidates["_in_effect"] = (
+        (candidates["_rate_start"] <= candidates["_start"])
+        & (candidates["_start"] <= candidates["_rate_end"])
+    )
+    best = (
+        candidates
+        .sort_values(["_row", "_in_effect", "_rate_start"], kind="stable")
+        .drop_duplicates("_row", keep="last")
+    )
+
+    missing = set(rules["paycor_pay_rate_id"]) - set(rates["paycor_pay_rate_id"])
+    if missing:
+        print(f"Override pay rate ids not found in pay rate history: {sorted(missing)}")
+
+    rows = best["_row"].to_numpy()
+    df.iloc[rows, df.columns.get_loc("hourly_rate")] = best["_override_rate"].to_numpy(dtype=float)
+    df.iloc[rows, df.columns.get_loc("rate_rule")] = ("override:" + best["paycor_pay_rate_id"]).to_numpy()
+    return df
+
+
+@metrics.timed("unify.compute_costs")
 def compute_costs(df_time: pd.DataFrame) -> pd.DataFrame:
     """Compute cost per time entry and return a costed fact table."""
     df = df_time.copy()
-    df["cost"] = df["duration_hours"] * df["hourly_rate"]
+    #float64 product: hours/rates are stored as float32 but cost is summed into money totals
+    df["cost"] = df["duration_hours"].astype("float64") * df["hourly_rate"].astype("float64")
 
     cols = [
         "id",
@@ -125,38 +263,210 @@ def compute_costs(df_time: pd.DataFrame) -> pd.DataFrame:
         "duration_hours",
         "billable",
         "hourly_rate",
+        "rate_rule",
         "cost",
     ]
     existing_cols = [c for c in cols if c in df.columns]
-    return df[existing_cols]
+    return apply_fact_schema(df[existing_cols])
 
 
 def save_fact_time_costed(df: pd.DataFrame) -> None:
-    """Save the combined costed time entries table to unified/."""
+    """
+    Save the combined costed time entries table to unified/.
+    Parquet always; CSV only when the storage OUTPUT_POLICY asks for it.
+    """
     UNIFIED_DIR.mkdir(parents=True, exist_ok=True)
-    csv_path = UNIFIED_DIR / "fact_time_costed.csv"
-    parquet_path = UNIFIED_DIR / "fact_time_costed.parquet"
-
-    df.to_csv(csv_path, index=False)
-    df.to_parquet(parquet_path, index=False)
+    paths = write_processed(apply_fact_schema(df), UNIFIED_DIR, "fact_time_costed")
 
     print("Saved costed time entries to:")
-    print("  CSV:    ", csv_path)
-    print("  Parquet:", parquet_path)
+    print("  Parquet:", paths["parquet"])
+    if paths["csv"]:
+        print("  CSV:    ", paths["csv"])
+
+
+
+#Snapshots of the last build's inputs, used to work out what an incremental build must redo
+FACT_STATE_DIR = UNIFIED_DIR / "_state"
+
+#Source columns that feed fact_time_costed; a change in any of them reprices the entry
+ENTRY_SOURCE_COLS = ["user_id", "project_id", "start", "end", "duration_hours", "billable"]
+RATE_SOURCE_COLS = ["id", "emp_id", "start_date", "end_date", "hourly_rate"]
+MAPPING_SOURCE_COLS = ["clockify_user_id", "paycor_emp_id"]
+OVERRIDE_SOURCE_COLS = ["clockify_project_id", "paycor_employee_id", "paycor_pay_rate_id"]
+
+
+def _row_hashes(df: pd.DataFrame, cols: list[str]) -> pd.Series:
+    """Stable per-row hash of the given columns (missing columns hash as null)."""
+    subset = pd.DataFrame({c: (df[c] if c in df.columns else None) for c in cols}, index=df.index)
+    return pd.util.hash_pandas_object(subset.astype("string"), index=False)
+
+
+def _changed_rows(previous: pd.DataFrame, current: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+    """Rows (old and new versions) present in only one of two snapshots."""
+    if previous is None:
+        previous = pd.DataFrame(columns=cols, dtype="string")
+    prev = previous.assign(_hash=_row_hashes(previous, cols).to_numpy())
+    curr = current.assign(_hash=_row_hashes(current, cols).to_numpy())
+    changed = pd.concat([
+        prev[~prev["_hash"].isin(curr["_hash"])],
+        curr[~curr["_hash"].isin(prev["_hash"])],
+    ], ignore_index=True)
+    return changed.drop(columns="_hash")
+
+
+def _load_state(name: str) -> pd.DataFrame | None:
+    path = FACT_STATE_DIR / f"{name}.parquet"
+    return pd.read_parquet(path) if path.exists() else None
+
+
+def save_fact_state(
+    df_time: pd.DataFrame,
+    df_rates: pd.DataFrame,
+    mapping: pd.DataFrame,
+    overrides: pd.DataFrame,
+) -> None:
+    """Snapshot the inputs of a fact build for the next incremental build."""
+    FACT_STATE_DIR.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({
+        "id": df_time["id"].to_numpy(),
+        "row_hash": _row_hashes(df_time, ENTRY_SOURCE_COLS).to_numpy(),
+    }).to_parquet(FACT_STATE_DIR / "entries.parquet", index=False)
+
+    for name, df, cols in [
+        ("rates", df_rates, RATE_SOURCE_COLS),
+        ("mapping", mapping, MAPPING_SOURCE_COLS),
+        ("overrides", overrides, OVERRIDE_SOURCE_COLS),
+    ]:
+        snapshot = pd.DataFrame({c: (df[c] if c in df.columns else None) for c in cols}, index=df.index)
+        snapshot.astype("string").to_parquet(FACT_STATE_DIR / f"{name}.parquet", index=False)
+
+
+def cost_time_entries(
+    df_time: pd.DataFrame,
+    df_rates: pd.DataFrame,
+    mapping: pd.DataFrame,
+    overrides: pd.DataFrame,
+) -> pd.DataFrame:
+    """Map IDs, attach base and override rates, and compute costs for time entries."""
+    df_time_with_ids = attach_employee_ids(df_time, mapping)
+    df_time_with_rates = attach_pay_rates(df_time_with_ids, df_rates)
+    df_time_with_rates = apply_pay_rate_overrides(df_time_with_rates, df_rates, overrides)
+    df_costed = compute_costs(df_time_with_rates)
+    metrics.count("rows.time_entries_costed", len(df_costed))
+    return df_costed
 
 
+def build_fact_time_costed() -> pd.DataFrame:
+    """Rebuild fact_time_costed from scratch and snapshot its inputs."""
+    df_time = load_latest_time_entries()
+    df_rates = load_payrate_history()
+    mapping = load_employee_id_mapping()
+    overrides = load_pay_rate_overrides()
 
-if __name__ == "__main__":
-    df_time_raw = load_latest_time_entries()
-    dim_users, dim_projects = load_dimensions()
+    df_costed = cost_time_entries(df_time, df_rates, mapping, overrides)
+    save_fact_time_costed(df_costed)
+    save_fact_state(df_time, df_rates, mapping, overrides)
+    return df_costed
+
+
+@metrics.timed("unify.find_entries_to_recompute")
+def find_entries_to_recompute(
+    df_time: pd.DataFrame,
+    df_rates: pd.DataFrame,
+    mapping: pd.DataFrame,
+    overrides: pd.DataFrame,
+) -> tuple[pd.Series, set]:
+    """
+    Compare current inputs with the last build's snapshots.
+    Returns (mask over df_time of entries to recompute, ids deleted since the last build).
+    An entry is recomputed when it is new or changed, when its user's mapping changed,
+    when an override rule for its (project, employee) changed, or when a pay rate row
+    for its employee changed and the entry falls in that row's effective window (old
+    or new version).
+    """
+    prev_entries = _load_state("entries")
+    hashes = _row_hashes(df_time, ENTRY_SOURCE_COLS)
+    prev_hash = df_time["id"].map(prev_entries.set_index("id")["row_hash"])
+    recompute = (prev_hash != hashes).fillna(True).to_numpy(dtype=bool)
+    deleted = set(prev_entries["id"]) - set(df_time["id"])
+
+    #Mapping changes reprice every entry of the affected Clockify users
+    changed_mapping = _changed_rows(_load_state("mapping"), mapping.astype("string"), MAPPING_SOURCE_COLS)
+    recompute |= df_time["user_id"].isin(changed_mapping["clockify_user_id"]).to_numpy()
+
+    with_ids = attach_employee_ids(df_time[["id", "user_id", "project_id", "start"]], mapping)
+    emp_ids = with_ids["paycor_emp_id"].astype("string")
+    starts = pd.to_datetime(with_ids["start"], errors="coerce", utc=True)
+
+    #Override rule changes reprice the (project, employee) pairs they name
+    changed_rules = _changed_rows(_load_state("overrides"), overrides.astype("string"), OVERRIDE_SOURCE_COLS)
+    if not changed_rules.empty:
+        pairs = pd.MultiIndex.from_frame(changed_rules[["clockify_project_id", "paycor_employee_id"]].astype("string"))
+        keys = pd.MultiIndex.from_arrays([with_ids["project_id"].astype("string"), emp_ids])
+        recompute |= keys.isin(pairs)
+
+    #Pay rate changes reprice the employee's entries inside the changed rows' windows
+    rate_state = _load_state("rates")
+    rate_cols = [c for c in RATE_SOURCE_COLS if c in df_rates.columns]
+    changed_rates = _changed_rows(rate_state, df_rates[rate_cols].astype("string"), RATE_SOURCE_COLS)
+    if not changed_rates.empty:
+        windows = _prepare_rates(changed_rates)
+        referenced = overrides["paycor_pay_rate_id"].isin(windows["id"]) if not overrides.empty else None
+        for _, w in windows.iterrows():
+            in_window = (starts >= w["start_date"]) & (starts <= w["end_date"])
+            recompute |= ((emp_ids == str(w["emp_id"])) & in_window).fillna(False).to_numpy(dtype=bool)
+        #Rates used by overrides reprice every entry those rules cover
+        if referenced is not None and referenced.any():
+            pairs = pd.MultiIndex.from_frame(
+                overrides.loc[referenced, ["clockify_project_id", "paycor_employee_id"]].astype("string")
+            )
+            keys = pd.MultiIndex.from_arrays([with_ids["project_id"].astype("string"), emp_ids])
+            recompute |= keys.isin(pairs)
+
+    return pd.Series(recompute, index=df_time.index), deleted
+
+
+def update_fact_time_costed() -> pd.DataFrame:
+    """
+    Incrementally refresh fact_time_costed.
+    Only entries picked by find_entries_to_recompute are re-costed; they replace their
+    old rows in the existing fact table, and deleted entries are dropped.  Falls back
+    to a full build when there is no previous fact table or snapshot.
+    """
+    fact_path = UNIFIED_DIR / "fact_time_costed.parquet"
+    if not fact_path.exists() or not (FACT_STATE_DIR / "entries.parquet").exists():
+        print("No previous fact build found; rebuilding fact_time_costed from scratch.")
+        return build_fact_time_costed()
+
+    df_time = load_latest_time_entries()
     df_rates = load_payrate_history()
     mapping = load_employee_id_mapping()
+    overrides = load_pay_rate_overrides()
+
+    recompute, deleted = find_entries_to_recompute(df_time, df_rates, mapping, overrides)
+    print(f"Recomputing {int(recompute.sum())} of {len(df_time)} entries; {len(deleted)} deleted.")
+
+    existing = pd.read_parquet(fact_path)
+    if recompute.any() or deleted:
+        df_new = cost_time_entries(df_time[recompute], df_rates, mapping, overrides)
+        drop_ids = set(df_new["id"]) | deleted
+        kept = existing[~existing["id"].isin(drop_ids)]
+        frames = [f for f in (kept, df_new) if not f.empty]
+        df_costed = apply_fact_schema(pd.concat(frames, ignore_index=True) if frames else existing.iloc[0:0])
+        save_fact_time_costed(df_costed)
+    else:
+        df_costed = existing
 
-    df_time_with_ids = attach_employee_ids(df_time_raw, mapping)
-    df_time_with_rates = attach_pay_rates(df_time_with_ids, df_rates)
-    df_costed = compute_costs(df_time_with_rates)
+    save_fact_state(df_time, df_rates, mapping, overrides)
+    return df_costed
 
-    save_fact_time_costed(df_costed)
+
+
+if __name__ == "__main__":
+    if "--incremental" in sys.argv:
+        df_costed = update_fact_time_costed()
+    else:
+        df_costed = build_fact_time_costed()
 
     print("\nSample of costed time entries:")
-    print(df_costed.head())
\ No newline at end of file
+    print(df_costed.head())
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+#The ETL modules import each other by bare name (they are run as scripts from src/)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+import clockify_transform
+from clockify_transform import durations_to_hours, to_projects_dataframe
+from storage import (
+    PROCESSED_CLOCKIFY_DIR,
+    append_synced_time_entries,
+    compact_synced_time_entries,
+    read_time_entries_dataset,
+    save_clockify_dimension_raw,
+)
+
+
+def parse_duration_to_hours(d):
+    """Original scalar duration_raw parser (PT... only); the reference for durations_to_hours."""
+    if not isinstance(d, str) or not d.startswith("PT"):
+        return None
+    hours = 0.0
+    num = ""
+    for ch in d[2:]:
+        if ch.isdigit() or ch == ".":
+            num += ch
+        else:
+            if num:
+                value = float(num)
+                if ch == "H":
+                    hours += value
+                elif ch == "M":
+                    hours += value / 60.0
+                elif ch == "S":
+                    hours += value / 3600.0
+                num = ""
+    return hours
+
+
+def random_pt_duration(rng: np.random.Generator) -> str:
+    """A random well-formed PT... duration: any subset of H/M/S, integer or decimal values."""
+    out = "PT"
+    for unit in "HMS":
+        if rng.random() < 0.6:
+            value = int(rng.integers(0, 100))
+            out += f"{value}.{int(rng.integers(0, 100))}{unit}" if rng.random() < 0.3 else f"{value}{unit}"
+    return out
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_scalar_parser_on_pt_durations(seed):
+    rng = np.random.default_rng(seed)
+    raw = [random_pt_duration(rng) for _ in range(500)]
+
+    vectorized = durations_to_hours(pd.Series(raw))
+    scalar = [parse_duration_to_hours(d) for d in raw]
+
+    np.testing.assert_allclose(vectorized.to_numpy(), np.array(scalar, dtype=float), rtol=1e-12)
+
+
+def test_day_durations_are_supported():
+    #The scalar parser only knew PT...; P#D durations used to come out as None
+    raw = pd.Series(["P1D", "P1DT2H30M", "P2DT0.5S"])
+    assert [parse_duration_to_hours(d) for d in raw] == [None, None, None]
+    np.testing.assert_allclose(durations_to_hours(raw).to_numpy(), [24.0, 26.5, 48.0 + 0.5 / 3600])
+
+
+@pytest.mark.parametrize("raw", ["PT1H1H", "PT30M1H", "P", "1H", "PTH", "PT1X", "PT-1H", "garbage"])
+def test_malformed_durations_are_nan(raw):
+    #The scalar parser summed whatever it found (PT1H1H -> 2.0); malformed strings are now NaN
+    assert np.isnan(durations_to_hours(pd.Series([raw])).iloc[0])
+
+
+def test_missing_durations_fall_back_to_start_end():
+    raw = pd.Series([None, "PT1H1H", "PT2H"])
+    start = pd.Series(["2025-01-01T09:00:00Z", "2025-01-01T09:00:00Z", "2025-01-01T09:00:00Z"])
+    end = pd.Series(["2025-01-01T10:30:00Z", "2025-01-01T09:15:00Z", None])
+    np.testing.assert_allclose(durations_to_hours(raw, start, end).to_numpy(), [1.5, 0.25, 2.0])
+
+
+def test_project_client_name_from_either_field():
+    projects = [
+        {"id": "p1", "name": "A", "clientName": "Acme"},
+        {"id": "p2", "name": "B", "client": {"name": "Globex"}},
+        {"id": "p3", "name": "C", "clientName": "", "client": None},
+    ]
+    assert to_projects_dataframe(projects)["client_name"].tolist() == ["Acme", "Globex", None]
+
+
+def synced_entry(entry_id: str, day: int, tags: list[str]) -> dict:
+    return {
+        "id": entry_id,
+        "userId": "u1",
+        "projectId": "p1",
+        "workspaceId": "ws",
+        "billable": True,
+        "tagIds": tags,
+        "timeInterval": {"start": f"2025-01-{day:02d}T09:00:00Z", "end": f"2025-01-{day:02d}T10:00:00Z", "duration": "PT1H"},
+    }
+
+
+def processed_state() -> tuple[list, list]:
+    entries = read_time_entries_dataset(columns=["id", "start"])
+    tags = pd.read_parquet(PROCESSED_CLOCKIFY_DIR / "time_entry_tags.parquet")
+    return sorted(entries["id"]), sorted(zip(tags["entry_id"], tags["tag_id"]))
+
+
+def test_incremental_transform_applies_only_new_sync_batches(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    save_clockify_dimension_raw([{"id": "u1", "name": "Ann"}], "users", "ws")
+    save_clockify_dimension_raw([{"id": "p1", "name": "P"}], "projects", "ws")
+
+    append_synced_time_entries([synced_entry(f"e{i}", i, ["a"]) for i in range(1, 6)], [], "ws")
+    assert clockify_transform.transform_clockify(incremental=True, workspace_id="ws") == 5
+
+    #Retag e2, delete e3, add e6: only this batch is transformed
+    append_synced_time_entries([synced_entry("e2", 2, ["b", "c"]), synced_entry("e6", 6, [])], ["e3"], "ws")
+    assert clockify_transform.transform_clockify(incremental=True, workspace_id="ws") == 2
+    expected = (
+        ["e1", "e2", "e4", "e5", "e6"],
+        [("e1", "a"), ("e2", "b"), ("e2", "c"), ("e4", "a"), ("e5", "a")],
+    )
+    assert processed_state() == expected
+
+    assert clockify_transform.transform_clockify(incremental=True, workspace_id="ws") == 0
+    assert processed_state() == expected
+
+    #A compacted log no longer matches the applied batches, so it is replayed whole
+    compact_synced_time_entries("ws")
+    assert clockify_transform.transform_clockify(incremental=True, workspace_id="ws") == 5
+    assert processed_state() == expected
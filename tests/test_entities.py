@@ -0,0 +1,49 @@
+import pandas as pd
+import entities
+from storage import PROCESSED_CLOCKIFY_DIR, save_clockify_dimension_raw, save_time_entries_raw, time_entries_dataset
+
+
+def write_raw_workspace(workspace_id: str) -> None:
+    user_id = f"user-{workspace_id}"
+    save_clockify_dimension_raw([{"id": user_id, "name": f"User {workspace_id}"}], "users", workspace_id)
+    save_clockify_dimension_raw([{"id": f"project-{workspace_id}", "name": "Project"}], "projects", workspace_id)
+    entries = [
+        {
+            "id": f"{workspace_id}-{day}",
+            "userId": user_id,
+            "projectId": f"project-{workspace_id}",
+            "workspaceId": workspace_id,
+            "billable": True,
+            "tagIds": [],
+            "timeInterval": {
+                "start": f"2025-01-{day:02d}T09:00:00Z",
+                "end": f"2025-01-{day:02d}T10:00:00Z",
+                "duration": "PT1H",
+            },
+        }
+        for day in range(1, 4)
+    ]
+    save_time_entries_raw(entries, workspace_id, "2025-01-01T00:00:00Z", "2025-01-31T23:59:59Z")
+
+
+def test_one_worker_ingests_every_entity_under_its_own_root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    workspace_ids = ["wsA", "wsB"]
+    for workspace_id in workspace_ids:
+        root = entities.entity_root("clockify", workspace_id)
+        root.mkdir(parents=True)
+        monkeypatch.chdir(root)
+        write_raw_workspace(workspace_id)
+        monkeypatch.chdir(tmp_path)
+
+    #One reused worker process handles both workspaces
+    results = entities.ingest_entities(workspace_ids, [], extract=False, max_workers=1)
+    assert {r["status"] for r in results.values()} == {"ran"}
+    assert not (entities.entity_root("clockify", "wsA") / entities.ENTITIES_DIR).exists()
+
+    entities.merge_entities(workspace_ids, [])
+    merged = time_entries_dataset().to_table().to_pandas()
+    assert sorted(merged["workspace_id"].astype(str).unique()) == workspace_ids
+    assert len(merged) == 6
+    users = pd.read_parquet(PROCESSED_CLOCKIFY_DIR / "dim_users.parquet")
+    assert sorted(users["user_id"]) == ["user-wsA", "user-wsB"]
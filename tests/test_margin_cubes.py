@@ -0,0 +1,38 @@
+import pandas as pd
+import margin_cubes
+from clockify_transform import save_dimension
+
+
+def make_facts(days: list[str]) -> pd.DataFrame:
+    return pd.DataFrame({
+        "id": [f"e{i}" for i in range(len(days))],
+        "user_id": "u1",
+        "paycor_emp_id": "100",
+        "project_id": "p1",
+        "start": pd.to_datetime([f"{d}T09:00:00Z" for d in days]),
+        "duration_hours": 2.0,
+        "billable": True,
+        "cost": 50.0,
+    })
+
+
+def test_update_drops_periods_whose_facts_were_all_deleted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    save_dimension(pd.DataFrame({"user_id": ["u1"], "user_name": ["Ann"]}), "dim_users")
+    save_dimension(pd.DataFrame({"project_id": ["p1"], "project_name": ["P"], "client_name": ["C"]}), "dim_projects")
+
+    facts = make_facts(["2025-01-02", "2025-02-03"])
+    margin_cubes.build_cubes(facts)
+
+    #Every January fact deleted: January leaves the cube, February stays
+    margin_cubes.update_cubes(facts[facts["id"] != "e0"])
+    month = margin_cubes.load_cube("month")
+    assert month["period_start"].tolist() == [pd.Timestamp("2025-02-01")]
+    assert month["hours"].tolist() == [2.0]
+
+    #Then the last one: no rows left to concatenate
+    margin_cubes.update_cubes(facts.iloc[:0])
+    for grain in margin_cubes.GRAINS:
+        cube = margin_cubes.load_cube(grain)
+        assert cube.empty
+        assert list(cube.columns) == ["grain", "period_start", *margin_cubes.DIMENSION_COLS, *margin_cubes.MEASURE_COLS]
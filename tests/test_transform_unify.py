@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from transform_unify import _prepare_rates, attach_pay_rates
+
+
+def attach_pay_rates_rowwise(df_time: pd.DataFrame, df_rates: pd.DataFrame) -> pd.DataFrame:
+    """Original row-by-row pay rate lookup, O(entries x rates); the reference for attach_pay_rates."""
+    df_time = df_time.copy()
+    df_time["start"] = pd.to_datetime(df_time["start"], errors="coerce", utc="true")
+
+    rates = _prepare_rates(df_rates)
+
+    def find_rate_for_entry(row):
+        emp_id = row.get("paycor_emp_id")
+        entry_start = row.get("start")
+        if pd.isna(emp_id) or pd.isna(entry_start):
+            return None
+
+        subset = rates[rates["emp_id"] == emp_id]
+        mask = (subset["start_date"] <= entry_start) & (entry_start <= subset["end_date"])
+        subset = subset[mask]
+        if subset.empty:
+            return None
+
+        return subset.sort_values("start_date", kind="stable").iloc[-1]["hourly_rate"]
+
+    df_time["hourly_rate"] = df_time.apply(find_rate_for_entry, axis=1)
+    return df_time
+
+
+def assert_same_rates(df_time: pd.DataFrame, df_rates: pd.DataFrame) -> pd.Series:
+    fast = pd.to_numeric(attach_pay_rates(df_time, df_rates)["hourly_rate"], errors="coerce")
+    slow = pd.to_numeric(attach_pay_rates_rowwise(df_time, df_rates)["hourly_rate"], errors="coerce")
+    pd.testing.assert_series_equal(fast.reset_index(drop=True), slow.reset_index(drop=True), check_names=False)
+    return fast
+
+
+def rates_frame(rows: list[tuple]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["emp_id", "start_date", "end_date", "hourly_rate"])
+
+
+def entries_frame(rows: list[tuple]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["paycor_emp_id", "start"])
+
+
+RATES = rates_frame([
+    ("e1", "2024-01-01", "2024-06-30", 20.0),
+    ("e1", "2024-07-01", None, 25.0),
+    #Tie on start date: the later row wins
+    ("e2", "2024-01-01", None, 30.0),
+    ("e2", "2024-01-01", None, 31.0),
+    #Overlap: the latest rate has already ended while the earlier one still applies
+    ("e3", "2024-01-01", "2024-12-31", 40.0),
+    ("e3", "2024-03-01", "2024-03-31", 45.0),
+])
+
+
+def test_matches_rowwise_on_edge_cases():
+    entries = entries_frame([
+        ("e1", "2024-03-15T10:00:00Z"),
+        ("e1", "2024-07-01T00:00:00Z"),
+        ("e1", "2023-12-31T23:00:00Z"),   #before any rate
+        ("e2", "2024-05-01T09:00:00Z"),
+        ("e3", "2024-03-10T09:00:00Z"),
+        ("e3", "2024-04-10T09:00:00Z"),
+        ("e3", "2025-02-01T09:00:00Z"),   #after every rate ended
+        ("e9", "2024-05-01T09:00:00Z"),   #no pay rates at all
+        (None, "2024-05-01T09:00:00Z"),   #unmapped entry
+        ("e1", None),                     #undated entry
+    ])
+    fast = assert_same_rates(entries, RATES)
+    expected = [20.0, 25.0, np.nan, 31.0, 45.0, 40.0, np.nan, np.nan, np.nan, np.nan]
+    np.testing.assert_array_equal(fast.to_numpy(), np.array(expected))
+
+
+def test_unsorted_input_keeps_row_order():
+    entries = entries_frame([
+        ("e3", "2024-04-10T09:00:00Z"),
+        ("e1", "2024-08-01T00:00:00Z"),
+        ("e1", "2024-02-01T00:00:00Z"),
+        ("e3", "2024-03-10T09:00:00Z"),
+    ])
+    entries.index = [7, 3, 9, 1]
+    assert_same_rates(entries, RATES.iloc[::-1])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_rowwise_on_random_histories(seed):
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("2024-01-01", periods=365, freq="D", tz="UTC")
+    rate_rows = []
+    for emp in range(6):
+        for start in rng.choice(days, size=4, replace=False):
+            end = start + pd.Timedelta(days=int(rng.integers(0, 200))) if rng.random() < 0.7 else None
+            rate_rows.append((f"e{emp}", start, end, float(rng.integers(20, 90))))
+    entries = entries_frame([
+        (f"e{int(rng.integers(0, 8))}", days[int(rng.integers(0, 365))] + pd.Timedelta(hours=int(rng.integers(0, 24))))
+        for _ in range(300)
+    ])
+    assert_same_rates(entries, rates_frame(rate_rows))